@@ -1,80 +1,51 @@
-import requests
-from bs4 import BeautifulSoup
-import re
-from datetime import datetime
+import asyncio
+import logging
+from parsel import Selector
 import scrapy
 from scrapy.crawler import CrawlerRunner
 from scrapy.signalmanager import dispatcher
-from pythainlp.util import normalize
 import json
 from typing import Dict
 from urllib.parse import quote
 import httpx
 import jmespath
-from langdetect import detect, DetectorFactory
-import dateparser
 from scrapy.utils.log import configure_logging
 from multiprocessing import Process, Queue
-from twisted.internet import reactor
+from extractors import registry, camphub, instagram
+from deadline_parser import parse_deadline
+from caption_analysis import analyzer
+from metrics import logfmt, record_error, span
+from politeness import BACKOFF_STATUSES, LIVE
+
+logger = logging.getLogger(__name__)
 
 class ActivityScraper:
     INSTAGRAM_APP_ID = ""  # Instagram app ID for accessing the Instagram API
+    INSTAGRAM_GRAPHQL_URL = "https://www.instagram.com/graphql/query/?query_hash=b3055c01b4b222b8a47dc12b090e4e64&variables="
+
+    CRAWL_RETRIES = 2  # crawls answered with 429 / 5xx, retried once the politeness scheduler resumes the host
 
-    def __init__(self):
-        DetectorFactory.seed = 0  # Setting a seed for language detection to ensure consistent results
+    def __init__(self, spider_pool=None, caption_analyzer=None, http=None, politeness=None):
+        self.spider_pool = spider_pool  # Optional SpiderPool of warm Scrapy workers
+        self.caption_analyzer = caption_analyzer or analyzer  # Shared CaptionAnalyzer with the configured budgets
+        self.http = http  # Optional shared HttpClient (pooled httpx.AsyncClient) for non-Scrapy fetches
+        self.politeness = politeness  # Optional PolitenessScheduler pacing the spider pool crawls per host
 
     def get_deadline(self, url):
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
         }
 
-        response = requests.get(url, headers=headers)
-
-        # Parse the HTML content using BeautifulSoup
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Try to locate the h6 element containing 'วันที่รับสมัครวันสุดท้าย'
-        deadline_h6 = soup.find('h6', string=re.compile('วันที่รับสมัครวันสุดท้าย'))
-
-        if deadline_h6:
-            # Find the next <h4> element which should contain the deadline
-            h4_element = deadline_h6.find_next('h4')
-            if h4_element:
-                h4_text = h4_element.get_text(strip=True)
-                print("Found deadline text:", h4_text)
-
-                # Dictionary for Thai month names
-                thai_months = {
-                    'มกราคม': 1, 'กุมภาพันธ์': 2, 'มีนาคม': 3, 'เมษายน': 4,
-                    'พฤษภาคม': 5, 'มิถุนายน': 6, 'กรกฎาคม': 7, 'สิงหาคม': 8,
-                    'กันยายน': 9, 'ตุลาคม': 10, 'พฤศจิกายน': 11, 'ธันวาคม': 12
-                }
+        response = httpx.get(url, headers=headers, follow_redirects=True)
 
-                # Regex pattern to match the day, month (in Thai), and year
-                date_pattern = r'(\d{1,2})\s*([^\d\s]+)\s*(\d{4})'
-                match = re.search(date_pattern, h4_text)
-                if match:
-                    day, month_thai, year = match.groups()
-                    print(f"Matched: day={day}, month={month_thai}, year={year}")
-                    month = thai_months.get(month_thai)
-                    if month:
-                        year = int(year) - 543  # Convert Buddhist year to Gregorian year
-                        try:
-                            deadline = datetime(year, month, int(day))
-                            print("Parsed deadline:", deadline)
-                            return deadline
-                        except ValueError as e:
-                            print(f"Failed to create datetime object: {e}")
-                else:
-                    print("Date pattern did not match")
-            else:
-                print("Deadline h4 element not found")
-        else:
-            print("Deadline h6 element not found")
-
-        return None
+        # Parse the HTML content with the same lxml selector Scrapy uses
+        return camphub.deadline(Selector(text=response.text).root)
 
     def crawl_spider(self, spider, q, start_urls):
+        # Runs in a forked child. The reactor is imported (installed) here and not at module level:
+        # a reactor installed in the bot process would be inherited by every spider worker, all of
+        # them sharing one epoll instance and stealing each other's socket events.
+        from twisted.internet import reactor
         try:
             runner = CrawlerRunner({
                 'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
@@ -91,6 +62,9 @@ class ActivityScraper:
             q.put(e)
 
     def run_spider(self, spider, start_urls):
+        if self.spider_pool is not None and spider is self.EventSpider:
+            return self.spider_pool.scrape(start_urls[0])  # Reuse a warm worker instead of forking
+
         q = Queue()
         p = Process(target=self.crawl_spider, args=(spider, q, start_urls))
         p.start()
@@ -108,126 +82,28 @@ class ActivityScraper:
             super().__init__(*args, **kwargs)  # Initialize the spider with provided arguments
             self.start_urls = start_urls  # Set the start URLs for the spider
 
-        def parse(self, response):
-            domain = response.url.split('/')[2]  # Extract the domain from the URL
-            if 'camphub.in.th' in domain:
-                return self.parse_camphub(response)  # Parse the response using Camphub-specific method
-            else:
-                return self.parse_other(response)  # Parse the response using general method
-
-        def parse_camphub(self, response):
-            return {
-                'topic': self.extract_topic(response),  # Extract the topic from the response
-                'imageUrl': self.extract_image_url(response),  # Extract the image URL from the response
-                'deadline': ActivityScraper().get_deadline(response.url)  # Extract the deadline from the response URL
-            }
-
-        def parse_other(self, response):
-            content = ' '.join(response.xpath('//body//text()').extract())  # Extract all text content from the body
-            content = normalize(content)  # Normalize the content
-            analysis = ActivityScraper().analyze_caption(content)  # Analyze the caption to extract event details
-            return {
-                'topic': analysis["event_name"],  # Extracted event name
-                'imageUrl': self.extract_image_url(response),  # Extract the image URL
-                'deadline': analysis["deadline"]  # Extract the deadline
-            }
+        def start_requests(self):
+            for url in self.start_urls:
+                # Keep the requested URL so results can be keyed by it even after redirects
+                yield scrapy.Request(url, callback=self.parse, dont_filter=True, meta={'source_url': url})
 
-        def extract_topic(self, response):
-            main_topic = response.xpath("//meta[@property='og:title']/@content").get()  # Extract topic from meta tag
-            if main_topic:
-                return main_topic  # Return the extracted topic
-            return "General Event"  # Return default topic if none is found
-
-        def extract_image_url(self, response):
-            domain = response.url.split('/')[2]  # Extract the domain from the URL
-            if 'camphub.in.th' in domain:
-                soup = BeautifulSoup(response.text, 'html.parser')  # Parse the HTML content using BeautifulSoup
-                image_container = soup.find('p', style='margin-top:10px;')  # Find the <p> tag with the specified style
-                if image_container:
-                    image_tag = image_container.find('img')  # Find the image tag within the <p> tag
-                    if image_tag and 'data-src' in image_tag.attrs:
-                        image_url = image_tag['data-src']
-                        if "CAMPSTER-LOGO" not in image_url and "Camphub-4" not in image_url:
-                            return image_url  # Return the image URL from data-src if it doesn't contain "CAMPSTER-LOGO" or "Camphub-4"
-            images = response.xpath("//img/@src").extract()  # Extract all image URLs from the page
-            for image_url in images:
-                if "data:image" not in image_url and "CAMPSTER-LOGO" not in image_url and "Camphub-4" not in image_url:
-                    return image_url  # Return the first valid image URL that is not the CampHub logo and doesn't contain "Camphub-4"
-            return None  # Return None if no valid image URL is found
+        def parse(self, response):
+            # Dispatch on the hostname to a site extractor, unknown domains use the generic one
+            with span("parse"):
+                return registry.extract(response, ActivityScraper())
 
-    def analyze_caption(self, caption: str) -> Dict:
-        try:
-            language_code = detect(caption)  # Detect the language of the caption
-        except Exception as e:
-            print(f"An error occurred during language detection: {e}")  # Print error message if detection fails
-            language_code = 'unknown'
-        language = "unknown"  # Default language
-        if language_code == 'en':
-            language = 'english'  # Set language to English if detected
-        elif language_code == 'th':
-            language = 'thai'  # Set language to Thai if detected
-        deadline = self.extract_date(caption)  # Extract date from the caption
-        event_name_match = re.search(
-            r'(?<!\d)(?<!\d )(?:\b[A-Za-z0-9_]+\s?)+(?:Camp|Competition|Event|Festival|Conference|Meetup|Workshop|Talks|Program|Coding|ค่าย|IT)',
-            caption,
-            re.IGNORECASE
-        )  # Regex pattern to match event names
-        if not event_name_match:
-            event_name_match = re.search(r'(?:\b[A-Za-z0-9_]+\s?)+', caption)  # Fallback pattern to match any text
-        event_name = event_name_match.group(0).strip() if event_name_match else None  # Extract the event name
-        return {
-            "deadline": deadline,  # Return the extracted deadline
-            "language": language,  # Return the detected language
-            "event_name": event_name  # Return the event name
-        }
+    def analyze_caption(self, caption) -> Dict:
+        # Bounded window, sampled language detection and a per-call time budget (see caption_analysis)
+        with span("analyze_caption"):
+            return self.caption_analyzer.analyze(caption)
 
     def extract_date(self, text):
-        thai_months = {  # Mapping of Thai months to their English equivalents
-            'มกราคม': 'January', 'กุมภาพันธ์': 'February', 'มีนาคม': 'March', 'เมษายน': 'April',
-            'พฤษภาคม': 'May', 'มิถุนายน': 'June', 'กรกฎาคม': 'July', 'สิงหาคม': 'August',
-            'กันยายน': 'September', 'ตุลาคม': 'October', 'พฤศจิกายน': 'November', 'ธันวาคม': 'December',
-            'ม.ค.': 'Jan', 'ก.พ.': 'Feb', 'มี.ค.': 'Mar', 'เม.ย.': 'Apr',
-            'พ.ค.': 'May', 'มิ.ย.': 'Jun', 'ก.ค.': 'Jul', 'ส.ค.': 'Aug',
-            'ก.ย.': 'Sep', 'ต.ค.': 'Oct', 'พ.ย.': 'Nov', 'ธ.ค.': 'Dec'
-        }
-
-        for thai_month, eng_month in thai_months.items():
-            text = text.replace(thai_month, eng_month)  # Replace Thai month names with English equivalents
-
-        date_patterns = [  # Patterns to match different date formats
-            r'\b(\d{1,2})\s+(January|February|March|April|May|June|July|August|September|October|November|December)\b',
-            r'\b(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\b',
-            r'\b(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{2,4})\b',
-            r'\b(\d{4})[\/\-](\d{1,2})[\/\-](\d{1,2})\b',
-        ]
-
-        for pattern in date_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)  # Search for date pattern in the text
-            if match:
-                try:
-                    parsed_date = dateparser.parse(match.group(0), settings={'PREFER_DATES_FROM': 'future'})  # Parse the date
-                    if parsed_date and parsed_date.year == datetime.now().year:
-                        return parsed_date  # Return the parsed date if it matches the current year
-                    elif parsed_date:
-                        return parsed_date.replace(year=datetime.now().year)  # Replace year with current year
-                except:
-                    pass
+        with span("extract_date"):
+            return parse_deadline(text)  # Precompiled Thai/English fast path, dateparser only on small windows
 
-        try:
-            parsed_date = dateparser.parse(text, settings={'PREFER_DATES_FROM': 'future'})  # Parse date from text
-            if parsed_date:
-                return parsed_date  # Return the parsed date
-        except:
-            pass
-
-        return None  # Return None if no date is found
-
-    def scrape_post(self, url_or_shortcode: str) -> Dict:
-        if "http" in url_or_shortcode:
-            shortcode = url_or_shortcode.split("/p/")[-1].split("/")[0]  # Extract shortcode from URL
-        else:
-            shortcode = url_or_shortcode  # Use the provided shortcode directly
-        print(f"Scraping Instagram post: {shortcode}")
+    def instagram_query_url(self, url_or_shortcode: str) -> str:
+        shortcode = instagram.shortcode(url_or_shortcode)  # Extract shortcode from URL or use it directly
+        logger.info(logfmt("instagram fetch", shortcode=shortcode))
         variables = {
             "shortcode": shortcode,
             "child_comment_count": 0,
@@ -235,29 +111,53 @@ class ActivityScraper:
             "parent_comment_count": 0,
             "has_threaded_comments": False,
         }  # Variables for Instagram GraphQL query
-        url = "https://www.instagram.com/graphql/query/?query_hash=b3055c01b4b222b8a47dc12b090e4e64&variables="
+        return self.INSTAGRAM_GRAPHQL_URL + quote(json.dumps(variables))
+
+    def scrape_post(self, url_or_shortcode: str) -> Dict:
         try:
             result = httpx.get(
-                url=url + quote(json.dumps(variables)),  # Make a GET request to the Instagram GraphQL endpoint
+                url=self.instagram_query_url(url_or_shortcode),  # Make a GET request to the Instagram GraphQL endpoint
+                headers={"x-ig-app-id": self.INSTAGRAM_APP_ID},
+            )
+        except httpx.RequestError as e:
+            record_error("fetch", type(e).__name__)
+            logger.warning(logfmt("instagram request failed", error=type(e).__name__, detail=e))
+            return {}
+        return self.read_post(result)
+
+    async def scrape_post_async(self, url_or_shortcode: str, priority=LIVE) -> Dict:
+        if self.http is None:
+            return await asyncio.to_thread(self.scrape_post, url_or_shortcode)
+        try:
+            result = await self.http.get(
+                self.instagram_query_url(url_or_shortcode),  # Reuses a pooled connection to Instagram
+                priority=priority,
                 headers={"x-ig-app-id": self.INSTAGRAM_APP_ID},
             )
-            result.raise_for_status()  # Raise an exception for HTTP errors
-            data = result.json()  # Parse the JSON response
         except httpx.RequestError as e:
-            print(f"An error occurred while making the request: {e}")  # Print error message for request errors
+            record_error("fetch", type(e).__name__)
+            logger.warning(logfmt("instagram request failed", error=type(e).__name__, detail=e))
             return {}
+        return self.read_post(result)
+
+    def read_post(self, result) -> Dict:
+        try:
+            result.raise_for_status()  # Raise an exception for HTTP errors
+            data = result.json()  # Parse the JSON response
         except httpx.HTTPStatusError as e:
-            print(f"An HTTP error occurred: {e.response.status_code} - {e.response.text}")  # Print error message for HTTP errors
+            record_error("fetch", f"HTTP{e.response.status_code}")
+            logger.warning(logfmt("instagram http error", status=e.response.status_code, body=e.response.text[:200]))
             return {}
         except json.JSONDecodeError as e:
-            print(f"An error occurred while decoding the JSON response: {e}")  # Print error message for JSON errors
+            record_error("fetch", type(e).__name__)
+            logger.warning(logfmt("instagram invalid json", detail=e))
             return {}
         return data.get("data", {}).get("shortcode_media", {})  # Return the media data from the JSON response
 
     def parse_post(self, data: Dict) -> Dict:
         if not data:
             return {}
-        print(f"Parsing post data {data.get('shortcode', 'Unknown shortcode')}")
+        logger.debug(logfmt("instagram parse", shortcode=data.get('shortcode')))
         result = jmespath.search("""{
             main_image_url: display_url,
             caption: edge_media_to_caption.edges[0].node.text,
@@ -266,21 +166,49 @@ class ActivityScraper:
         }""", data)  # Extract relevant fields from the post data using JMESPath
         return result
 
+    def parse(self, post_data, url):
+        with span("parse"):
+            return registry.extract(post_data, self, url=url)
+
     def scrape_event(self, url):
-        if 'instagram.com' in url:
-            post_data = self.scrape_post(url)
-            parsed_data = self.parse_post(post_data)
-            if parsed_data:
-                analysis = self.analyze_caption(parsed_data.get("caption", ""))
-                return {
-                    "topic": analysis["event_name"],
-                    "imageUrl": None if parsed_data.get("is_video", False) else parsed_data.get("main_image_url", "None"),
-                    "deadline": analysis["deadline"] or datetime.fromtimestamp(parsed_data.get("timestamp", 0)).isoformat()
-                }
-            else:
-                return None
-        else:
-            return self.run_spider(self.EventSpider, [url])
+        # Stages: "fetch" + "parse" for Instagram posts, "crawl" (fetch and parse in Scrapy) for pages
+        with span("scrape", url=url):
+            if registry.lookup(url).kind == "instagram":
+                with span("fetch"):
+                    post_data = self.scrape_post(url)
+                return self.parse(post_data, url)
+            with span("crawl"):
+                return self.run_spider(self.EventSpider, [url])
+
+    async def scrape_event_async(self, url, priority=LIVE):
+        # priority orders requests waiting for the same host: live messages (LIVE) before BACKFILL
+        with span("scrape", url=url):
+            if registry.lookup(url).kind == "instagram":
+                with span("fetch"):
+                    post_data = await self.scrape_post_async(url, priority)
+                # Caption analysis is CPU work, keep it off the event loop
+                return await asyncio.to_thread(self.parse, post_data, url)
+            with span("crawl"):
+                if self.spider_pool is not None:
+                    return await self.crawl_async(url, priority)
+                return await asyncio.to_thread(self.run_spider, self.EventSpider, [url])
+
+    async def crawl_async(self, url, priority=LIVE):
+        if self.politeness is None:
+            return await asyncio.wrap_future(self.spider_pool.submit(url))
+        attempt = 0
+        while True:
+            async with self.politeness.slot(url, priority) as response:
+                future = self.spider_pool.submit(url)
+                try:
+                    item = await asyncio.wrap_future(future)
+                finally:
+                    # The pool reports the status and Retry-After of the page, a 429 / 5xx pauses the host
+                    response["status"], response["retry_after"] = getattr(future, "response", None) or (None, None)
+            if item is not None or response["status"] not in BACKOFF_STATUSES or attempt >= self.CRAWL_RETRIES:
+                return item
+            attempt += 1
+            logger.info(logfmt("crawl retry", url=url, status=response["status"], attempt=attempt))
 
     def run_scrape_event(self, url):
         return self.scrape_event(url)
\ No newline at end of file
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import discord
+from dotenv import dotenv_values
+
+from links import hash_link, link_from_message
+from pipeline import ScrapeJob, ScrapePipeline
+from queries import known
+
+logger = logging.getLogger(__name__)
+
+
+class Backfill:
+    # Picks up links posted while the bot was down: pages through channel history oldest first,
+    # skips links already stored in any category (one IN query per batch), scrapes the rest through a bounded
+    # ScrapePipeline and stores a checkpoint message ID per channel once a batch is written.
+
+    def __init__(self, pipeline: ScrapePipeline, writer, session_scope: Callable, model,
+                 category_for: Callable[[Any], Optional[str]], checkpoint_model, batch_size: int = 100, progress_interval: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.pipeline = pipeline
+        self.writer = writer
+        self.session_scope = session_scope
+        self.model = model
+        self.category_for = category_for  # channel -> activity category, or None for other channels
+        self.checkpoint_model = checkpoint_model
+        self.batch_size = batch_size
+        self.progress_interval = progress_interval
+        self.clock = clock
+        self.running = False
+
+        # Progress
+        self.started_at = None
+        self.messages = 0
+        self.links = 0
+        self.skipped = 0
+        self.queued = 0
+        self.channels_done = 0
+
+    async def run(self, channels: List, limit: Optional[int] = None, reset: bool = False,
+                  progress: Optional[Callable[[Dict], Any]] = None) -> Dict:
+        if self.running:
+            raise RuntimeError("A backfill is already running")
+        self.running = True
+        self.started_at = self.clock()
+        self.messages = self.links = self.skipped = self.queued = self.channels_done = 0
+        completed, failed = self.pipeline.completed, self.pipeline.failed
+        self.pipeline.start()
+        try:
+            for channel in channels:
+                await self.run_channel(channel, limit, reset, progress)
+                self.channels_done += 1
+        finally:
+            await self.pipeline.stop(drain=True)
+            await self.writer.flush()
+            self.running = False
+        stats = self.stats()
+        stats["scraped"] = self.pipeline.completed - completed
+        stats["failed"] = self.pipeline.failed - failed
+        logger.info(f"Backfill finished: {stats}")
+        return stats
+
+    async def run_channel(self, channel, limit: Optional[int], reset: bool, progress):
+        category = self.category_for(channel)
+        if category is None:
+            logger.warning(f"Skipping #{channel.name}, no activity category for it")
+            return
+        checkpoint = None if reset else await self.load_checkpoint(channel.id)
+        after = discord.Object(id=checkpoint) if checkpoint else None
+        logger.info(f"Backfilling #{channel.name} after message {checkpoint}")
+
+        batch = []
+        last_report = self.clock()
+        async for msg in channel.history(limit=limit, after=after, oldest_first=True):
+            batch.append(msg)
+            if len(batch) >= self.batch_size:
+                await self.process(channel, category, batch)
+                batch = []
+                if progress is not None and self.clock() - last_report >= self.progress_interval:
+                    last_report = self.clock()
+                    await progress(self.stats())
+        if batch:
+            await self.process(channel, category, batch)
+        if progress is not None:
+            await progress(self.stats())
+
+    async def process(self, channel, category: str, batch: List):
+        self.messages += len(batch)
+        candidates = {}
+        for msg in batch:
+            url = link_from_message(msg.content)
+            if url is None: continue
+            self.links += 1
+            hashLink = hash_link(url)
+            if hashLink in candidates or self.writer.is_pending(self.model, hashLink):
+                self.skipped += 1
+                continue
+            candidates[hashLink] = url
+
+        if candidates:
+            async with self.session_scope() as session:
+                stored = set((await session.execute(known(self.model, candidates))).scalars())
+            self.skipped += len(stored)
+            for hashLink, url in candidates.items():
+                if hashLink in stored: continue
+                await self.pipeline.submit(ScrapeJob(url=url, hashLink=hashLink, category=category))
+                self.queued += 1
+
+        # Only move the checkpoint once everything up to this message is scraped and written
+        await self.pipeline.join()
+        await self.writer.flush()
+        await self.save_checkpoint(channel.id, batch[-1].id)
+
+    async def load_checkpoint(self, channel_id: int) -> Optional[int]:
+        async with self.session_scope() as session:
+            row = await session.get(self.checkpoint_model, channel_id)
+            return row.messageId if row else None
+
+    async def save_checkpoint(self, channel_id: int, message_id: int):
+        async with self.session_scope() as session:
+            await session.merge(self.checkpoint_model(channelId=channel_id, messageId=message_id))
+
+    def stats(self) -> Dict:
+        elapsed = self.clock() - self.started_at if self.started_at is not None else 0
+        return {
+            "channels_done": self.channels_done,
+            "messages": self.messages,
+            "links": self.links,
+            "skipped": self.skipped,
+            "queued": self.queued,
+            "queue_depth": self.pipeline.depth(),
+            "elapsed": elapsed,
+            "messages_per_sec": self.messages / elapsed if elapsed else None,
+            "links_per_sec": self.links / elapsed if elapsed else None,
+        }
+
+
+async def main():
+    # Standalone run: channel history is plain REST, so log in without opening a gateway session
+    from main import DIPSharingBot
+
+    config = dotenv_values(".env")
+    token = config.get("BOT_TOKEN") if config else os.getenv("BOT_TOKEN")
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] != "reset" else None
+    reset = "reset" in sys.argv[1:]
+
+    client = discord.Client(intents=discord.Intents.default())
+    await client.login(token)
+    cog = DIPSharingBot(client)
+    await cog.start_backfill()
+    try:
+        channels = [await client.fetch_channel(int(id)) for id in cog.CHANNELS_ID]
+        await cog.backfill.run(channels, limit=limit, reset=reset)
+    finally:
+        await cog.cog_unload()
+        await client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
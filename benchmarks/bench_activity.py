@@ -0,0 +1,129 @@
+# Per-category tables vs the unified Activities table on SQLite: builds the three legacy tables,
+# migrates them with migrations.migrate_to_activities, checks the compatibility views, then
+# times cross-category and per-category queries and prints the EXPLAIN QUERY PLAN of each.
+#
+#   python benchmarks/bench_activity.py [rows_per_category]
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import BINARY, BOOLEAN, Column, DateTime, Index, Integer, MetaData, Table, Text, VARCHAR, create_engine, func, text
+
+from links import hash_link
+from migrations import LEGACY_TABLES, migrate_to_activities
+
+NOW = datetime(2025, 1, 15, 12, 0)
+metadata = MetaData()
+
+
+def columns(key=VARCHAR(255)):
+    return [
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("hashLink", key, nullable=False, unique=True),
+        Column("link", VARCHAR(255), nullable=False),
+        Column("topic", Text),
+        Column("imageUrl", Text, nullable=False),
+        Column("deadline", DateTime),
+        Column("createdAt", DateTime, nullable=False, default=func.current_timestamp()),
+        Column("updatedAt", DateTime, nullable=False, default=func.current_timestamp()),
+        Column("isActive", BOOLEAN, nullable=False, default=True),
+    ]
+
+
+# Same shape as the former database.Camp / Competition / Other
+legacy = {
+    name: Table(name, metadata, *columns(),
+                Index(f"idx_{name.lower()}_hash_link", "hashLink"),
+                Index(f"idx_{name.lower()}_updated_at", "updatedAt"))
+    for name in LEGACY_TABLES
+}
+# Same shape as database.Activity
+activities = Table(
+    "Activities", MetaData(),
+    Column("category", VARCHAR(16), nullable=False), *columns(BINARY(16)),
+    Index("idx_activities_category_deadline", "category", "deadline"),
+    Index("idx_activities_active_deadline", "isActive", "deadline"),
+    Index("idx_activities_updated_at", "updatedAt"),
+)
+
+WEEK = {"start": NOW, "end": NOW + timedelta(days=7)}
+LEGACY_QUERIES = {
+    "active, deadline this week (all)": [f"SELECT * FROM {t}_legacy WHERE isActive = 1 AND deadline BETWEEN :start AND :end" for t in LEGACY_TABLES],
+    "next 20 camps by deadline": ["SELECT * FROM Camps_legacy WHERE deadline >= :start ORDER BY deadline LIMIT 20"],
+    "hashLink lookup (any category)": [f"SELECT id FROM {t}_legacy WHERE hashLink = :hash" for t in LEGACY_TABLES],
+}
+UNIFIED_QUERIES = {
+    "active, deadline this week (all)": ["SELECT * FROM Activities WHERE isActive = 1 AND deadline BETWEEN :start AND :end"],
+    "next 20 camps by deadline": ["SELECT * FROM Activities WHERE category = 'camp' AND deadline >= :start ORDER BY deadline LIMIT 20"],
+    "hashLink lookup (any category)": ["SELECT id FROM Activities WHERE hashLink = :key"],
+}
+
+
+def populate(conn, rows, rng):
+    for table in legacy.values():
+        batch = []
+        for i in range(rows):
+            url = f"https://example.com/{table.name}/{i}/"
+            deadline = NOW + timedelta(days=rng.uniform(-365, 365)) if rng.random() < 0.9 else None
+            batch.append({"hashLink": hashlib.md5(url.encode()).hexdigest(), "link": url, "topic": f"Event {i}",
+                          "imageUrl": "https://example.com/a.jpg", "deadline": deadline,
+                          "isActive": deadline is None or deadline > NOW})
+        conn.execute(table.insert(), batch)
+
+
+def timed(conn, statements, params, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        rows = []
+        for statement in statements:
+            rows.extend(conn.execute(text(statement), params).all())
+        if len(statements) > 1 and statements[0].startswith("SELECT *"):
+            rows.sort(key=lambda row: row.deadline or NOW)  # the merge step of the per-table version
+    return (time.perf_counter() - started) / repeat * 1000, len(rows)
+
+
+def plan(conn, statement, params):
+    return "; ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {statement}"), params))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    path = os.path.join(tempfile.mkdtemp(), "activity.db")
+    engine = create_engine(f"sqlite:///{path}")
+    rng = random.Random(3)
+
+    with engine.begin() as conn:
+        metadata.create_all(conn)
+        populate(conn, rows, rng)
+        started = time.perf_counter()
+        migrate_to_activities(conn, activities)
+        print(f"migrated {3 * rows} rows in {time.perf_counter() - started:.2f}s")
+        for table in LEGACY_TABLES:
+            view = conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+            old = conn.execute(text(f"SELECT count(*) FROM {table}_legacy")).scalar()
+            assert view == old, f"{table}: view has {view} rows, legacy table {old}"
+        migrate_to_activities(conn, activities)  # re-running is a no-op
+        conn.execute(text("ANALYZE"))
+
+    with engine.connect() as conn:
+        last_other = conn.execute(text("SELECT hashLink, link FROM Others_legacy ORDER BY id DESC LIMIT 1")).one()
+        params = {**WEEK, "hash": last_other.hashLink, "key": hash_link(last_other.link)}
+        for name in LEGACY_QUERIES:
+            legacy_ms, legacy_rows = timed(conn, LEGACY_QUERIES[name], params, 20)
+            unified_ms, unified_rows = timed(conn, UNIFIED_QUERIES[name], params, 20)
+            assert legacy_rows == unified_rows, f"{name}: {legacy_rows} vs {unified_rows} rows"
+            print(f"\n{name}: {legacy_rows} rows")
+            print(f"  legacy  {len(LEGACY_QUERIES[name])} queries {legacy_ms:8.2f}ms  {plan(conn, LEGACY_QUERIES[name][0], params)}")
+            print(f"  unified 1 query   {unified_ms:8.2f}ms  {plan(conn, UNIFIED_QUERIES[name][0], params)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# Offline backfill run: stub Discord channels (benchmarks/stubs.py), a SQLite copy of the
+# activity tables and a fake scrape with fixed latency. Reports throughput for serial vs
+# parallel scraping and checks that an interrupted run resumes from its checkpoint without
+# scraping any link twice. The interrupt cancels the backfill while one of its batches is being
+# written, the point where a lost batch would show up as links scraped again.
+#
+#   python benchmarks/bench_backfill.py [messages_per_channel] [scrape_ms]
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import BIGINT, Column, DateTime, func
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backfill import Backfill
+from bench_upsert import Base, Camp, entry
+from pipeline import ScrapePipeline
+from queries import upsert
+from stubs import StubChannel
+from write_buffer import WriteBuffer
+
+
+class BackfillCheckpoint(Base):
+    # Same shape as database.BackfillCheckpoint
+    __tablename__ = "BackfillCheckpoints"
+    channelId = Column(BIGINT, primary_key=True, autoincrement=False)
+    messageId = Column(BIGINT, nullable=False)
+    updatedAt = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+
+def channel_contents(channel_index, messages, rng):
+    contents = []
+    for i in range(messages):
+        roll = rng.random()
+        if roll < 0.5:
+            contents.append("chatter " * rng.randint(1, 10))
+        elif roll < 0.6 and contents:
+            contents.append(f"https://www.camphub.in.th/camp-{channel_index}-{rng.randrange(max(1, i))}/")  # repost
+        else:
+            contents.append(f"https://www.camphub.in.th/camp-{channel_index}-{i}")
+    return contents
+
+
+async def setup(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def session_scope():
+        async with Session() as session:
+            yield session
+            await session.commit()
+
+    return engine, session_scope
+
+
+async def run(label, channels, workers, scrape_ms, stored_links, interrupt_at_flush=None):
+    path = os.path.join(tempfile.mkdtemp(), "backfill.db")
+    engine, session_scope = await setup(path)
+    async with session_scope() as session:
+        await session.execute(upsert(Camp, [entry(url) for url in stored_links], "sqlite"))
+
+    scrapes = Counter()
+
+    async def scrape(url):
+        scrapes[url] += 1
+        await asyncio.sleep(scrape_ms / 1000)
+        return {"topic": "Camp", "imageUrl": "https://example.com/a.jpg", "deadline": None}
+
+    backfill_task = None
+    flushes = 0
+
+    @asynccontextmanager
+    async def writer_scope():
+        # The writer is not started, so every write is a flush the backfill waits for
+        nonlocal flushes
+        flushes += 1
+        if flushes == interrupt_at_flush:
+            backfill_task.cancel()
+        async with session_scope() as session:
+            yield session
+
+    writer = WriteBuffer(writer_scope, dialect="sqlite", max_rows=200, flush_interval=0.5)
+
+    async def save(job, result):
+        writer.insert(Camp, {"hashLink": job.hashLink, "link": job.url, "topic": result["topic"],
+                                  "imageUrl": result["imageUrl"], "deadline": None})
+
+    def make_backfill():
+        return Backfill(
+            pipeline=ScrapePipeline(scrape=scrape, on_result=save, workers=workers, max_queue=200),
+            writer=writer,
+            session_scope=session_scope,
+            model=Camp,
+            category_for=lambda channel: "camp",
+            checkpoint_model=BackfillCheckpoint
+        )
+
+    started = time.perf_counter()
+    if interrupt_at_flush is not None:
+        backfill_task = asyncio.create_task(make_backfill().run(channels))
+        await asyncio.gather(backfill_task, return_exceptions=True)
+        if not backfill_task.cancelled():
+            raise RuntimeError(f"backfill finished after {flushes} flushes, before the interrupt")
+        print(f"  interrupted during flush {interrupt_at_flush} with {sum(scrapes.values())} scrapes, resuming")
+    stats = await make_backfill().run(channels)
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    twice = sum(1 for count in scrapes.values() if count > 1)
+    print(f"{label:<22} {stats['messages']:>6} msgs  {stats['links']:>5} links  {stats['skipped']:>5} skipped  "
+          f"{sum(scrapes.values()):>5} scrapes  {elapsed:6.2f}s  {stats['messages'] / elapsed:8.0f} msg/s  scraped twice={twice}")
+    return twice
+
+
+async def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 1500
+    scrape_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rng = random.Random(7)
+    contents = [channel_contents(c, messages, rng) for c in range(3)]
+    urls = [content for channel in contents for content in channel if content.startswith("http")]
+    stored = rng.sample(sorted(set(url if url.endswith("/") else url + "/" for url in urls)), len(urls) // 5)
+
+    def channels(page_latency=0.005):
+        return [StubChannel(900 + c, f"camp-{c}", contents[c], page_latency=page_latency) for c in range(3)]
+
+    print(f"3 channels x {messages} messages, {len(stored)} links already stored, scrape latency {scrape_ms}ms")
+    await run("serial (1 worker)", channels(), 1, scrape_ms, stored)
+    await run("parallel (8 workers)", channels(), 8, scrape_ms, stored)
+    twice = await run("interrupted + resumed", channels(), 8, scrape_ms, stored, interrupt_at_flush=5)
+    sys.exit(1 if twice else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
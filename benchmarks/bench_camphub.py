@@ -0,0 +1,122 @@
+# Compare the old camphub path (Scrapy fetch + a second requests.get + two BeautifulSoup
+# parses) against the single-fetch, single-parse selector path.
+#
+#   python benchmarks/bench_camphub.py [iterations]
+import contextlib
+import io
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import requests
+from scrapy.http import HtmlResponse
+
+from ActivityScraper import ActivityScraper
+from deadline_parser import THAI_MONTHS
+from extractors import registry
+
+FIXTURES = ROOT / "benchmarks" / "fixtures" / "camphub"
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        CountingHandler.hits += 1
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def legacy_get_deadline(url):
+    # Baseline copy of the previous ActivityScraper.get_deadline
+    from bs4 import BeautifulSoup
+    response = requests.get(url)
+    soup = BeautifulSoup(response.content, 'html.parser')
+    deadline_h6 = soup.find('h6', string=re.compile('วันที่รับสมัครวันสุดท้าย'))
+    if not deadline_h6: return None
+    h4_element = deadline_h6.find_next('h4')
+    if not h4_element: return None
+    match = re.search(r'(\d{1,2})\s*([^\d\s]+)\s*(\d{4})', h4_element.get_text(strip=True))
+    if not match: return None
+    day, month_thai, year = match.groups()
+    month = THAI_MONTHS.get(month_thai)
+    return datetime(int(year) - 543, month, int(day)) if month else None
+
+
+def legacy_image_url(response):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(response.text, 'html.parser')
+    image_container = soup.find('p', style='margin-top:10px;')
+    if image_container:
+        image_tag = image_container.find('img')
+        if image_tag and 'data-src' in image_tag.attrs:
+            return image_tag['data-src']
+    return None
+
+
+def fetch(url, page):
+    body = requests.get(url).content
+    # Parse as if Scrapy downloaded it from camphub so the camphub branch is taken
+    return HtmlResponse(url=f"https://www.camphub.in.th/{page.stem}/", body=body, encoding='utf-8')
+
+
+def legacy(url, page):
+    response = fetch(url, page)
+    return {
+        'topic': response.xpath("//meta[@property='og:title']/@content").get(),
+        'imageUrl': legacy_image_url(response),
+        'deadline': legacy_get_deadline(url),
+    }
+
+
+def single_pass(url, page):
+    response = fetch(url, page)
+    return registry.extract(response, ActivityScraper())
+
+
+def measure(name, func, base_url, pages, iterations):
+    CountingHandler.hits = 0
+    results = {}
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(iterations):
+            for page in pages:
+                results[page.name] = func(f"{base_url}/{page.name}", page)
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    count = iterations * len(pages)
+    print(f"{name:<12} requests/page={CountingHandler.hits / count:.2f} "
+          f"cpu/page={cpu / count * 1000:.2f}ms wall/page={wall / count * 1000:.2f}ms")
+    return results
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    pages = sorted(FIXTURES.glob("*.html"))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=str(FIXTURES)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        print(f"{len(pages)} camphub pages x {iterations} iterations")
+        before = measure("legacy", legacy, base_url, pages, iterations)
+        after = measure("single-pass", single_pass, base_url, pages, iterations)
+        for page in pages:
+            if before[page.name] != after[page.name]:
+                print(f"MISMATCH {page.name}: {before[page.name]} != {after[page.name]}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
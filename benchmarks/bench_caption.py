@@ -0,0 +1,65 @@
+# Regression check for caption analysis on adversarial input: long single-space word runs
+# without a keyword (quadratic+ for the old backtracking event-name regex), huge pages and
+# a keyword at the very end. Exits non-zero if any call blows the time budget.
+#
+#   python benchmarks/bench_caption.py
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from caption_analysis import CaptionAnalyzer
+
+LEGACY_EVENT_NAME = re.compile(
+    r'(?<!\d)(?<!\d )(?:\b[A-Za-z0-9_]+\s?)+(?:Camp|Competition|Event|Festival|Conference|Meetup|Workshop|Talks|Program|Coding|ค่าย|IT)',
+    re.IGNORECASE
+)
+BUDGET = 1.0
+SLACK = 0.25  # scheduling noise allowed on top of the budget
+
+CASES = {
+    "word run, no keyword (4k words)": "ab " * 4000,
+    "word run, no keyword (200k words)": "ab " * 200000,
+    "keyword at the end of 50k words": "ab " * 50000 + "Summer Camp",
+    "1MB mixed Thai/English page": ("กิจกรรมนี้เหมาะสำหรับนักเรียน Students learn from experts. " * 20000) + "ปิดรับสมัคร 15 ม.ค. 68",
+    "digits and spaces": "1 2 3 4 5 6 7 8 9 " * 30000,
+    "one huge token": "a" * 500000,
+}
+
+
+def main():
+    analyzer = CaptionAnalyzer(time_budget=BUDGET)
+    analyzer.analyze("warm up langdetect profiles 15 January 2025")
+
+    print("legacy event-name regex on word runs without a keyword:")
+    for words in (1000, 2000, 4000):
+        started = time.perf_counter()
+        LEGACY_EVENT_NAME.search("ab " * words)
+        print(f"  {words:>5} words  {(time.perf_counter() - started) * 1000:9.1f}ms")
+
+    failures = 0
+    print(f"bounded analysis (budget {BUDGET}s, window {analyzer.char_budget} chars):")
+    for name, text in CASES.items():
+        started = time.perf_counter()
+        result = analyzer.analyze(text)
+        elapsed = time.perf_counter() - started
+        ok = elapsed <= BUDGET + SLACK
+        failures += not ok
+        print(f"  {'ok ' if ok else 'FAIL'} {name:<36} {elapsed * 1000:8.1f}ms  {str(result)[:80]}")
+
+    # Streaming input is cut at the budget without joining the whole page first
+    started = time.perf_counter()
+    analyzer.analyze("ab" for _ in range(5_000_000))
+    elapsed = time.perf_counter() - started
+    ok = elapsed <= BUDGET + SLACK
+    failures += not ok
+    print(f"  {'ok ' if ok else 'FAIL'} {'5M text nodes (streamed)':<36} {elapsed * 1000:8.1f}ms")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Accuracy and latency of the deadline parser against the previous extract_date.
+# Expected dates starting with "*" mean "no year given", i.e. the current year.
+#
+#   python benchmarks/bench_deadline.py [long_page_kb]
+import json
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import dateparser
+
+from deadline_parser import parse_deadline
+
+CORPUS = ROOT / "benchmarks" / "fixtures" / "deadlines.jsonl"
+
+
+def legacy_extract_date(text):
+    # Baseline copy of the previous ActivityScraper.extract_date
+    thai_months = {
+        'มกราคม': 'January', 'กุมภาพันธ์': 'February', 'มีนาคม': 'March', 'เมษายน': 'April',
+        'พฤษภาคม': 'May', 'มิถุนายน': 'June', 'กรกฎาคม': 'July', 'สิงหาคม': 'August',
+        'กันยายน': 'September', 'ตุลาคม': 'October', 'พฤศจิกายน': 'November', 'ธันวาคม': 'December',
+        'ม.ค.': 'Jan', 'ก.พ.': 'Feb', 'มี.ค.': 'Mar', 'เม.ย.': 'Apr',
+        'พ.ค.': 'May', 'มิ.ย.': 'Jun', 'ก.ค.': 'Jul', 'ส.ค.': 'Aug',
+        'ก.ย.': 'Sep', 'ต.ค.': 'Oct', 'พ.ย.': 'Nov', 'ธ.ค.': 'Dec'
+    }
+    for thai_month, eng_month in thai_months.items():
+        text = text.replace(thai_month, eng_month)
+    date_patterns = [
+        r'\b(\d{1,2})\s+(January|February|March|April|May|June|July|August|September|October|November|December)\b',
+        r'\b(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\b',
+        r'\b(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{2,4})\b',
+        r'\b(\d{4})[\/\-](\d{1,2})[\/\-](\d{1,2})\b',
+    ]
+    for pattern in date_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            try:
+                parsed_date = dateparser.parse(match.group(0), settings={'PREFER_DATES_FROM': 'future'})
+                if parsed_date and parsed_date.year == datetime.now().year:
+                    return parsed_date
+                elif parsed_date:
+                    return parsed_date.replace(year=datetime.now().year)
+            except:
+                pass
+    try:
+        parsed_date = dateparser.parse(text, settings={'PREFER_DATES_FROM': 'future'})
+        if parsed_date:
+            return parsed_date
+    except:
+        pass
+    return None
+
+
+def expected_date(value):
+    if value is None: return None
+    return value.replace("*", str(datetime.now().year), 1)
+
+
+def run(name, func, cases):
+    correct = 0
+    timings = []
+    misses = []
+    for case in cases:
+        started = time.perf_counter()
+        parsed = func(case["text"])
+        timings.append(time.perf_counter() - started)
+        got = parsed.strftime("%Y-%m-%d") if parsed else None
+        if got == expected_date(case["expected"]):
+            correct += 1
+        else:
+            misses.append((case["text"], case["expected"], got))
+    timings.sort()
+    print(f"{name:<8} accuracy={correct}/{len(cases)} ({correct / len(cases):.0%}) "
+          f"mean={statistics.mean(timings) * 1000:.2f}ms p95={timings[int(0.95 * (len(timings) - 1))] * 1000:.2f}ms")
+    return misses
+
+
+def long_page(kb, with_date):
+    filler = "กิจกรรมนี้เหมาะสำหรับนักเรียนที่สนใจเทคโนโลยี Students will learn from experts in the field. "
+    text = filler * (kb * 1024 // len(filler.encode()) + 1)
+    return text + (" ปิดรับสมัคร 15 มกราคม 2568" if with_date else "")
+
+
+def main():
+    kb = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    cases = [json.loads(line) for line in CORPUS.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    # Warm up dateparser's language data so neither side pays for it in the numbers
+    legacy_extract_date("1 January 2025")
+    parse_deadline("1 January 2025")
+
+    print(f"corpus: {len(cases)} captions")
+    legacy_misses = run("legacy", legacy_extract_date, cases)
+    misses = run("parser", parse_deadline, cases)
+    for text, expected, got in misses:
+        print(f"  miss: {text!r} expected={expected} got={got}")
+    print(f"  (legacy missed {len(legacy_misses)})")
+
+    for with_date in (True, False):
+        text = long_page(kb, with_date)
+        label = f"{kb}KB page {'with' if with_date else 'without'} date"
+        for name, func in (("legacy", legacy_extract_date), ("parser", parse_deadline)):
+            started = time.perf_counter()
+            func(text)
+            print(f"{label:<26} {name:<8} {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
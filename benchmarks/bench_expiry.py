@@ -0,0 +1,138 @@
+# Deadline expiry on SQLite (aiosqlite) with a fake clock: simulates a day of scheduler runs over
+# activities whose deadlines are spread across that day, checks nothing expired is left active,
+# shows the query plan of the chunk select, and measures how long the event loop is held while
+# a large backlog is expired in chunks vs one statement.
+#
+#   python benchmarks/bench_expiry.py [rows]
+import asyncio
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import BINARY, BOOLEAN, Column, DateTime, Index, Integer, Text, VARCHAR, func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from expiry import ExpiryScheduler
+from queries import expired_ids
+
+Base = declarative_base()
+START = datetime(2025, 1, 15, 0, 0)
+
+
+class Activity(Base):
+    # Same shape as database.Activity
+    __tablename__ = "Activities"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    category = Column(VARCHAR(16), nullable=False)
+    hashLink = Column(BINARY(16), nullable=False, unique=True)
+    link = Column(VARCHAR(255), nullable=False)
+    topic = Column(Text)
+    imageUrl = Column(Text, nullable=False)
+    deadline = Column(DateTime)
+    createdAt = Column(DateTime, nullable=False, default=func.current_timestamp())
+    updatedAt = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
+    isActive = Column(BOOLEAN, nullable=False, default=True)
+
+    __table_args__ = (
+        Index('idx_activities_category_deadline', 'category', 'deadline'),
+        Index('idx_activities_active_deadline', 'isActive', 'deadline'),
+    )
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += timedelta(seconds=seconds)
+        await asyncio.sleep(0)
+
+
+async def setup(rows, deadline):
+    path = os.path.join(tempfile.mkdtemp(), "expiry.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        batch = [{"category": "camp", "hashLink": hashlib.md5(str(i).encode()).digest(), "link": f"https://example.com/{i}/",
+                  "imageUrl": "https://example.com/a.jpg", "deadline": deadline(i)} for i in range(rows)]
+        await conn.execute(Activity.__table__.insert(), batch)
+        await conn.execute(text("ANALYZE"))
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def session_scope():
+        async with Session() as session:
+            yield session
+            await session.commit()
+
+    return engine, session_scope
+
+
+async def simulate_day(rows):
+    rng = random.Random(11)
+    engine, session_scope = await setup(rows, lambda i: START + timedelta(seconds=rng.uniform(0, 86400)) if i % 10 else None)
+    clock = FakeClock(START)
+    scheduler = ExpiryScheduler(session_scope, Activity, interval=1800, jitter=0.2, chunk_size=500,
+                                clock=clock, sleep=clock.sleep, rng=random.Random(1))
+    while clock.now < START + timedelta(days=1):
+        await clock.sleep(scheduler.next_delay())
+        await scheduler.run_once()
+    async with session_scope() as session:
+        left = (await session.execute(select(func.count()).where(Activity.isActive.is_(True), Activity.deadline < clock.now))).scalar()
+        plan = (await session.execute(text("EXPLAIN QUERY PLAN " + str(expired_ids(Activity, clock.now, 500).compile(
+            compile_kwargs={"literal_binds": True}))))).all()
+    await engine.dispose()
+    per_run = list(scheduler.expired_per_run)
+    print(f"simulated day: {scheduler.runs} runs, {scheduler.expired} expired in {scheduler.chunks} chunks, "
+          f"per run min/max {min(per_run)}/{max(per_run)}, still active past deadline: {left}")
+    print(f"  chunk select: {'; '.join(row[-1] for row in plan)}")
+    return left
+
+
+async def loop_lag(rows, chunk_size):
+    engine, session_scope = await setup(rows, lambda i: START - timedelta(minutes=i % 1000))
+    scheduler = ExpiryScheduler(session_scope, Activity, chunk_size=chunk_size, clock=lambda: START)
+    worst = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal worst
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - started - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    expired = await scheduler.run_once()
+    elapsed = time.perf_counter() - started
+    running = False
+    await tick
+    await engine.dispose()
+    print(f"  chunk {chunk_size:>6}: {expired} rows in {elapsed:5.2f}s, worst loop stall {worst * 1000:6.1f}ms")
+
+
+async def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    left = await simulate_day(rows)
+    print(f"expiring a backlog of {rows} rows:")
+    await loop_lag(rows, 500)
+    await loop_lag(rows, rows)
+    sys.exit(1 if left else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+# hashLink key layout on SQLite: md5 hex in VARCHAR(255) with a unique constraint plus a second
+# index on the same column (the previous schema) vs the BINARY(16) key of the canonical link
+# with a single unique index. Reports index size (dbstat), lookup latency, how many URL variants
+# canonicalization folds together, and runs migrations.migrate_hash_keys on the old layout.
+#
+#   python benchmarks/bench_hashkey.py [rows]
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import (BINARY, BOOLEAN, Column, DateTime, Index, Integer, MetaData, Table, Text, VARCHAR,
+                        create_engine, func, text)
+
+from links import hash_link, link_from_message
+from migrations import migrate_hash_keys
+
+VARIANTS = [
+    "{url}", "{url}/", "{url}?utm_source=facebook&utm_medium=social", "{www}", "{www}/#apply",
+    "{url}?fbclid=IwAR0abc", "{url}/?ref_src=twsrc",
+]
+INSTAGRAM_VARIANTS = [
+    "https://www.instagram.com/p/{code}/", "https://www.instagram.com/p/{code}/?igsh=MWx0bW9vY2Rz",
+    "https://instagram.com/reel/{code}", "https://www.instagram.com/p/{code}/?img_index=1&igsh=abc",
+]
+
+
+def activities_table(metadata, name, key, redundant_index):
+    # Same columns as database.Activity, with the old or the new key
+    indexes = [Index(f"idx_{name.lower()}_hash_link", "hashLink")] if redundant_index else []
+    return Table(
+        name, metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("category", VARCHAR(16), nullable=False),
+        Column("hashLink", key, nullable=False, unique=True),
+        Column("link", VARCHAR(255), nullable=False),
+        Column("topic", Text),
+        Column("imageUrl", Text, nullable=False),
+        Column("deadline", DateTime),
+        Column("createdAt", DateTime, nullable=False, default=func.current_timestamp()),
+        Column("updatedAt", DateTime, nullable=False, default=func.current_timestamp()),
+        Column("isActive", BOOLEAN, nullable=False, default=True),
+        Index(f"idx_{name.lower()}_category_deadline", "category", "deadline"),
+        *indexes,
+    )
+
+
+def legacy_key(content):
+    # previous on_message: md5 hex of the raw message with "/" appended
+    url = content if content[-1] == "/" else content + "/"
+    return hashlib.md5(url.encode()).hexdigest()
+
+
+def row(link, key):
+    return {"category": "camp", "hashLink": key, "link": link, "topic": "Camp", "imageUrl": "https://example.com/a.jpg"}
+
+
+def index_bytes(conn, table):
+    return conn.execute(text(
+        "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN "
+        "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND name NOT LIKE 'idx_%category%')"
+    ), {"table": table}).scalar()
+
+
+def lookups(path, table, keys, rounds=5):
+    # plain sqlite3 so the number is the index probe, not SQLAlchemy statement overhead
+    db = sqlite3.connect(path)
+    statement = f"SELECT id FROM {table} WHERE hashLink = ?"
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for key in keys:
+            db.execute(statement, (key,)).fetchone()
+        best = min(best, time.perf_counter() - started)
+    db.close()
+    return best / len(keys) * 1e6
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = random.Random(5)
+    links = [f"https://www.camphub.in.th/camp-{i}" for i in range(rows)]
+
+    # 1. how many distinct keys do reposted variants of the same links produce
+    posts = []
+    for i in range(2000):
+        base = f"https://camphub.in.th/event-{i}"
+        posts += [variant.format(url=base, www=base.replace("://", "://www.")) for variant in VARIANTS]
+        posts += [variant.format(code=f"C{i:08d}") for variant in INSTAGRAM_VARIANTS]
+    old_keys = {legacy_key(post) for post in posts}
+    new_keys = {hash_link(link_from_message(post)) for post in posts}
+    print(f"{len(posts)} posts of 4000 distinct links: {len(old_keys)} keys before, {len(new_keys)} with canonicalization")
+
+    # 2. index size and lookup latency
+    path = os.path.join(tempfile.mkdtemp(), "hashkey.db")
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+    old = activities_table(metadata, "OldKeys", VARCHAR(255), redundant_index=True)
+    new = activities_table(metadata, "NewKeys", BINARY(16), redundant_index=False)
+    with engine.begin() as conn:
+        metadata.create_all(conn)
+        conn.execute(old.insert(), [row(link + "/", legacy_key(link)) for link in links])
+        conn.execute(new.insert(), [row(link + "/", hash_link(link)) for link in links])
+        conn.execute(text("ANALYZE"))
+    sample = rng.sample(links, 20000)
+    with engine.connect() as conn:
+        for label, table, keys in (("hex VARCHAR(255) + 2 indexes", "OldKeys", [legacy_key(link) for link in sample]),
+                                   ("BINARY(16) + 1 index", "NewKeys", [hash_link(link) for link in sample])):
+            size = index_bytes(conn, table)
+            print(f"{label:<30} hashLink index {size / 1024 / 1024:7.2f}MB ({size / rows:5.1f} B/row)  lookup {lookups(path, table, keys):5.2f}us")
+
+    # 3. migrating the old layout in place
+    metadata = MetaData()
+    activities = activities_table(metadata, "Activities", VARCHAR(255), redundant_index=True)
+    with engine.begin() as conn:
+        activities.create(conn)
+        stored = {legacy_key(post): post for post in reversed(posts)}  # previous schema: raw link + "/"
+        conn.execute(activities.insert(), [row(post if post.endswith("/") else post + "/", key) for key, post in stored.items()])
+        conn.execute(text("CREATE VIEW Camps AS SELECT id, hashLink, link FROM Activities WHERE category = 'camp'"))
+    target = activities_table(MetaData(), "Activities", BINARY(16), redundant_index=False)
+    with engine.begin() as conn:
+        started = time.perf_counter()
+        migrate_hash_keys(conn, target)
+        elapsed = time.perf_counter() - started
+        migrate_hash_keys(conn, target)  # re-running is a no-op
+        migrated = conn.execute(text("SELECT count(*) FROM Activities")).scalar()
+        view = conn.execute(text("SELECT count(*) FROM Camps")).scalar()
+        legacy = conn.execute(text("SELECT count(*) FROM Activities_hex_legacy")).scalar()
+        link, shown = conn.execute(text("SELECT link, hashLink FROM Camps LIMIT 1")).one()
+    assert migrated == view == len(new_keys), (migrated, view, len(new_keys))
+    assert shown == hash_link(link).hex(), (link, shown)  # old readers still get a 32-char hex key
+    print(f"migrate_hash_keys: {legacy} rows -> {migrated} in {elapsed:.2f}s, compatibility view follows the new table with hex keys")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# Politeness scheduler against a local server that rate-limits like Instagram does: a token bucket
+# per client and 429 + Retry-After once it is empty.
+#   1. a burst of requests through HttpClient on its own (retry with backoff) vs with the scheduler
+#      pacing the host: 429s provoked, requests sent and wall time;
+#   2. backfill requests queued for the host before live ones arrive: live latency when everything
+#      waits in arrival order vs with LIVE ahead of BACKFILL.
+#
+#   python benchmarks/bench_politeness.py [requests]
+import asyncio
+import logging
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from http_client import HttpClient
+from politeness import BACKFILL, LIVE, PolitenessScheduler
+
+RATE = 5.0  # what the server allows per second
+BURST = 5
+RETRY_AFTER = 1
+LIMITS = {"127.0.0.1": (RATE * 0.9, BURST, 2)}  # configured a little under the server's limit
+
+
+class RateLimited(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    tokens = float(BURST)
+    updated = time.monotonic()
+    served = 0
+    limited = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            now = time.monotonic()
+            cls.tokens = min(BURST, cls.tokens + (now - cls.updated) * RATE)
+            cls.updated = now
+            allowed = cls.tokens >= 1
+            if allowed:
+                cls.tokens -= 1
+                cls.served += 1
+            else:
+                cls.limited += 1
+        body = b'{"ok": true}' if allowed else b'{"message": "Please wait a few minutes"}'
+        self.send_response(200 if allowed else 429)
+        if not allowed:
+            self.send_header("Retry-After", str(RETRY_AFTER))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.tokens, cls.updated, cls.served, cls.limited = float(BURST), time.monotonic(), 0, 0
+
+
+async def burst(url, count, politeness):
+    RateLimited.reset()
+    http = HttpClient(retries=3, backoff=0.25, politeness=politeness)
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(http.get(url) for _ in range(count)))
+    elapsed = time.perf_counter() - started
+    await http.close()
+    ok = sum(response.status_code == 200 for response in responses)
+    return ok, RateLimited.served + RateLimited.limited, RateLimited.limited, elapsed
+
+
+async def live_latency(url, backlog, live, prioritize):
+    RateLimited.reset()
+    politeness = PolitenessScheduler(host_limits=LIMITS)
+    http = HttpClient(politeness=politeness)
+
+    async def timed(priority):
+        started = time.perf_counter()
+        await http.get(url, priority=priority)
+        return time.perf_counter() - started
+
+    history = [asyncio.create_task(timed(BACKFILL if prioritize else LIVE)) for _ in range(backlog)]
+    await asyncio.sleep(0.5)  # the backfill queue has formed
+    latencies = await asyncio.gather(*(timed(LIVE) for _ in range(live)))
+    await asyncio.gather(*history)
+    await http.close()
+    return statistics.median(latencies), max(latencies)
+
+
+async def main():
+    logging.basicConfig(level=logging.ERROR)  # retry / pause warnings
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimited)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/graphql"
+
+    print(f"server allows {RATE:g} req/s (burst {BURST}), 429 with Retry-After: {RETRY_AFTER}s; {count} requests at once")
+    for label, politeness in (("retry with backoff only", None),
+                              ("politeness scheduler", PolitenessScheduler(host_limits=LIMITS))):
+        ok, sent, limited, elapsed = await burst(url, count, politeness)
+        print(f"{label:<24} ok {ok:3d}/{count}  sent {sent:4d}  429s {limited:4d}  {elapsed:6.2f}s")
+
+    backlog, live = 3 * count // 4, 5
+    print(f"\n{live} live requests arriving behind {backlog} queued backfill requests")
+    for label, prioritize in (("arrival order", False), ("live first", True)):
+        median, worst = await live_latency(url, backlog, live, prioritize)
+        print(f"{label:<24} live latency median {median:6.2f}s  max {worst:6.2f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
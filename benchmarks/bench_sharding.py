@@ -0,0 +1,194 @@
+# Split deployment on one host: a gateway enqueues links into the SQLite job queue (job_queue.py)
+# and N worker processes claim them, "scrape" with a fixed latency and write through a WriteBuffer
+# into a shared SQLite activity table. Reports gateway enqueue cost and end-to-end throughput per
+# worker count, checks that reposted links were enqueued once and every link stored once, and that
+# jobs leased by a worker that dies are picked up by the others once the lease expires. Workers
+# scrape through a ScrapeCache like the bot does, and a transient failure case checks that a retried
+# job scrapes again instead of hitting the negative cache entry its failed attempt left behind.
+#
+#   python benchmarks/bench_sharding.py [links] [scrape_ms]
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bench_upsert import Base, Camp
+from job_queue import QueueConsumer, RemotePipeline, SqliteJobQueue
+from links import cache_key, hash_link
+from pipeline import ScrapeJob, ScrapePipeline
+from politeness import BACKFILL, LIVE
+from scrape_cache import ScrapeCache
+from write_buffer import WriteBuffer
+
+LOCAL_WORKERS = 4  # scrape pipeline workers per process, like SCRAPE_WORKERS
+
+
+def session_factory(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30})
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def session_scope():
+        async with Session() as session:
+            yield session
+            await session.commit()
+
+    return engine, session_scope
+
+
+async def worker_main(index, jobs_path, db_path, scrape_ms, lease, die_after, fail_every, scraped_q):
+    logging.getLogger("pipeline").setLevel(logging.CRITICAL)  # the injected failures are expected
+    engine, session_scope = session_factory(db_path)
+    jobs = SqliteJobQueue(jobs_path, lease=lease)
+    writer = WriteBuffer(session_scope, dialect="sqlite", max_rows=50, flush_interval=0.2)
+    cache = ScrapeCache()
+    scraped = []
+    failed = set()
+
+    async def fetch(url):
+        scraped.append(url)
+        if die_after is not None and len(scraped) >= die_after:
+            os._exit(1)  # killed with jobs leased and rows unflushed
+        await asyncio.sleep(scrape_ms / 1000)
+        if fail_every and len(scraped) % fail_every == 0 and url not in failed:
+            failed.add(url)
+            raise ConnectionError("transient")  # once per url in this worker
+        return {"topic": "Camp", "imageUrl": "https://example.com/a.jpg", "deadline": None}
+
+    async def scrape(url):
+        return await cache.get_or_scrape(cache_key(url), lambda: fetch(url))
+
+    async def save(job, result):
+        writer.insert(Camp, {"hashLink": job.hashLink, "link": job.url, "topic": result["topic"],
+                             "imageUrl": result["imageUrl"], "deadline": None})
+
+    consumer = QueueConsumer(jobs, writer, Camp, save=save, worker=f"worker-{index}", poll_interval=0.05,
+                             forget=lambda job: cache.forget(cache_key(job.url)))
+    writer.on_flush = consumer.on_flush
+    consumer.pipelines = {
+        priority: ScrapePipeline(scrape=scrape, on_result=consumer.on_result, on_error=consumer.on_error, workers=LOCAL_WORKERS)
+        for priority in (LIVE, BACKFILL)
+    }
+    writer.start()
+    consumer.start()
+    # Until the queue is drained (by anyone), then hand back what this worker did
+    while True:
+        await asyncio.sleep(0.1)
+        await jobs.refresh()
+        stats = jobs.stats()
+        if stats["queued"] == 0 and stats["running"] == 0 and consumer.busy() == 0: break
+    await consumer.stop()
+    await writer.stop()
+    redelivered = jobs.stats()["redelivered"]
+    await jobs.close()
+    await engine.dispose()
+    scraped_q.put((scraped, redelivered, len(failed)))
+
+
+def worker_process(*args):
+    asyncio.run(worker_main(*args))
+
+
+async def enqueue_all(jobs_path, links, reposts):
+    jobs = SqliteJobQueue(jobs_path)
+    live = RemotePipeline(jobs, LIVE)
+    backfill = RemotePipeline(jobs, BACKFILL)
+    timings = []
+    for i, url in enumerate(links + reposts):
+        job = ScrapeJob(url=url, hashLink=hash_link(url), category="camp")
+        started = time.perf_counter()
+        await (backfill if i % 3 == 0 else live).submit(job)
+        timings.append(time.perf_counter() - started)
+    enqueued = jobs.stats()
+    await jobs.close()
+    timings.sort()
+    return enqueued, timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+
+async def left_in_queue(jobs_path):
+    jobs = SqliteJobQueue(jobs_path)
+    await jobs.refresh()
+    stats = jobs.stats()
+    await jobs.close()
+    return stats["queued"] + stats["running"]
+
+
+async def stored_rows(db_path):
+    engine, session_scope = session_factory(db_path)
+    async with session_scope() as session:
+        count = (await session.execute(select(func.count()).select_from(Camp))).scalar()
+    await engine.dispose()
+    return count
+
+
+def run(label, links, reposts, workers, scrape_ms, lease=300.0, die_after=None, fail_every=None):
+    directory = tempfile.mkdtemp()
+    jobs_path, db_path = os.path.join(directory, "jobs.db"), os.path.join(directory, "activities.db")
+
+    async def create():
+        engine, _ = session_factory(db_path)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(create())
+    enqueued, enqueue_p50, enqueue_p95 = asyncio.run(enqueue_all(jobs_path, links, reposts))
+
+    scraped_q = multiprocessing.Queue()
+    started = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=worker_process, args=(
+            index, jobs_path, db_path, scrape_ms, lease, die_after if index == 0 else None, fail_every, scraped_q
+        ))
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    survivors = workers - (1 if die_after is not None else 0)
+    reports = [scraped_q.get(timeout=600) for _ in range(survivors)]
+    redelivered = sum(count for _, count, _ in reports)
+    failures = sum(count for _, _, count in reports)
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    stored = asyncio.run(stored_rows(db_path))
+    left = asyncio.run(left_in_queue(jobs_path))
+    print(f"{label:<24} {workers} workers  {len(links) / elapsed:7.1f} links/s  {elapsed:6.2f}s  "
+          f"enqueued {enqueued['enqueued']}/{len(links) + len(reposts)} (p50 {enqueue_p50 * 1000:.2f}ms, p95 {enqueue_p95 * 1000:.2f}ms)  "
+          f"stored {stored}/{len(links)}  redelivered {redelivered}  failed {failures}  left {left}")
+    return stored == len(links) and enqueued["enqueued"] == len(links)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    scrape_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(11)
+    links = [f"https://www.camphub.in.th/camp-{i}/" for i in range(count)]
+    reposts = rng.sample(links, count // 4)  # the same link posted again while it is still queued
+    print(f"{count} links + {len(reposts)} reposts, scrape latency {scrape_ms:g}ms, "
+          f"{LOCAL_WORKERS} pipeline workers per process, {os.cpu_count()} CPU(s)")
+    ok = True
+    for workers in (1, 2, 4):
+        ok &= run("shared queue", links, reposts, workers, scrape_ms)
+    # worker 0 dies after 20 scrapes; its leased jobs come back after the 2s lease
+    ok &= run("one worker killed", links, reposts, 3, scrape_ms, lease=2.0, die_after=20)
+    # every 10th scrape fails; the retry has to scrape again rather than hit the cached failure
+    ok &= run("transient failures", links, reposts, 2, scrape_ms, fail_every=10)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
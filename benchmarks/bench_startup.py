@@ -0,0 +1,80 @@
+# Cold start of the bot up to the point where it would open the gateway connection (bot.start),
+# and RSS at that point, with the scraping / NLP stack imported eagerly at module load (as main.py
+# used to) vs loaded by the background prewarm after on_ready. Each run is a fresh interpreter;
+# the database is never contacted (schema creation is an explicit step now).
+#
+#   python benchmarks/bench_startup.py [runs]
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r'''
+import asyncio, json, os, sys, time
+sys.path.insert(0, os.environ["BOT_ROOT"])
+
+def rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+if os.environ["EAGER"] == "1":
+    # what main.py's imports used to pull in at module load
+    import scrapy.utils.log, pythainlp.util, dateparser.search, ActivityScraper
+
+import discord
+from discord.ext import commands
+import main
+
+async def run():
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.all())
+    cog = main.DIPSharingBot(bot)
+    await bot.add_cog(cog)
+    print(json.dumps({"event": "gateway", "at": time.time(), "rss": rss_mb()}), flush=True)
+    started = time.perf_counter()
+    await cog.ensure_scraper()
+    print(json.dumps({"event": "prewarmed", "seconds": time.perf_counter() - started, "rss": rss_mb()}), flush=True)
+    await bot.remove_cog(cog.qualified_name)
+
+asyncio.run(run())
+'''
+
+ENV = {
+    "BOT_ROOT": str(ROOT), "CHANNELS_ID": "1", "DATABASE_USERNAME": "bot", "DATABASE_PASSWORD": "bot",
+    "DATABASE_HOST": "127.0.0.1", "DATABASE_PORT": "3306", "DATABASE_NAME": "bot",
+}
+
+
+def run(eager):
+    env = {**os.environ, **ENV, "EAGER": "1" if eager else "0"}
+    started = time.time()
+    child = subprocess.run([sys.executable, "-c", CHILD], env=env, cwd=os.path.dirname(__file__),
+                           capture_output=True, text=True, timeout=300)
+    events = {}
+    for line in child.stdout.splitlines():
+        if line.startswith("{"):
+            event = json.loads(line)
+            events[event["event"]] = event
+    if "prewarmed" not in events:
+        raise SystemExit(child.stderr[-2000:])
+    return events["gateway"]["at"] - started, events["gateway"]["rss"], events["prewarmed"]["seconds"], events["prewarmed"]["rss"]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"median of {runs} fresh interpreters")
+    for label, eager in (("eager imports (before)", True), ("lazy + prewarm (after)", False)):
+        results = [run(eager) for _ in range(runs)]
+        ready, rss, prewarm, rss_warm = (statistics.median(column) for column in zip(*results))
+        print(f"{label:<24} time to gateway {ready:5.2f}s  RSS {rss:6.1f}MB  |  "
+              f"prewarm {prewarm:5.2f}s, RSS once warm {rss_warm:6.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Round trips per message for the hashLink dedupe path: the previous select-rows/update/insert
+# sequence against the single UPDATE touch + upsert insert. Runs on SQLite (aiosqlite) with a
+# copy of the activity table, counting every statement sent to the database.
+#
+#   python benchmarks/bench_upsert.py [messages]
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import BINARY, BOOLEAN, Column, DateTime, Integer, Text, VARCHAR, event, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from links import hash_link
+from queries import touch, upsert
+
+Base = declarative_base()
+
+
+class Camp(Base):
+    # Same shape as database.Activity, without the category
+    __tablename__ = "Camps"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hashLink = Column(BINARY(16), nullable=False, unique=True)
+    link = Column(VARCHAR(255), nullable=False)
+    topic = Column(Text)
+    imageUrl = Column(Text, nullable=False)
+    deadline = Column(DateTime)
+    createdAt = Column(DateTime, nullable=False, default=func.current_timestamp())
+    updatedAt = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
+    isActive = Column(BOOLEAN, nullable=False, default=True)
+
+
+def entry(url):
+    return {"hashLink": hash_link(url), "link": url, "topic": "Camp", "imageUrl": "https://example.com/a.jpg", "deadline": None}
+
+
+async def legacy(Session, url):
+    # Previous on_message: load full rows to test existence, then update + commit or insert + commit
+    values = entry(url)
+    async with Session() as session:
+        data = (await session.execute(select(Camp).filter(Camp.hashLink == values["hashLink"]))).scalars().all()
+        if data:
+            await session.execute(update(Camp).where(Camp.hashLink == values["hashLink"]).values(updatedAt=datetime.now(ZoneInfo('UTC'))))
+            await session.commit()
+            return
+    async with Session() as session:
+        session.add(Camp(**values))
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+
+
+async def current(Session, url):
+    values = entry(url)
+    async with Session() as session:
+        result = await session.execute(touch(Camp, values["hashLink"]))
+        await session.commit()
+        if result.rowcount > 0: return
+    async with Session() as session:
+        await session.execute(upsert(Camp, values, "sqlite"))
+        await session.commit()
+
+
+async def run(name, handler, messages):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+
+    # half new links, half reposts of links already stored
+    urls = [f"https://www.camphub.in.th/camp-{i % (messages // 2)}/" for i in range(messages)]
+    statements.clear()
+    started = time.perf_counter()
+    for url in urls:
+        await handler(Session, url)
+    elapsed = time.perf_counter() - started
+    executed = len(statements)
+
+    # two users posting the same new link at the same moment
+    race = "https://www.camphub.in.th/race/"
+    await asyncio.gather(handler(Session, race), handler(Session, race))
+    async with Session() as session:
+        rows = (await session.execute(select(func.count()).select_from(Camp).where(Camp.hashLink == entry(race)["hashLink"]))).scalar()
+    await engine.dispose()
+
+    print(f"{name:<8} {executed / messages:5.2f} statements/message  {elapsed / messages * 1000:6.2f}ms/message  race rows={rows}")
+
+
+async def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{messages} messages, 50% reposts (statements exclude BEGIN/COMMIT, which both paths pay per transaction)")
+    await run("legacy", legacy, messages)
+    await run("upsert", current, messages)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,359 @@
+# Offline benchmark and regression suite for the scraping engine.
+#
+# Recorded fixtures (camphub pages, generic event pages, Instagram GraphQL posts, see
+# fixtures/manifest.json) are served by a local stand-in that acts as the HTTP proxy for Scrapy
+# and httpx, so the real URLs, hostname dispatch, spider pool and HTTP client run unchanged with
+# no network. Per suite it measures throughput, latency, the per-stage breakdown from
+# metrics.STAGE_SECONDS and tracemalloc peak memory (of this process; spider workers are not
+# traced), checks the extracted fields against the manifest, and compares everything with
+# baseline.json: lower accuracy, or median latency / memory / throughput worse than the tolerance,
+# exits with status 1. p95 only fails past the wider tail tolerance: end to end it mixes spider pool
+# pages and Instagram posts, two clusters of timings, and moves a lot between runs.
+#
+#   python benchmarks/run.py [--suite NAME ...] [--iterations N] [--tolerance 1.5] [--tail-tolerance 3] [--update-baseline]
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+FIXTURES = ROOT / "benchmarks" / "fixtures"
+BASELINE = ROOT / "benchmarks" / "baseline.json"
+FIELDS = ("topic", "imageUrl", "deadline")
+SUITES = ("extract_date", "analyze_caption", "EventSpider", "scrape_event")
+ROUND_TIMEOUT = 60  # seconds for one burst of every fixture URL; a hang fails the run instead of blocking it
+MIN_SAMPLES = 200  # timings per suite at least, fewer make p95 a coin toss
+
+# metric -> which direction is a regression and which tolerance applies
+HIGHER_IS_WORSE = {"p50_ms": "latency", "p95_ms": "tail", "peak_kb": "memory"}
+LOWER_IS_WORSE = {"per_sec": "latency", "accuracy": None}  # accuracy must not drop at all
+
+
+def load_manifest():
+    entries = json.loads((FIXTURES / "manifest.json").read_text())
+    for entry in entries:
+        entry["body"] = (FIXTURES / entry["fixture"]).read_bytes()
+    return entries
+
+
+class StandIn(BaseHTTPRequestHandler):
+    # Proxy stand-in: the request line carries the absolute URL, answer it from the fixtures
+    protocol_version = "HTTP/1.1"  # keep-alive, Scrapy and httpx reuse their proxy connections
+    pages = {}  # (host, path) -> (content type, body)
+    posts = {}  # shortcode -> GraphQL body
+    hits = 0
+    misses = []
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        host = (parts.hostname or "").lower()
+        StandIn.hits += 1
+        if host == "www.instagram.com" and parts.path.startswith("/graphql/query"):
+            variables = json.loads(parse_qs(parts.query)["variables"][0])
+            found = self.posts.get(variables["shortcode"])
+            found = found and ("application/json", found)
+        else:
+            found = self.pages.get((host, parts.path))
+        if found is None:
+            StandIn.misses.append(self.path)
+            self.send_error(404)
+            return
+        content_type, body = found
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in(entries):
+    for entry in entries:
+        parts = urlsplit(entry["url"])
+        if entry["fixture"].startswith("instagram/"):
+            StandIn.posts[Path(entry["fixture"]).stem] = entry["body"]
+        else:
+            StandIn.pages[(parts.hostname, parts.path)] = ("text/html; charset=utf-8", entry["body"])
+    ThreadingHTTPServer.request_queue_size = 128  # a burst opens more connections than the default backlog of 5
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    proxy = f"http://127.0.0.1:{server.server_address[1]}"
+    # Read by Scrapy's HttpProxyMiddleware (also in the forked spider workers) and by httpx
+    os.environ["http_proxy"] = os.environ["HTTP_PROXY"] = proxy
+    return server
+
+
+def plain_http(url: str) -> str:
+    # The stand-in speaks plain HTTP; the hostname, and so the extractor, stays the same
+    return "http://" + url.split("://", 1)[1]
+
+
+def as_date(value):
+    if isinstance(value, datetime): return value.date().isoformat()
+    if isinstance(value, date): return value.isoformat()
+    if isinstance(value, str): return value[:10]  # Instagram falls back to the post timestamp as ISO text
+    return None
+
+
+def score(results, entries):
+    # Share of expected fields extracted exactly (deadlines compared by date)
+    correct, misses = 0, []
+    for entry, result in zip(entries, results):
+        result = result or {}
+        for field in FIELDS:
+            got = as_date(result.get(field)) if field == "deadline" else result.get(field)
+            if got == entry["expected"][field]:
+                correct += 1
+            else:
+                misses.append(f"{entry['url']} {field}: expected {entry['expected'][field]!r}, got {got!r}")
+    return correct / (len(entries) * len(FIELDS)), misses
+
+
+def percentiles(timings):
+    ordered = sorted(timings)
+    return {
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+    }
+
+
+def stage_breakdown():
+    # Mean ms per stage recorded by the metrics spans since the last call
+    from metrics import STAGE_SECONDS
+    return {key[0]: round(total / count * 1000, 3) for key, (_, total, count) in sorted(STAGE_SECONDS.drain().items()) if count}
+
+
+def peak_kb(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def timed_calls(func, inputs, iterations):
+    timings, outputs = [], []
+    started = time.perf_counter()
+    for _ in range(max(iterations, -(-MIN_SAMPLES // len(inputs)))):
+        outputs = []
+        for value in inputs:
+            call_started = time.perf_counter()
+            outputs.append(func(value))
+            timings.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    return outputs, {"per_sec": len(timings) / elapsed, **percentiles(timings)}
+
+
+def bench_extract_date(entries, iterations):
+    from deadline_parser import parse_deadline
+    corpus = [json.loads(line) for line in (FIXTURES / "deadlines.jsonl").read_text().splitlines() if line.strip()]
+    texts = [case["text"] for case in corpus]
+    parse_deadline(texts[0])
+    stage_breakdown()
+    outputs, result = timed_calls(parse_deadline, texts, iterations)
+    year = str(datetime.now().year)
+    misses = [f"{case['text']!r}: expected {case['expected']}, got {as_date(got)}" for case, got in zip(corpus, outputs)
+              if as_date(got) != (case["expected"] and case["expected"].replace("*", year, 1))]
+    result["accuracy"] = 1 - len(misses) / len(corpus)
+    result["peak_kb"] = peak_kb(lambda: [parse_deadline(text) for text in texts])
+    return result, misses
+
+
+def bench_analyze_caption(entries, iterations):
+    from ActivityScraper import ActivityScraper
+    scraper = ActivityScraper()
+    posts = [entry for entry in entries if entry["fixture"].startswith("instagram/")]
+    captions = [json.loads(entry["body"])["data"]["shortcode_media"]["edge_media_to_caption"]["edges"][0]["node"]["text"]
+                for entry in posts]
+    scraper.analyze_caption(captions[0])
+    stage_breakdown()
+    outputs, result = timed_calls(scraper.analyze_caption, captions, iterations)
+    result["stages_ms"] = stage_breakdown()
+    # Only the fields the caption decides; video posts fall back to the post timestamp elsewhere
+    checked = [(entry, analysis) for entry, analysis in zip(posts, outputs) if entry["expected"]["imageUrl"] is not None]
+    misses = []
+    for entry, analysis in checked:
+        if analysis["event_name"] != entry["expected"]["topic"]:
+            misses.append(f"{entry['url']} topic: expected {entry['expected']['topic']!r}, got {analysis['event_name']!r}")
+        if as_date(analysis["deadline"]) != entry["expected"]["deadline"]:
+            misses.append(f"{entry['url']} deadline: expected {entry['expected']['deadline']}, got {as_date(analysis['deadline'])}")
+    result["accuracy"] = 1 - len(misses) / (2 * len(checked))
+    result["peak_kb"] = peak_kb(lambda: [scraper.analyze_caption(caption) for caption in captions])
+    return result, misses
+
+
+def bench_event_spider(entries, iterations):
+    # EventSpider.parse on recorded responses: extractor dispatch and parsing without the download
+    from scrapy.http import HtmlResponse
+    from ActivityScraper import ActivityScraper
+    pages = [entry for entry in entries if not entry["fixture"].startswith("instagram/")]
+    responses = [HtmlResponse(url=entry["url"], body=entry["body"], encoding="utf-8") for entry in pages]
+    spider = ActivityScraper.EventSpider(start_urls=[])
+    spider.parse(responses[0])
+    stage_breakdown()
+    outputs, result = timed_calls(spider.parse, responses, iterations)
+    result["stages_ms"] = stage_breakdown()
+    result["accuracy"], misses = score(outputs, pages)
+    result["peak_kb"] = peak_kb(lambda: [spider.parse(response) for response in responses])
+    return result, misses
+
+
+def bench_scrape_event(entries, iterations):
+    # End to end through the stand-in: warm spider pool for pages, pooled httpx for Instagram
+    from scrapy.utils.log import configure_logging
+    from pythainlp.util import normalize
+    from ActivityScraper import ActivityScraper
+    from http_client import HttpClient
+    from spider_pool import SpiderPool
+
+    configure_logging(install_root_handler=False)  # as the bot's prewarm does
+    logging.getLogger("scrapy").setLevel(logging.WARNING)  # the spider workers inherit it
+    urls = [plain_http(entry["url"]) for entry in entries]
+    # The bot warms pythainlp / langdetect / dateparser before forking the pool, every worker inherits them
+    normalize("ค่าย")
+    ActivityScraper().analyze_caption("Prewarm ค่าย Camp ปิดรับสมัคร next friday")
+    pool = SpiderPool(size=2, max_jobs=10000)
+    pool.start()
+
+    async def run():
+        http = HttpClient()
+        scraper = ActivityScraper(spider_pool=pool, http=http)
+        scraper.INSTAGRAM_GRAPHQL_URL = plain_http(ActivityScraper.INSTAGRAM_GRAPHQL_URL)
+
+        async def one(url):
+            started = time.perf_counter()
+            result = await scraper.scrape_event_async(url)
+            return result, time.perf_counter() - started
+
+        async def round_trip():
+            # every fixture URL at once, like a burst of posts
+            return await asyncio.wait_for(asyncio.gather(*(one(url) for url in urls)), ROUND_TIMEOUT)
+
+        await round_trip()  # connections to the stand-in, first crawl in each worker
+        stage_breakdown()
+        timings, outputs = [], []
+        started = time.perf_counter()
+        for _ in range(max(iterations, -(-MIN_SAMPLES // len(urls)))):
+            done = await round_trip()
+            outputs = [result for result, _ in done]
+            timings.extend(elapsed for _, elapsed in done)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(1.5)  # let the workers report their spans to the pool
+        stages = stage_breakdown()
+        tracemalloc.start()
+        await round_trip()
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+        await http.close()
+        return outputs, {"per_sec": len(timings) / elapsed, **percentiles(timings), "stages_ms": stages, "peak_kb": peak}
+
+    try:
+        outputs, result = asyncio.run(run())
+    finally:
+        pool.stop()
+    result["accuracy"], misses = score(outputs, entries)
+    if StandIn.misses:
+        misses.append(f"stand-in had no fixture for: {sorted(set(StandIn.misses))}")
+        result["accuracy"] = 0.0
+    return result, misses
+
+
+BENCHMARKS = {
+    "extract_date": bench_extract_date,
+    "analyze_caption": bench_analyze_caption,
+    "EventSpider": bench_event_spider,
+    "scrape_event": bench_scrape_event,
+}
+
+
+def regressions(name, result, baseline, tolerances):
+    found = []
+    for metric, reference in baseline.items():
+        value = result.get(metric)
+        if value is None or not isinstance(reference, (int, float)): continue
+        if metric in HIGHER_IS_WORSE:
+            limit = reference * tolerances[HIGHER_IS_WORSE[metric]]
+            if value > limit:
+                found.append(f"{name}.{metric} {value:.2f} > {limit:.2f} (baseline {reference:.2f})")
+        elif metric == "accuracy":
+            if round(value, 4) < reference:  # the baseline keeps 4 decimals
+                found.append(f"{name}.accuracy {value:.1%} < baseline {reference:.1%}")
+        elif metric in LOWER_IS_WORSE:
+            limit = reference / tolerances["latency"]
+            if value < limit:
+                found.append(f"{name}.{metric} {value:.2f} < {limit:.2f} (baseline {reference:.2f})")
+    return found
+
+
+def report(name, result):
+    line = (f"{name:<16} accuracy={result['accuracy']:6.1%}  {result['per_sec']:9.1f}/s  "
+            f"p50={result['p50_ms']:8.3f}ms  p95={result['p95_ms']:8.3f}ms  peak={result['peak_kb']:8.1f}KB")
+    print(line)
+    if result.get("stages_ms"):
+        print("  stages (mean ms): " + "  ".join(f"{stage}={ms}" for stage, ms in result["stages_ms"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark and regression suite for the scraping engine")
+    parser.add_argument("--suite", action="append", choices=SUITES, help="run only these suites")
+    parser.add_argument("--iterations", type=int, default=20, help="passes over the fixtures per suite")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown factor against the baseline")
+    parser.add_argument("--tail-tolerance", type=float, default=3.0, help="allowed p95 growth factor")
+    parser.add_argument("--memory-tolerance", type=float, default=1.25, help="allowed peak memory growth factor")
+    parser.add_argument("--update-baseline", action="store_true", help="write these results to baseline.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.captureWarnings(True)
+    logging.getLogger("py.warnings").setLevel(logging.ERROR)  # Scrapy deprecation notices
+    entries = load_manifest()
+    server = start_stand_in(entries)
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    machine = f"{platform.machine()} {platform.python_implementation()} {platform.python_version()} cpus={os.cpu_count()}"
+    if baseline and baseline.get("_machine") != machine:
+        print(f"note: baseline recorded on {baseline.get('_machine')}, this is {machine}")
+
+    tolerances = {"latency": args.tolerance, "tail": args.tail_tolerance, "memory": args.memory_tolerance}
+    results, failures = {}, []
+    try:
+        for name in args.suite or SUITES:
+            iterations = max(1, args.iterations // 4) if name == "scrape_event" else args.iterations
+            result, misses = BENCHMARKS[name](entries, iterations)
+            results[name] = result
+            report(name, result)
+            for miss in misses:
+                print(f"  miss: {miss}")
+            failures += regressions(name, result, baseline.get(name, {}), tolerances)
+    finally:
+        server.shutdown()
+
+    if args.update_baseline:
+        updated = {**baseline, "_machine": machine}
+        for name, result in results.items():
+            updated[name] = {metric: round(value, 4) for metric, value in result.items() if isinstance(value, (int, float))}
+        BASELINE.write_text(json.dumps(updated, indent=2) + "\n")
+        print(f"baseline written to {BASELINE.relative_to(ROOT)}")
+        return
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
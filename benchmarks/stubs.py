@@ -0,0 +1,40 @@
+# Offline stand-ins for the parts of discord.py the backfill uses: a channel whose history()
+# pages like the REST API (100 messages per request, optional per-page latency).
+import asyncio
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+
+@dataclass
+class StubMessage:
+    id: int
+    content: str
+    channel: Any = None
+
+
+class StubChannel:
+    PAGE_SIZE = 100  # messages per history request, as in the Discord API
+
+    def __init__(self, id: int, name: str, contents: List[str], first_id: int = 1000, page_latency: float = 0.0):
+        self.id = id
+        self.name = name
+        self.messages = [StubMessage(first_id + i, content, self) for i, content in enumerate(contents)]
+        self.page_latency = page_latency
+        self.requests = 0
+
+    async def history(self, limit: Optional[int] = 100, after=None, oldest_first: Optional[bool] = None):
+        after_id = after.id if after is not None else 0
+        messages = [msg for msg in self.messages if msg.id > after_id]
+        if not oldest_first:
+            messages.reverse()
+        if limit is not None:
+            messages = messages[:limit]
+        for start in range(0, len(messages), self.PAGE_SIZE):
+            self.requests += 1
+            if self.page_latency:
+                await asyncio.sleep(self.page_latency)
+            for msg in messages[start:start + self.PAGE_SIZE]:
+                yield msg
+
+    async def send(self, content: str):
+        return StubMessage(0, content, self)
@@ -0,0 +1,149 @@
+import logging
+import os
+import re
+import time
+from typing import Dict, Iterable, Optional, Union
+
+from dotenv import dotenv_values
+from langdetect import detect, DetectorFactory
+
+from deadline_parser import DeadlineParser, parser as default_parser
+from metrics import logfmt, record_error, span
+
+logger = logging.getLogger(__name__)
+
+config = dotenv_values(".env")
+
+CAPTION_CHAR_BUDGET = int((config.get("CAPTION_CHAR_BUDGET") if config else os.getenv("CAPTION_CHAR_BUDGET")) or 20000)
+CAPTION_TIME_BUDGET = float((config.get("CAPTION_TIME_BUDGET") if config else os.getenv("CAPTION_TIME_BUDGET")) or 1.0)
+CAPTION_SAMPLE_SIZE = int((config.get("CAPTION_SAMPLE_SIZE") if config else os.getenv("CAPTION_SAMPLE_SIZE")) or 1500)
+
+WORD = re.compile(r'[A-Za-z0-9_]+')
+WORD_CHAR = re.compile(r'\w')
+KEYWORD = re.compile(r'Camp|Competition|Event|Festival|Conference|Meetup|Workshop|Talks|Program|Coding|ค่าย|IT', re.IGNORECASE)
+LANGUAGES = {'en': 'english', 'th': 'thai'}
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class CaptionAnalyzer:
+    # Same {deadline, language, event_name} result as the old analyze_caption, but every stage
+    # works on a bounded window: at most char_budget characters, a language sample of
+    # sample_size characters, and a wall-clock budget per call.
+
+    def __init__(self, char_budget: int = CAPTION_CHAR_BUDGET, time_budget: float = CAPTION_TIME_BUDGET,
+                 sample_size: int = CAPTION_SAMPLE_SIZE, deadline_parser: Optional[DeadlineParser] = None):
+        DetectorFactory.seed = 0  # Setting a seed for language detection to ensure consistent results
+        self.char_budget = char_budget
+        self.time_budget = time_budget
+        self.sample_size = sample_size
+        self.deadline_parser = deadline_parser or default_parser
+
+    def window(self, caption: Union[str, Iterable[str], None]) -> str:
+        if caption is None: return ""
+        if isinstance(caption, str):
+            return caption[:self.char_budget]
+        # Stream of text chunks (e.g. text nodes): stop reading once the budget is full
+        parts, size = [], 0
+        for chunk in caption:
+            if size >= self.char_budget: break
+            parts.append(chunk[:self.char_budget - size])
+            size += len(parts[-1]) + 1
+        return ' '.join(parts)[:self.char_budget]
+
+    def analyze(self, caption: Union[str, Iterable[str], None]) -> Dict:
+        text = self.window(caption)
+        expires = time.monotonic() + self.time_budget
+        result = {"deadline": None, "language": "unknown", "event_name": None}
+        try:
+            with span("caption.event_name"):
+                result["event_name"] = self.event_name(text, expires)
+            with span("caption.deadline"):
+                candidates = self.deadline_parser.candidates(text)
+                if candidates:
+                    result["deadline"] = self.deadline_parser.pick(text, candidates)
+            self.check(expires)
+            with span("caption.language"):
+                result["language"] = self.language(text)
+            if result["deadline"] is None:
+                self.check(expires)
+                with span("caption.deadline_fallback"):
+                    result["deadline"] = self.deadline_parser.fallback(text)  # dateparser, only on small windows
+        except BudgetExceeded:
+            record_error("analyze_caption", "BudgetExceeded")
+            logger.warning(logfmt("caption budget exceeded", budget=self.time_budget, chars=len(text)))
+        return result
+
+    def check(self, expires: float):
+        if time.monotonic() > expires:
+            raise BudgetExceeded()
+
+    def sample(self, text: str) -> str:
+        if len(text) <= self.sample_size: return text
+        # Start, middle and end so navigation text at the top doesn't decide the language alone
+        third = self.sample_size // 3
+        middle = len(text) // 2
+        return ' '.join((text[:third], text[middle - third // 2:middle + third // 2], text[-third:]))
+
+    def language(self, text: str) -> str:
+        try:
+            language_code = detect(self.sample(text))  # Detect the language of the caption
+        except Exception as e:
+            record_error("caption.language", type(e).__name__)  # e.g. no features in a caption of emoji and links
+            logger.debug(logfmt("language detection failed", error=type(e).__name__, detail=e))
+            language_code = 'unknown'
+        return LANGUAGES.get(language_code, "unknown")
+
+    def event_name(self, text: str, expires: float) -> Optional[str]:
+        # Linear-time equivalent of
+        #   (?<!\d)(?<!\d )(?:\b[A-Za-z0-9_]+\s?)+(?:Camp|...|IT)   falling back to   (?:\b[A-Za-z0-9_]+\s?)+
+        # A "run" is a sequence of words separated by exactly one whitespace character. The first
+        # run containing a keyword wins, and the name ends at the right-most keyword in that run.
+        fallback = None
+        checked = 0
+        for match_start, fallback_start, run_end, spans in self.runs(text):
+            if fallback is None and fallback_start is not None:
+                fallback = text[fallback_start:run_end].strip()
+            for low, high in reversed(spans):
+                for position in range(high, low - 1, -1):
+                    keyword = KEYWORD.match(text, position)
+                    if keyword:
+                        return text[match_start:keyword.end()].strip()
+            checked += 1
+            if checked % 256 == 0:
+                self.check(expires)
+        return fallback
+
+    def runs(self, text: str):
+        # Yields (start, fallback start, end, spans of positions a keyword may start at) per run of words
+        match_start = fallback_start = run_end = None
+        spans = []
+        for word in WORD.finditer(text):
+            position = word.start()
+            if run_end is None or position != run_end + 1 or not text[run_end].isspace():
+                if run_end is not None:
+                    yield match_start, fallback_start, run_end, self.close(text, match_start, run_end, spans)
+                match_start = fallback_start = None
+                spans = []
+            boundary = position == 0 or not WORD_CHAR.match(text, position - 1)  # "\b" before the word
+            if fallback_start is None and boundary:
+                fallback_start = position
+            if match_start is not None:
+                spans.append((position, word.end()))  # right after "word\s", or anywhere in this word
+            elif boundary and not (position >= 2 and text[position - 1] == ' ' and text[position - 2].isdecimal()):
+                # The first word must keep at least one character before the keyword
+                match_start = position
+                spans.append((position + 1, word.end()))
+            run_end = word.end()
+        if run_end is not None:
+            yield match_start, fallback_start, run_end, self.close(text, match_start, run_end, spans)
+
+    def close(self, text: str, match_start: Optional[int], run_end: int, spans):
+        if match_start is not None and run_end < len(text) and text[run_end].isspace():
+            spans.append((run_end + 1, run_end + 1))  # "\s?" after the last word, e.g. "Coding ค่าย"
+        return spans
+
+
+analyzer = CaptionAnalyzer()
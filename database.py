@@ -1,9 +1,14 @@
-from sqlalchemy import BOOLEAN, Index, create_engine, Column, Integer, VARCHAR, Text, DateTime, func
+from sqlalchemy import BIGINT, BINARY, BOOLEAN, Index, create_engine, event, Column, Integer, VARCHAR, Text, DateTime, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
+from collections import deque
 import os
+import time
 from dotenv import dotenv_values
 import logging
+from metrics import STAGE_SECONDS, percentile
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,31 +21,28 @@ DATABASE_PASSWORD = config.get("DATABASE_PASSWORD") if config else os.getenv("DA
 DATABASE_HOST = config.get("DATABASE_HOST") if config else os.getenv("DATABASE_HOST")
 DATABASE_NAME = config.get("DATABASE_NAME") if config else os.getenv("DATABASE_NAME")
 DATABASE_PORT = config.get("DATABASE_PORT") if config else os.getenv("DATABASE_PORT")
+DB_POOL_SIZE = int((config.get("DB_POOL_SIZE") if config else os.getenv("DB_POOL_SIZE")) or 5)
+DB_MAX_OVERFLOW = int((config.get("DB_MAX_OVERFLOW") if config else os.getenv("DB_MAX_OVERFLOW")) or 10)
+DB_POOL_RECYCLE = int((config.get("DB_POOL_RECYCLE") if config else os.getenv("DB_POOL_RECYCLE")) or 1800)
+DB_POOL_TIMEOUT = int((config.get("DB_POOL_TIMEOUT") if config else os.getenv("DB_POOL_TIMEOUT")) or 30)
 
 Base = declarative_base()
 
 
-class Camp(Base):
-    __tablename__ = "Camps"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    hashLink = Column(VARCHAR(255), nullable=False, unique=True)
-    link = Column(VARCHAR(255), nullable=False)
-    topic = Column(Text)
-    imageUrl = Column(Text, nullable=False)
-    deadline = Column(DateTime)
-    createdAt = Column(DateTime, nullable=False, default=func.current_timestamp())
-    updatedAt = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
-    isActive = Column(BOOLEAN, nullable=False, default=True)
+# Activity categories, one per bot channel
+CAMP = "camp"
+COMPETITION = "competition"
+OTHER = "other"
+CATEGORIES = (CAMP, COMPETITION, OTHER)
 
-    __table_args__ = (
-        Index('idx_camps_hash_link', 'hashLink'),
-        Index('idx_camps_updated_at', 'updatedAt'),
-    )
 
-class Competition(Base):
-    __tablename__ = "Competitions"
+class Activity(Base):
+    # Single table for every category (was Camps / Competitions / Others, see migrations.py),
+    # so cross-category queries are one index range scan and a link is stored only once
+    __tablename__ = "Activities"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    hashLink = Column(VARCHAR(255), nullable=False, unique=True)
+    category = Column(VARCHAR(16), nullable=False)
+    hashLink = Column(BINARY(16), nullable=False, unique=True)  # md5 of links.canonicalize(link), the only index on it
     link = Column(VARCHAR(255), nullable=False)
     topic = Column(Text)
     imageUrl = Column(Text, nullable=False)
@@ -50,37 +52,98 @@ class Competition(Base):
     isActive = Column(BOOLEAN, nullable=False, default=True)
 
     __table_args__ = (
-        Index('idx_competitions_hash_link', 'hashLink'),
-        Index('idx_competitions_updated_at', 'updatedAt'),
+        Index('idx_activities_category_deadline', 'category', 'deadline'),
+        Index('idx_activities_active_deadline', 'isActive', 'deadline'),
+        Index('idx_activities_updated_at', 'updatedAt'),
     )
 
-class Other(Base):
-    __tablename__ = "Others"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    hashLink = Column(VARCHAR(255), nullable=False, unique=True)
-    link = Column(VARCHAR(255), nullable=False)
-    topic = Column(Text)
-    imageUrl = Column(Text, nullable=False)
-    deadline = Column(DateTime)
-    createdAt = Column(DateTime, nullable=False, default=func.current_timestamp())
+class BackfillCheckpoint(Base):
+    # Newest channel message the history backfill has fully processed
+    __tablename__ = "BackfillCheckpoints"
+    channelId = Column(BIGINT, primary_key=True, autoincrement=False)
+    messageId = Column(BIGINT, nullable=False)
     updatedAt = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
-    isActive = Column(BOOLEAN, nullable=False, default=True)
 
-    __table_args__ = (
-        Index('idx_others_hash_link', 'hashLink'),
-        Index('idx_others_updated_at', 'updatedAt'),
-    )
+class DbMetrics:
+    # Pool checkout latency (session_scope) and per-statement timing (cursor events)
+    def __init__(self, window=500):
+        self.checkouts = deque(maxlen=window)
+        self.queries = deque(maxlen=window)
+        self.query_count = 0
+        self.slow_queries = 0
+        self.slow_threshold = 0.5
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.monotonic())
+
+    def after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.monotonic() - conn.info["query_start"].pop()
+        self.queries.append(elapsed)
+        STAGE_SECONDS.observe(elapsed, stage="db.query")
+        self.query_count += 1
+        if elapsed > self.slow_threshold:
+            self.slow_queries += 1
+            logger.warning(f"Slow query ({elapsed:.3f}s): {statement[:200]}")
+
+    def instrument(self, engine):
+        event.listen(engine, "before_cursor_execute", self.before_execute)
+        event.listen(engine, "after_cursor_execute", self.after_execute)
+
+    def stats(self):
+        pool = async_engine.pool
+        return {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkout_p50": percentile(self.checkouts, 50),
+            "checkout_p95": percentile(self.checkouts, 95),
+            "queries": self.query_count,
+            "slow_queries": self.slow_queries,
+            "query_p50": percentile(self.queries, 50),
+            "query_p95": percentile(self.queries, 95),
+        }
+
+
+db_metrics = DbMetrics()
 
 # Create engine
 engine = create_engine(f"mysql+mysqlconnector://{DATABASE_USERNAME}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}")
 logger.info("Database engine created successfully")
 
-# Create session factory
+# Async engine used by the bot: tuned pool, stale connections recycled and pinged before use
+async_engine = create_async_engine(
+    f"mysql+aiomysql://{DATABASE_USERNAME}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}",
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True
+)
+db_metrics.instrument(engine)
+db_metrics.instrument(async_engine.sync_engine)
+
+# Create session factories
 SessionFactory = sessionmaker(bind=engine)
+AsyncSessionFactory = async_sessionmaker(async_engine, expire_on_commit=False)
+
 
-# Create a session
-session = SessionFactory()
+@asynccontextmanager
+async def session_scope():
+    # One AsyncSession per task: commit on success, roll back on error, always return the connection
+    async with AsyncSessionFactory() as session:
+        started = time.monotonic()
+        await session.connection()  # check out now so pool wait time is measured separately
+        db_metrics.checkouts.append(time.monotonic() - started)
+        STAGE_SECONDS.observe(db_metrics.checkouts[-1], stage="db.checkout")
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
 
-# Create all tables
-Base.metadata.create_all(engine)
-logger.info("All tables created successfully")
\ No newline at end of file
+def init_schema():
+    # Explicit step (python migrations.py, or INIT_SCHEMA=1 in the container) instead of on import,
+    # so importing this module never touches the database
+    Base.metadata.create_all(engine)
+    logger.info("All tables created successfully")
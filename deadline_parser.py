@@ -0,0 +1,154 @@
+import re
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+
+THAI_MONTHS = {
+    'มกราคม': 1, 'กุมภาพันธ์': 2, 'มีนาคม': 3, 'เมษายน': 4,
+    'พฤษภาคม': 5, 'มิถุนายน': 6, 'กรกฎาคม': 7, 'สิงหาคม': 8,
+    'กันยายน': 9, 'ตุลาคม': 10, 'พฤศจิกายน': 11, 'ธันวาคม': 12,
+    'ม.ค.': 1, 'ก.พ.': 2, 'มี.ค.': 3, 'เม.ย.': 4, 'พ.ค.': 5, 'มิ.ย.': 6,
+    'ก.ค.': 7, 'ส.ค.': 8, 'ก.ย.': 9, 'ต.ค.': 10, 'พ.ย.': 11, 'ธ.ค.': 12,
+    'มค': 1, 'กพ': 2, 'มีค': 3, 'เมย': 4, 'พค': 5, 'มิย': 6,
+    'กค': 7, 'สค': 8, 'กย': 9, 'ตค': 10, 'พย': 11, 'ธค': 12,
+}
+ENGLISH_MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8,
+    'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+
+def _alternation(names) -> str:
+    # Longest first so "มีนาคม" wins over "มี.ค." and "september" over "sep"
+    return '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+
+
+_THAI = _alternation(THAI_MONTHS)
+# The leading first-letter lookahead lets the scan skip most positions cheaply
+_ENG = (r'(?=[' + ''.join(sorted({name[0] for name in ENGLISH_MONTHS})) + r'])(?<![A-Za-z])(?:'
+        + _alternation(ENGLISH_MONTHS) + r')(?![A-Za-z])')
+MONTH = f'(?:{_THAI}|{_ENG})'
+
+
+def _year(name: str) -> str:
+    # Optional era prefix, then a 4 or 2 digit year that isn't the start of a time or longer number
+    # (a full stop only counts as a time separator when a digit follows: "20.30 น." vs "... 2024.")
+    return rf'(?:ค\.?ศ\.?|พ\.?ศ\.?)?\s*(?P<{name}>\d{{4}}|\d{{2}})(?![\d:]|\.\d)'
+
+
+RANGE_SEP = r'\s*(?:-|–|—|~|ถึง|to|until)\s*'
+
+# One pass over the text; each alternative captures (day, month, year) of the deadline.
+# Ranges come first so "1 - 15 มกราคม 2568" resolves to the end date.
+DATE_PATTERN = re.compile(
+    # 1 ม.ค. - 15 ก.พ. 2568 / 1-15 January 2025
+    rf'(?<!\d)\d{{1,2}}\s*(?:{MONTH}\s*(?:\d{{4}}|\d{{2}}(?!\d))?)?{RANGE_SEP}(?P<rd>\d{{1,2}})\s*(?P<rm>{MONTH})\.?,?(?:\s*{_year("ry")})?'
+    # 15 มกราคม 2568 / 15 Jan 2025 / 15th January
+    rf'|(?<!\d)(?P<d>\d{{1,2}})(?:st|nd|rd|th)?\s*(?P<m>{MONTH})\.?,?(?:\s*{_year("y")})?'
+    # January 15, 2025
+    rf'|(?P<em>{_ENG})\.?\s+(?P<ed>\d{{1,2}})(?:st|nd|rd|th)?(?!\d)(?:,?\s*(?P<ey>\d{{4}}))?'
+    # 15/01/2025, 15-1-68
+    rf'|(?<![\d/.-])(?P<nd>\d{{1,2}})[/.-](?P<nm>\d{{1,2}})[/.-](?P<ny>\d{{4}}|\d{{2}})(?![\d/.-])'
+    # 2025-01-15
+    rf'|(?<![\d/-])(?P<iy>\d{{4}})[/-](?P<im>\d{{1,2}})[/-](?P<id>\d{{1,2}})(?![\d/-])',
+    re.IGNORECASE
+)
+# Dates right after one of these are preferred over other dates on the page
+DEADLINE_HINT = re.compile(r'(?:ปิดรับ|รับสมัคร|หมดเขต|ภายใน|ถึงวันที่|deadline|apply by|register by|close[sd]?|until|before|due)', re.IGNORECASE)
+# Tokens that might be part of a date dateparser understands but the fast path missed
+DATE_TOKEN = re.compile(r'\d{1,4}(?:st|nd|rd|th)?\b|\d{1,2}[/.:-]\d{1,2}')
+
+
+class DeadlineParser:
+    def __init__(self, now: Callable[[], datetime] = datetime.now, hint_distance: int = 60,
+                 window: int = 40, max_windows: int = 3):
+        self.now = now
+        self.hint_distance = hint_distance  # how far after a deadline hint a date still counts as "the" deadline
+        self.window = window  # characters each side of a date-like token given to dateparser
+        self.max_windows = max_windows
+
+    def parse(self, text: str) -> Optional[datetime]:
+        if not text: return None
+        candidates = self.candidates(text)
+        if candidates:
+            return self.pick(text, candidates)
+        return self.fallback(text)
+
+    def candidates(self, text: str) -> List[Tuple[int, datetime]]:
+        found = []
+        for match in DATE_PATTERN.finditer(text):
+            parsed = self.to_datetime(match)
+            if parsed is not None:
+                found.append((match.start(), parsed))
+        return found
+
+    def pick(self, text: str, candidates: List[Tuple[int, datetime]]) -> datetime:
+        for hint in DEADLINE_HINT.finditer(text):
+            for position, parsed in candidates:
+                if hint.end() <= position <= hint.end() + self.hint_distance:
+                    return parsed
+        return candidates[0][1]
+
+    def to_datetime(self, match) -> Optional[datetime]:
+        groups = match.groupdict()
+        if groups['rd']:
+            day, month, year = groups['rd'], groups['rm'], groups['ry']
+        elif groups['d']:
+            day, month, year = groups['d'], groups['m'], groups['y']
+        elif groups['ed']:
+            day, month, year = groups['ed'], groups['em'], groups['ey']
+        elif groups['nd']:
+            day, month, year = groups['nd'], int(groups['nm']), groups['ny']
+        else:
+            day, month, year = groups['id'], int(groups['im']), groups['iy']
+
+        thai = False
+        if isinstance(month, str):
+            thai = month in THAI_MONTHS
+            month = THAI_MONTHS.get(month) or ENGLISH_MONTHS.get(month.lower())
+        try:
+            return datetime(self.to_year(year, thai), month, int(day))
+        except (TypeError, ValueError):
+            return None
+
+    def to_year(self, year: Optional[str], thai: bool) -> int:
+        if not year:
+            return self.now().year  # No year given: assume this year, as before
+        value = int(year)
+        if value < 100:
+            # Two-digit years: Thai writers use the Buddhist era (68 -> 2568)
+            value += 2500 if thai or value > 50 else 2000
+        if value > 2400:
+            value -= 543  # Convert Buddhist year to Gregorian year
+        return value
+
+    def fallback(self, text: str) -> Optional[datetime]:
+        from dateparser.search import search_dates  # heavy, only loaded once a caption needs it
+
+        # Only hand dateparser short windows around date-like tokens instead of the whole page
+        windows = []
+        for token in DATE_TOKEN.finditer(text):
+            start = max(0, token.start() - self.window)
+            if windows and start <= windows[-1][1]:
+                continue  # overlaps the previous window
+            windows.append((start, min(len(text), token.end() + self.window)))
+            if len(windows) >= self.max_windows: break
+        if not windows and len(text) <= 2 * self.window:
+            windows.append((0, len(text)))  # short captions like "next friday" still get a try
+        for start, end in windows:
+            try:
+                found = search_dates(text[start:end], languages=['th', 'en'], settings={'PREFER_DATES_FROM': 'future'})
+            except Exception:
+                found = None
+            if found:
+                return found[0][1]
+        return None
+
+
+parser = DeadlineParser()
+
+
+def parse_deadline(text: str) -> Optional[datetime]:
+    return parser.parse(text)
@@ -4,5 +4,9 @@
 export BOT_TOKEN=$(cat /run/secrets/bot-token)
 export CHANNELS_ID=$(cat /run/secrets/channels-id)
 export DATABASE_PASSWORD=$(cat /run/secrets/db-password)
+# Create / migrate the schema only when asked, a plain restart goes straight to the bot
+if [ "${INIT_SCHEMA:-0}" = "1" ]; then
+    python migrations.py || exit 1
+fi
 # Now you can start your main application
 exec python main.py
\ No newline at end of file
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from queries import deactivate, expired_ids
+
+logger = logging.getLogger(__name__)
+
+
+def utc_now() -> datetime:
+    # deadlines are stored as naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ExpiryScheduler:
+    # Background task on the bot loop that flips isActive off once the deadline has passed.
+    # Each run walks the (isActive, deadline) index in chunks, every chunk in its own short
+    # transaction, and yields to the loop between chunks so message handling never waits on it.
+    # clock and sleep are injectable so a run can be driven with a fake clock.
+
+    def __init__(self, session_scope: Callable, model, interval: float = 300, jitter: float = 0.2,
+                 chunk_size: int = 500, clock: Callable[[], datetime] = utc_now,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep, rng: random.Random = None,
+                 history: int = 100):
+        self.session_scope = session_scope
+        self.model = model
+        self.interval = interval
+        self.jitter = jitter  # +-fraction of the interval, so several bots don't expire in lockstep
+        self.chunk_size = chunk_size
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.runs = 0
+        self.failures = 0
+        self.expired = 0
+        self.chunks = 0
+        self.last_run_at: Optional[datetime] = None
+        self.expired_per_run = deque(maxlen=history)
+        self.run_times = deque(maxlen=history)
+
+    def start(self):
+        if self.task is not None: return
+        self.task = asyncio.create_task(self._run(), name="expiry-scheduler")
+        logger.info(f"Expiry scheduler started (every {self.interval}s +-{self.jitter:.0%}, chunks of {self.chunk_size})")
+
+    async def stop(self):
+        if self.task is None: return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+    def next_delay(self) -> float:
+        return self.interval * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    async def _run(self):
+        while True:
+            await self.sleep(self.next_delay())
+            try:
+                await self.run_once()
+            except SQLAlchemyError as e:
+                self.failures += 1
+                logger.error(f"Expiry run failed: {e}")
+
+    async def run_once(self) -> int:
+        # All rows with a deadline before the start of the run, chunk by chunk
+        now = self.clock()
+        started = time.monotonic()
+        expired = 0
+        while True:
+            async with self.session_scope() as session:
+                ids = (await session.execute(expired_ids(self.model, now, self.chunk_size))).scalars().all()
+                if ids:
+                    await session.execute(deactivate(self.model, ids))
+            if not ids: break
+            expired += len(ids)
+            self.chunks += 1
+            if len(ids) < self.chunk_size: break
+            await asyncio.sleep(0)  # let queued messages run between chunks
+        self.runs += 1
+        self.expired += expired
+        self.last_run_at = now
+        self.expired_per_run.append(expired)
+        self.run_times.append(time.monotonic() - started)
+        if expired:
+            logger.info(f"Expired {expired} activities with a deadline before {now:%Y-%m-%d %H:%M}")
+        return expired
+
+    def stats(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "expired": self.expired,
+            "chunks": self.chunks,
+            "last_run_expired": self.expired_per_run[-1] if self.expired_per_run else None,
+            "last_run_seconds": self.run_times[-1] if self.run_times else None,
+            "last_run_at": self.last_run_at.isoformat(timespec="seconds") if self.last_run_at else None,
+        }
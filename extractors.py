@@ -0,0 +1,210 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from lxml import etree
+
+from deadline_parser import parse_deadline
+from metrics import logfmt, span
+
+logger = logging.getLogger(__name__)
+
+IGNORED_IMAGES = ("data:image", "CAMPSTER-LOGO", "Camphub-4")  # placeholders and site logos
+
+
+def host_of(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class SiteExtractor:
+    name = "generic"
+    hosts = ()  # hostnames (without www.) this extractor handles, subdomains included
+    kind = "html"  # "html" responses come from Scrapy, "instagram" posts from the GraphQL API
+
+    IMAGES = etree.XPath("//img/@src")
+
+    def extract(self, response, scraper) -> Dict:
+        raise NotImplementedError
+
+    def first_image(self, root) -> Optional[str]:
+        for image_url in self.IMAGES(root):
+            if not any(ignored in image_url for ignored in IGNORED_IMAGES):
+                return str(image_url)  # First valid image that is not a placeholder or logo
+        return None
+
+
+class GenericExtractor(SiteExtractor):
+    # Fallback for unknown domains: language detection, regex and dateparser over the whole body
+    name = "generic"
+
+    BODY_TEXT = etree.XPath("//body//text()")
+
+    def extract(self, response, scraper) -> Dict:
+        from pythainlp.util import normalize  # seconds to import, loaded on first use or by the bot's prewarm
+
+        root = response.selector.root
+        # Stream normalized text nodes so the analyzer stops reading once its character budget is full
+        content = (normalize(text) for text in self.BODY_TEXT(root))
+        analysis = scraper.analyze_caption(content)  # Analyze the caption to extract event details
+        return {
+            'topic': analysis["event_name"],
+            'imageUrl': self.first_image(root),
+            'deadline': analysis["deadline"]
+        }
+
+
+class CamphubExtractor(SiteExtractor):
+    name = "camphub"
+    hosts = ("camphub.in.th",)
+
+    TOPIC = etree.XPath("//meta[@property='og:title']/@content")
+    # First <img> inside the first <p style="margin-top:10px;"> holds the poster
+    POSTER = etree.XPath("(//p[@style='margin-top:10px;'])[1]/descendant::img[1]/@data-src")
+    DEADLINE = etree.XPath("(//h6[contains(., 'วันที่รับสมัครวันสุดท้าย')])[1]/following::h4[1]//text()")
+
+    def extract(self, response, scraper) -> Dict:
+        root = response.selector.root
+        return {
+            'topic': self.topic(root),
+            'imageUrl': self.image_url(root),
+            'deadline': self.deadline(root)
+        }
+
+    def topic(self, root) -> str:
+        main_topic = self.TOPIC(root)
+        return str(main_topic[0]) if main_topic else "General Event"
+
+    def image_url(self, root) -> Optional[str]:
+        poster = self.POSTER(root)
+        if poster and not any(ignored in poster[0] for ignored in IGNORED_IMAGES):
+            return str(poster[0])
+        return self.first_image(root)
+
+    def deadline(self, root) -> Optional[datetime]:
+        h4_text = ''.join(self.DEADLINE(root)).strip()
+        if not h4_text:
+            logger.debug(logfmt("deadline element not found", extractor=self.name))
+            return None
+
+        with span("extract_date"):
+            deadline = parse_deadline(h4_text)  # Thai month names and Buddhist-era years included
+        logger.debug(logfmt("deadline text", extractor=self.name, text=h4_text[:100], parsed=deadline))
+        return deadline
+
+
+class InstagramExtractor(SiteExtractor):
+    name = "instagram"
+    hosts = ("instagram.com",)
+    kind = "instagram"
+
+    SHORTCODE = re.compile(r'/(?:p|reel|tv)/([^/?#]+)')
+
+    def shortcode(self, url_or_shortcode: str) -> str:
+        if "http" not in url_or_shortcode:
+            return url_or_shortcode
+        match = self.SHORTCODE.search(url_or_shortcode)
+        return match.group(1) if match else url_or_shortcode.rstrip("/").split("/")[-1]
+
+    def extract(self, post, scraper) -> Optional[Dict]:
+        parsed_data = scraper.parse_post(post)
+        if not parsed_data: return None
+        analysis = scraper.analyze_caption(parsed_data.get("caption") or "")
+        return {
+            "topic": analysis["event_name"],
+            "imageUrl": None if parsed_data.get("is_video", False) else parsed_data.get("main_image_url", "None"),
+            "deadline": analysis["deadline"] or datetime.fromtimestamp(parsed_data.get("timestamp", 0)).isoformat()
+        }
+
+
+class ExtractorRegistry:
+    # Maps hostnames to extractors so the generic path only runs for unknown domains,
+    # and counts hits and time per extractor (plus which domains fall back to generic).
+
+    def __init__(self, fallback: SiteExtractor):
+        self.fallback = fallback
+        self.by_host: Dict[str, SiteExtractor] = {}
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict] = {}
+        self.fallback_domains = Counter()
+
+    def register(self, extractor: SiteExtractor, *hosts: str):
+        for host in hosts or extractor.hosts:
+            self.by_host[host.lower()] = extractor
+        return extractor
+
+    def lookup(self, url: str) -> SiteExtractor:
+        host = host_of(url)
+        # Walk up the domain so subdomains share their parent's extractor
+        while host:
+            extractor = self.by_host.get(host)
+            if extractor is not None:
+                return extractor
+            host = host.partition(".")[2]
+        return self.fallback
+
+    def extract(self, source, scraper, url: Optional[str] = None):
+        # source is a Scrapy response, or the GraphQL post for Instagram (pass its url)
+        url = url or source.url
+        extractor = self.lookup(url)
+        started = time.perf_counter()
+        result = None
+        try:
+            result = extractor.extract(source, scraper)
+            return result
+        finally:
+            self.record(extractor, time.perf_counter() - started, result, url)
+
+    def record(self, extractor: SiteExtractor, elapsed: float, result, url: str):
+        with self.lock:
+            counter = self.counters.setdefault(extractor.name, {"calls": 0, "hits": 0, "seconds": 0.0})
+            counter["calls"] += 1
+            counter["seconds"] += elapsed
+            if result and result.get("imageUrl"):
+                counter["hits"] += 1  # produced a usable entry
+            if extractor is self.fallback:
+                self.fallback_domains[host_of(url)] += 1
+
+    def drain_stats(self) -> Dict:
+        # Hand the counters to another process (spider workers report them to the pool) and reset
+        with self.lock:
+            delta = {"counters": self.counters, "fallback_domains": dict(self.fallback_domains)}
+            self.counters = {}
+            self.fallback_domains = Counter()
+        return delta
+
+    def reset(self):
+        # A forked spider worker inherits the pool's totals (and possibly a held lock), start from zero
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.fallback_domains = Counter()
+
+    def merge(self, delta: Dict):
+        with self.lock:
+            for name, counter in delta.get("counters", {}).items():
+                total = self.counters.setdefault(name, {"calls": 0, "hits": 0, "seconds": 0.0})
+                for key, value in counter.items():
+                    total[key] += value
+            self.fallback_domains.update(delta.get("fallback_domains", {}))
+
+    def stats(self) -> Dict:
+        with self.lock:
+            extractors = {
+                name: {
+                    "calls": counter["calls"],
+                    "hit_rate": counter["hits"] / counter["calls"] if counter["calls"] else None,
+                    "avg_ms": counter["seconds"] / counter["calls"] * 1000 if counter["calls"] else None,
+                }
+                for name, counter in self.counters.items()
+            }
+            return {"extractors": extractors, "top_fallback_domains": self.fallback_domains.most_common(10)}
+
+
+registry = ExtractorRegistry(fallback=GenericExtractor())
+camphub = registry.register(CamphubExtractor())
+instagram = registry.register(InstagramExtractor())
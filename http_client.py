@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+
+from extractors import host_of
+from metrics import percentile
+from politeness import LIVE, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  httpx only negotiates HTTP/2 when the h2 package is installed
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+
+
+class HttpClient:
+    # One long-lived httpx.AsyncClient for every non-Scrapy fetch: keep-alive pooling,
+    # HTTP/2 when available, a concurrency cap per host, timeouts and retry with backoff.
+    # With a PolitenessScheduler every attempt also waits for its host's turn, and 429 / 5xx
+    # responses pause the host for the Retry-After the server asked for.
+
+    def __init__(self, max_connections: int = 20, max_keepalive: int = 10, keepalive_expiry: float = 30,
+                 per_host: int = 4, timeout: float = 10, retries: int = 3, backoff: float = 0.5,
+                 latency_window: int = 500, politeness=None):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 5))
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.politeness = politeness  # Optional PolitenessScheduler shared with the spider pool crawls
+        self.client: Optional[httpx.AsyncClient] = None
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+
+        # Metrics
+        self.requests = 0
+        self.new_connections = 0
+        self.retried = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=latency_window)
+
+    async def start(self):
+        if self.client is not None: return
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=self.limits,
+            timeout=self.timeout,
+            headers={'User-Agent': USER_AGENT},
+            follow_redirects=True
+        )
+        logger.info(f"HTTP client started (http2={HTTP2_AVAILABLE})")
+
+    async def close(self):
+        if self.client is None: return
+        await self.client.aclose()
+        self.client = None
+
+    async def _trace(self, event_name: str, info: Dict):
+        # httpcore reports every new TCP connection; anything else was served from the pool
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    async def get(self, url: str, priority: int = LIVE, **kwargs) -> httpx.Response:
+        if self.client is None:
+            await self.start()
+        host = host_of(url)
+        slot = self.host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        extensions = kwargs.pop("extensions", {})
+        extensions["trace"] = self._trace
+
+        attempt = 0
+        while True:
+            if self.politeness is not None:
+                await self.politeness.acquire(url, priority)
+            response = None
+            async with slot:
+                started = time.monotonic()
+                try:
+                    self.requests += 1
+                    response = await self.client.get(url, extensions=extensions, **kwargs)
+                    error = None
+                except httpx.TransportError as e:
+                    error = e
+                finally:
+                    self.latencies.append(time.monotonic() - started)
+                    if self.politeness is not None:
+                        self.politeness.release(
+                            url,
+                            response.status_code if response is not None else None,
+                            response.headers.get("Retry-After") if response is not None else None
+                        )
+
+            retryable = error is not None or response.status_code in RETRY_STATUSES
+            if not retryable or attempt >= self.retries:
+                if error is not None:
+                    self.failures += 1
+                    raise error
+                return response
+
+            attempt += 1
+            self.retried += 1
+            if self.politeness is not None and response is not None:
+                # The scheduler paused the host, the next acquire waits out the Retry-After / backoff
+                logger.warning(f"Retrying {host} when the host resumes ({response.status_code})")
+                continue
+            delay = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+            if delay is not None:
+                delay = min(delay, 60)  # past that the caller is better off failing than holding a worker
+            else:
+                delay = self.backoff * 2 ** (attempt - 1) * (1 + random.random())  # exponential backoff with jitter
+            logger.warning(f"Retrying {host} in {delay:.2f}s ({error or response.status_code})")
+            await asyncio.sleep(delay)
+
+    def open_connections(self) -> Optional[int]:
+        try:
+            return len(self.client._transport._pool.connections)  # httpcore internals, best effort
+        except AttributeError:
+            return None
+
+    def stats(self) -> Dict:
+        return {
+            "open_connections": self.open_connections(),
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reuse_ratio": 1 - self.new_connections / self.requests if self.requests else None,
+            "retried": self.retried,
+            "failures": self.failures,
+            "latency_p50": percentile(self.latencies, 50),
+            "latency_p95": percentile(self.latencies, 95),
+        }
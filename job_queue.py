@@ -0,0 +1,651 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from metrics import logfmt
+from pipeline import ScrapeJob
+from politeness import BACKFILL, LIVE
+
+try:
+    import redis.asyncio as redis_asyncio  # optional, only needed for JOB_QUEUE_URL=redis://...
+except ImportError:
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+FAILED = "failed"
+PRIORITY_SPAN = 10 ** 10  # Redis score: priority * span + enqueue time, so priorities never interleave
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def _refresh_forever(jobs, interval: float):
+    # Keeps the counts behind depth() / stats() (metrics gauges, !scrapestats) fresh without
+    # querying the queue on the event loop
+    while True:
+        try:
+            await jobs.refresh()
+        except Exception as e:
+            logger.warning(logfmt("job queue counts refresh failed", error=type(e).__name__, detail=e))
+        await asyncio.sleep(interval)
+
+
+def claimed_job(url: str, hashLink: bytes, category: str, enqueued_at: float, now: float) -> ScrapeJob:
+    # The queue keeps wall-clock enqueue times (shared across hosts), ScrapeJob a local monotonic one
+    return ScrapeJob(url=url, hashLink=hashLink, category=category,
+                     enqueued_at=time.monotonic() - max(0.0, now - enqueued_at))
+
+
+class SqliteJobQueue:
+    # Shared scrape queue in one SQLite file (WAL) for a gateway and workers on the same host, or tests.
+    # One row per hashLink: enqueueing a link that is already queued or running is a no-op (a live post
+    # only raises the priority of a queued backfill job). claim() leases the best job to a worker for
+    # lease seconds, after which any worker may take it again; complete() deletes it. A job claimed
+    # max_attempts times stays failed until the link is enqueued again.
+
+    def __init__(self, path: str, lease: float = 300.0, max_attempts: int = 3, refresh_interval: float = 1.0,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        # Every query runs in a worker thread. Writes and reads (status, counts) use separate
+        # connections, so a read never waits behind a write blocked on another process's lock
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS scrape_jobs (hashLink BLOB PRIMARY KEY, url TEXT NOT NULL, category TEXT NOT NULL, "
+            "priority INTEGER NOT NULL, state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, enqueued_at REAL NOT NULL, "
+            "lease_until REAL, worker TEXT, error TEXT)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_scrape_jobs_claim ON scrape_jobs (state, priority, enqueued_at)")
+        self.reader = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.reader_lock = threading.Lock()
+        self.cached_counts: Dict[str, int] = {}  # as of refresh(), plus this process's enqueues and claims
+        self.refresher: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.enqueued = 0
+        self.duplicates = 0
+        self.promoted = 0  # a live post of a link queued by the backfill
+        self.claimed = 0
+        self.redelivered = 0  # leases that expired (worker died or hung) and went back to the queue
+        self.completed = 0
+        self.retried = 0
+        self.exhausted = 0
+
+    def _transaction(self, work):
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self.db)
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return result
+
+    def _enqueue(self, db, job: ScrapeJob, priority: int) -> str:
+        row = db.execute("SELECT state, priority FROM scrape_jobs WHERE hashLink = ?", (job.hashLink,)).fetchone()
+        if row is None:
+            db.execute(
+                "INSERT INTO scrape_jobs (hashLink, url, category, priority, state, enqueued_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job.hashLink, job.url, job.category, priority, self.clock())
+            )
+            return "added"
+        state, queued_priority = row
+        if state == FAILED:
+            db.execute(
+                "UPDATE scrape_jobs SET url = ?, category = ?, priority = ?, state = 'queued', attempts = 0, enqueued_at = ?, "
+                "error = NULL WHERE hashLink = ?",
+                (job.url, job.category, priority, self.clock(), job.hashLink)
+            )
+            return "added"
+        if state == QUEUED and priority < queued_priority:
+            db.execute("UPDATE scrape_jobs SET priority = ? WHERE hashLink = ?", (priority, job.hashLink))
+            return "promoted"
+        return "duplicate"
+
+    async def enqueue(self, job: ScrapeJob, priority: int = LIVE) -> bool:
+        # True when the link was not queued or running yet
+        outcome = await asyncio.to_thread(self._transaction, lambda db: self._enqueue(db, job, priority))
+        if outcome == "added":
+            self.enqueued += 1
+            self._bump(QUEUED, priority, 1)
+        elif outcome == "promoted":
+            self.promoted += 1
+            self._bump(QUEUED, BACKFILL, -1)
+            self._bump(QUEUED, priority, 1)
+        else:
+            self.duplicates += 1
+        return outcome == "added"
+
+    def _claim(self, db, worker: str):
+        now = self.clock()
+        expired = db.execute(
+            "UPDATE scrape_jobs SET state = 'queued', worker = NULL WHERE state = 'running' AND lease_until < ?", (now,)
+        ).rowcount
+        exhausted = 0
+        while True:
+            row = db.execute(
+                "SELECT hashLink, url, category, priority, attempts, enqueued_at FROM scrape_jobs "
+                "WHERE state = 'queued' ORDER BY priority, enqueued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return expired, exhausted, None, now
+            if row[4] >= self.max_attempts:
+                db.execute("UPDATE scrape_jobs SET state = 'failed', error = COALESCE(error, 'lease expired') WHERE hashLink = ?", (row[0],))
+                exhausted += 1
+                continue
+            db.execute(
+                "UPDATE scrape_jobs SET state = 'running', attempts = attempts + 1, lease_until = ?, worker = ? WHERE hashLink = ?",
+                (now + self.lease, worker, row[0])
+            )
+            return expired, exhausted, row, now
+
+    async def claim(self, worker: str) -> Optional[Tuple[ScrapeJob, int]]:
+        expired, exhausted, row, now = await asyncio.to_thread(self._transaction, lambda db: self._claim(db, worker))
+        self.redelivered += expired
+        self.exhausted += exhausted
+        if row is None: return None
+        self.claimed += 1
+        hashLink, url, category, priority, _, enqueued_at = row
+        self._bump(QUEUED, priority, -1)
+        self._bump(RUNNING, priority, 1)
+        return claimed_job(url, bytes(hashLink), category, enqueued_at, now), priority
+
+    async def complete(self, hashLinks: Iterable[bytes]):
+        hashLinks = list(hashLinks)
+
+        def work(db):
+            done = 0
+            for start in range(0, len(hashLinks), 500):
+                chunk = hashLinks[start:start + 500]
+                done += db.execute(
+                    f"DELETE FROM scrape_jobs WHERE state != 'failed' AND hashLink IN ({','.join('?' * len(chunk))})", chunk
+                ).rowcount
+            return done
+
+        self.completed += await asyncio.to_thread(self._transaction, work)
+
+    async def retry(self, hashLink: bytes, error: str):
+        # A failed attempt goes back to the queue, or stays failed once it used up max_attempts
+        await asyncio.to_thread(self._transaction, lambda db: db.execute(
+            "UPDATE scrape_jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+            "error = ?, lease_until = NULL, worker = NULL WHERE hashLink = ? AND state = 'running'",
+            (self.max_attempts, error[:500], hashLink)
+        ))
+        self.retried += 1
+
+    async def status(self, hashLinks: Iterable[bytes]) -> Dict[bytes, str]:
+        # State of each job still in the queue; completed jobs are gone
+        hashLinks = list(hashLinks)
+
+        def read():
+            states = {}
+            with self.reader_lock:
+                for start in range(0, len(hashLinks), 500):
+                    chunk = hashLinks[start:start + 500]
+                    rows = self.reader.execute(
+                        f"SELECT hashLink, state FROM scrape_jobs WHERE hashLink IN ({','.join('?' * len(chunk))})", chunk
+                    )
+                    states.update((bytes(hashLink), state) for hashLink, state in rows)
+            return states
+
+        return await asyncio.to_thread(read)
+
+    def _counts(self) -> Dict[str, int]:
+        with self.reader_lock:
+            rows = self.reader.execute("SELECT state, priority, COUNT(*) FROM scrape_jobs GROUP BY state, priority").fetchall()
+        counts = {}
+        for state, priority, count in rows:
+            counts[f"{state}_{'live' if priority == LIVE else 'backfill'}"] = count
+            counts[state] = counts.get(state, 0) + count
+        return counts
+
+    def _bump(self, state: str, priority: int, amount: int):
+        for key in (state, f"{state}_{'live' if priority == LIVE else 'backfill'}"):
+            self.cached_counts[key] = max(0, self.cached_counts.get(key, 0) + amount)
+
+    async def refresh(self):
+        self.cached_counts = await asyncio.to_thread(self._counts)
+
+    def start(self):
+        if self.refresher is None:
+            self.refresher = asyncio.create_task(_refresh_forever(self, self.refresh_interval), name="job-queue-counts")
+
+    def depth(self, priority: Optional[int] = None) -> int:
+        # Jobs waiting for a worker, as of the last refresh
+        if priority is None:
+            return self.cached_counts.get(QUEUED, 0)
+        return self.cached_counts.get(f"{QUEUED}_{'live' if priority == LIVE else 'backfill'}", 0)
+
+    async def close(self):
+        if self.refresher is not None:
+            self.refresher.cancel()
+            await asyncio.gather(self.refresher, return_exceptions=True)
+            self.refresher = None
+        with self.lock, self.reader_lock:
+            self.db.close()
+            self.reader.close()
+
+    def stats(self) -> Dict:
+        counts = self.cached_counts
+        return {
+            "queued": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "failed": counts.get(FAILED, 0),
+            "queued_live": counts.get(f"{QUEUED}_live", 0),
+            "queued_backfill": counts.get(f"{QUEUED}_backfill", 0),
+            "enqueued": self.enqueued,
+            "duplicates": self.duplicates,
+            "promoted": self.promoted,
+            "claimed": self.claimed,
+            "redelivered": self.redelivered,
+            "completed": self.completed,
+            "retried": self.retried,
+            "exhausted": self.exhausted,
+        }
+
+
+class RedisJobQueue:
+    # The same contract on Redis (or anything speaking its protocol) for workers on other nodes.
+    # <prefix>:queue is a sorted set by priority then enqueue time, <prefix>:leases a sorted set by
+    # lease expiry, and every job a <prefix>:job:<hashLink hex> hash. The scripts touch job keys they
+    # compute themselves, so this needs a single Redis node rather than a cluster.
+
+    ENQUEUE = """
+    local state = redis.call('HGET', KEYS[2], 'state')
+    local priority = tonumber(ARGV[3])
+    if state == 'running' then return 0 end
+    local added = 1
+    if state == 'queued' then
+        if priority >= tonumber(redis.call('HGET', KEYS[2], 'priority')) then return 0 end
+        added = 2
+    else
+        redis.call('HSET', KEYS[2], 'url', ARGV[1], 'category', ARGV[2], 'enqueued_at', ARGV[4], 'attempts', 0, 'state', 'queued')
+        redis.call('HDEL', KEYS[2], 'error', 'worker')
+    end
+    redis.call('HSET', KEYS[2], 'priority', priority)
+    redis.call('ZADD', KEYS[1], priority * tonumber(ARGV[6]) + tonumber(redis.call('HGET', KEYS[2], 'enqueued_at')), ARGV[5])
+    return added
+    """
+    CLAIM = """
+    local now = tonumber(ARGV[1])
+    local span = tonumber(ARGV[6])
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+    for _, member in ipairs(expired) do
+        redis.call('ZREM', KEYS[2], member)
+        local job = ARGV[4] .. member
+        if redis.call('HGET', job, 'state') == 'running' then
+            redis.call('HSET', job, 'state', 'queued')
+            redis.call('ZADD', KEYS[1], tonumber(redis.call('HGET', job, 'priority')) * span + tonumber(redis.call('HGET', job, 'enqueued_at')), member)
+        end
+    end
+    local exhausted = 0
+    while true do
+        local popped = redis.call('ZPOPMIN', KEYS[1])
+        if #popped == 0 then return {#expired, exhausted} end
+        local member = popped[1]
+        local job = ARGV[4] .. member
+        local attempts = tonumber(redis.call('HGET', job, 'attempts') or '0')
+        if attempts >= tonumber(ARGV[3]) then
+            redis.call('HSET', job, 'state', 'failed')
+            exhausted = exhausted + 1
+        else
+            redis.call('HSET', job, 'state', 'running', 'attempts', attempts + 1, 'worker', ARGV[5])
+            redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), member)
+            local fields = redis.call('HMGET', job, 'url', 'category', 'priority', 'enqueued_at')
+            return {#expired, exhausted, member, fields[1], fields[2], fields[3], fields[4]}
+        end
+    end
+    """
+    RETRY = """
+    if redis.call('HGET', KEYS[3], 'state') ~= 'running' then return 0 end
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    redis.call('HSET', KEYS[3], 'error', ARGV[2])
+    redis.call('HDEL', KEYS[3], 'worker')
+    if tonumber(redis.call('HGET', KEYS[3], 'attempts')) >= tonumber(ARGV[3]) then
+        redis.call('HSET', KEYS[3], 'state', 'failed')
+        return 0
+    end
+    redis.call('HSET', KEYS[3], 'state', 'queued')
+    redis.call('ZADD', KEYS[1], tonumber(redis.call('HGET', KEYS[3], 'priority')) * tonumber(ARGV[4]) + tonumber(redis.call('HGET', KEYS[3], 'enqueued_at')), ARGV[1])
+    return 1
+    """
+
+    def __init__(self, url: str, lease: float = 300.0, max_attempts: int = 3, prefix: str = "dipbot:jobs",
+                 refresh_interval: float = 1.0, clock: Callable[[], float] = time.time):
+        if redis_asyncio is None:
+            raise RuntimeError("JOB_QUEUE_URL points at Redis but the redis package is not installed (pip install redis)")
+        self.redis = redis_asyncio.from_url(url, decode_responses=True)
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.prefix = prefix
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.queue_key = f"{prefix}:queue"
+        self.leases_key = f"{prefix}:leases"
+        self.enqueue_script = self.redis.register_script(self.ENQUEUE)
+        self.claim_script = self.redis.register_script(self.CLAIM)
+        self.retry_script = self.redis.register_script(self.RETRY)
+        self.cached_counts: Dict[int, int] = {}  # priority -> queued, refreshed by enqueue / claim and start()
+        self.refresher: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.enqueued = 0
+        self.duplicates = 0
+        self.promoted = 0  # a live post of a link queued by the backfill
+        self.claimed = 0
+        self.redelivered = 0
+        self.completed = 0
+        self.retried = 0
+        self.exhausted = 0
+        self.running = 0
+
+    def job_key(self, member: str) -> str:
+        return f"{self.prefix}:job:{member}"
+
+    async def refresh(self):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for priority in (LIVE, BACKFILL):
+                pipe.zcount(self.queue_key, priority * PRIORITY_SPAN, f"({(priority + 1) * PRIORITY_SPAN}")
+            pipe.zcard(self.leases_key)
+            *queued, self.running = await pipe.execute()
+        self.cached_counts = dict(zip((LIVE, BACKFILL), queued))
+
+    async def enqueue(self, job: ScrapeJob, priority: int = LIVE) -> bool:
+        member = job.hashLink.hex()
+        outcome = await self.enqueue_script(
+            keys=[self.queue_key, self.job_key(member)],
+            args=[job.url, job.category, priority, self.clock(), member, PRIORITY_SPAN]
+        )  # 1 added, 2 promoted, 0 duplicate
+        if outcome == 1:
+            self.enqueued += 1
+        elif outcome == 2:
+            self.promoted += 1
+        else:
+            self.duplicates += 1
+        await self.refresh()
+        return outcome == 1
+
+    async def claim(self, worker: str) -> Optional[Tuple[ScrapeJob, int]]:
+        now = self.clock()
+        reply = await self.claim_script(
+            keys=[self.queue_key, self.leases_key],
+            args=[now, self.lease, self.max_attempts, f"{self.prefix}:job:", worker, PRIORITY_SPAN]
+        )
+        self.redelivered += int(reply[0])
+        self.exhausted += int(reply[1])
+        await self.refresh()
+        if len(reply) == 2: return None
+        self.claimed += 1
+        member, url, category, priority, enqueued_at = reply[2:]
+        return claimed_job(url, bytes.fromhex(member), category, float(enqueued_at), now), int(priority)
+
+    async def complete(self, hashLinks: Iterable[bytes]):
+        members = [hashLink.hex() for hashLink in hashLinks]
+        if not members: return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.leases_key, *members)
+            for member in members:
+                pipe.delete(self.job_key(member))
+            removed = await pipe.execute()
+        self.completed += removed[0]
+
+    async def retry(self, hashLink: bytes, error: str):
+        member = hashLink.hex()
+        await self.retry_script(
+            keys=[self.queue_key, self.leases_key, self.job_key(member)],
+            args=[member, error[:500], self.max_attempts, PRIORITY_SPAN]
+        )
+        self.retried += 1
+
+    async def status(self, hashLinks: Iterable[bytes]) -> Dict[bytes, str]:
+        hashLinks = list(hashLinks)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for hashLink in hashLinks:
+                pipe.hget(self.job_key(hashLink.hex()), "state")
+            states = await pipe.execute()
+        return {hashLink: state for hashLink, state in zip(hashLinks, states) if state is not None}
+
+    def start(self):
+        if self.refresher is None:
+            self.refresher = asyncio.create_task(_refresh_forever(self, self.refresh_interval), name="job-queue-counts")
+
+    def depth(self, priority: Optional[int] = None) -> int:
+        # As of the last refresh
+        if priority is None:
+            return sum(self.cached_counts.values())
+        return self.cached_counts.get(priority, 0)
+
+    async def close(self):
+        if self.refresher is not None:
+            self.refresher.cancel()
+            await asyncio.gather(self.refresher, return_exceptions=True)
+            self.refresher = None
+        await self.redis.aclose()
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self.depth(),
+            "running": self.running,
+            "queued_live": self.depth(LIVE),
+            "queued_backfill": self.depth(BACKFILL),
+            "enqueued": self.enqueued,
+            "duplicates": self.duplicates,
+            "promoted": self.promoted,
+            "claimed": self.claimed,
+            "redelivered": self.redelivered,
+            "completed": self.completed,
+            "retried": self.retried,
+            "exhausted": self.exhausted,
+        }
+
+
+def open_job_queue(url: str, lease: float = 300.0, max_attempts: int = 3):
+    # "redis://host:6379/0" (needs the redis package), or a SQLite file as "sqlite:///path/jobs.db" or a plain path
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobQueue(url, lease=lease, max_attempts=max_attempts)
+    path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else url
+    return SqliteJobQueue(path, lease=lease, max_attempts=max_attempts)
+
+
+class RemotePipeline:
+    # Gateway-mode stand-in for a ScrapePipeline: submitted jobs go to the shared queue and the worker
+    # processes scrape and store them. With track=True, join() waits until every submitted job is
+    # written or failed (Backfill only moves its checkpoint then).
+
+    def __init__(self, jobs, priority: int = LIVE, max_queue: int = 0, track: bool = False, poll_interval: float = 1.0):
+        self.jobs = jobs
+        self.priority = priority
+        self.max_queue = max_queue
+        self.track = track
+        self.poll_interval = poll_interval
+        self.outstanding: Set[bytes] = set()
+        self.tasks: Set[asyncio.Task] = set()
+        self.workers: List = []  # scraping happens elsewhere
+
+        # Metrics
+        self.submitted = 0
+        self.duplicates = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        pass
+
+    async def stop(self, drain: bool = True):
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        if drain:
+            await self.join()
+
+    def depth(self) -> int:
+        return self.jobs.depth(self.priority)
+
+    async def _enqueue(self, job: ScrapeJob):
+        if await self.jobs.enqueue(job, self.priority):
+            self.submitted += 1
+        else:
+            self.duplicates += 1  # already queued or being scraped by a worker
+        if self.track:
+            self.outstanding.add(job.hashLink)
+
+    async def submit(self, job: ScrapeJob):
+        # Backpressure like a bounded queue: wait while max_queue jobs of this priority are waiting
+        while self.max_queue and self.depth() >= self.max_queue:
+            await asyncio.sleep(self.poll_interval)
+        await self._enqueue(job)
+
+    def submit_nowait(self, job: ScrapeJob) -> bool:
+        task = asyncio.create_task(self._enqueue(job))
+        self.tasks.add(task)
+        task.add_done_callback(self._enqueued)
+        return True
+
+    def _enqueued(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(logfmt("enqueue failed", error=type(task.exception()).__name__, detail=task.exception()))
+
+    async def join(self):
+        while self.outstanding:
+            states = await self.jobs.status(self.outstanding)
+            for hashLink in list(self.outstanding):
+                state = states.get(hashLink)
+                if state is None:
+                    self.completed += 1
+                elif state == FAILED:
+                    self.failed += 1
+                else:
+                    continue
+                self.outstanding.discard(hashLink)
+            if self.outstanding:
+                await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self.depth(),
+            "outstanding": len(self.outstanding),
+            "submitted": self.submitted,
+            "duplicates": self.duplicates,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+class QueueConsumer:
+    # Worker-mode loop: claims jobs from the shared queue (live before backfill) into the local
+    # pipelines whenever one of their workers is free, so a worker never sits on leases it cannot
+    # start. A job is completed once its row is written (WriteBuffer.on_flush), or right away when
+    # the scrape found nothing to store; a failed scrape goes back to the queue, minus the negative
+    # cache entry it left behind (forget) so the retry scrapes again. A worker that dies
+    # leaves its jobs to expire and be claimed by another one: rows are upserted by hashLink, so a
+    # job done twice is stored once.
+
+    def __init__(self, jobs, writer, model, save: Callable[[ScrapeJob, object], Awaitable[None]],
+                 worker: Optional[str] = None, poll_interval: float = 1.0,
+                 forget: Optional[Callable[[ScrapeJob], Awaitable[None]]] = None):
+        self.jobs = jobs
+        self.writer = writer
+        self.model = model
+        self.save = save
+        self.forget = forget
+        self.worker = worker or worker_name()
+        self.poll_interval = poll_interval
+        self.pipelines: Dict[int, object] = {}  # priority -> ScrapePipeline, set by the owner
+        self.room = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.claimed = 0
+        self.completed = 0
+        self.retried = 0
+        self.empty_polls = 0
+        self.errors = 0
+
+    def start(self):
+        if self.task is not None: return
+        for pipeline in self.pipelines.values():
+            pipeline.start()
+        self.task = asyncio.create_task(self._run(), name="queue-consumer")
+        logger.info(logfmt("queue consumer started", worker=self.worker))
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        for pipeline in self.pipelines.values():
+            await pipeline.stop(drain=True)  # finish what was claimed
+
+    def busy(self) -> int:
+        return sum(pipeline.depth() + pipeline.in_progress for pipeline in self.pipelines.values())
+
+    def capacity(self) -> int:
+        return sum(pipeline.worker_count for pipeline in self.pipelines.values())
+
+    async def _run(self):
+        while True:
+            if self.busy() >= self.capacity():
+                self.room.clear()
+                try:
+                    await asyncio.wait_for(self.room.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                claimed = await self.jobs.claim(self.worker)
+            except Exception as e:
+                self.errors += 1
+                logger.error(logfmt("claim failed", worker=self.worker, error=type(e).__name__, detail=e))
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if claimed is None:
+                self.empty_polls += 1
+                await asyncio.sleep(self.poll_interval)
+                continue
+            job, priority = claimed
+            self.claimed += 1
+            self.pipelines.get(priority, self.pipelines[LIVE]).submit_nowait(job)
+
+    async def on_result(self, job: ScrapeJob, result):
+        await self.save(job, result)
+        if not self.writer.is_pending(self.model, job.hashLink):
+            await self.jobs.complete([job.hashLink])  # nothing to write
+            self.completed += 1
+        self.room.set()
+
+    async def on_error(self, job: ScrapeJob, error: Exception):
+        if self.forget is not None:
+            await self.forget(job)
+        await self.jobs.retry(job.hashLink, f"{type(error).__name__}: {error}")
+        self.retried += 1
+        self.room.set()
+
+    async def on_flush(self, hashLinks: Set[bytes]):
+        await self.jobs.complete(hashLinks)
+        self.completed += len(hashLinks)
+
+    def stats(self) -> Dict:
+        return {
+            "busy": self.busy(),
+            "capacity": self.capacity(),
+            "claimed": self.claimed,
+            "completed": self.completed,
+            "retried": self.retried,
+            "empty_polls": self.empty_polls,
+            "errors": self.errors,
+        }
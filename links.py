@@ -0,0 +1,64 @@
+import hashlib
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from extractors import instagram, registry
+
+URL_REGEX = re.compile(
+    r'http[s]?://'  # http:// or https://
+    r'(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|'  # domain and allowed characters
+    r'(?:%[0-9a-fA-F][0-9a-fA-F]))+'  # and hex characters
+    r'(?:/[a-zA-Z0-9#\-_./?=&%]*)?'  # optional path
+    r'(?!.*\s)'  # no spaces allowed
+)
+
+
+# Query parameters that only track where a click came from, never what page it is
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "igsh", "igshid", "mc_cid", "mc_eid", "si", "ref_src", "_ga"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def is_tracking(param: str) -> bool:
+    param = param.lower()
+    return param in TRACKING_PARAMS or param.startswith("utm_")
+
+
+def clean_query(query: str, sort: bool = False) -> str:
+    params = [(key, value) for key, value in parse_qsl(query, keep_blank_values=True) if not is_tracking(key)]
+    return urlencode(sorted(params) if sort else params)
+
+
+def link_from_message(content: str) -> Optional[str]:
+    # A message is a link post when it starts with a URL. The link that is scraped and stored
+    # loses its tracking parameters and fragment, and a bare path always ends with "/".
+    if not content or not URL_REGEX.match(content): return None
+    parts = urlsplit(content)
+    query = clean_query(parts.query)
+    path = parts.path if query or parts.path.endswith("/") else parts.path + "/"
+    return urlunsplit((parts.scheme, parts.netloc, path, query, ""))
+
+
+def canonicalize(url: str) -> str:
+    # Identity of a link: lowercase scheme and host without "www." or a default port, no trailing
+    # slash, no fragment, no tracking parameters and the rest of the query sorted. Instagram posts
+    # are the same post whatever the URL decoration, they are identified by shortcode.
+    if registry.lookup(url) is instagram:
+        return f"instagram:{instagram.shortcode(url)}"
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = f"{host}:{parts.port}" if parts.port and parts.port != DEFAULT_PORTS.get(scheme) else host
+    path = parts.path.rstrip("/")
+    return urlunsplit((scheme, netloc, path, clean_query(parts.query, sort=True), ""))
+
+
+def hash_link(url: str) -> bytes:
+    # 16-byte key of the canonical link, stored as BINARY(16)
+    return hashlib.md5(canonicalize(url).encode()).digest()
+
+
+def cache_key(url: str) -> str:
+    return canonicalize(url)
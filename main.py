@@ -1,12 +1,9 @@
 # datetime
-from datetime import datetime
-from zoneinfo import ZoneInfo
 import pytz
 
 # discord
 from discord.ext import commands
 import discord
-import re
 
 # env
 from dotenv import dotenv_values
@@ -15,25 +12,36 @@ import os
 # python typing
 from typing import List
 
-# hash
-import hashlib
-
-# Web Scrape
-from scrapy.utils.log import configure_logging
-
 # sqlalchemy
-from sqlalchemy import select, update
 from sqlalchemy.exc import SQLAlchemyError
 
 # logging
 import logging
 
-# Import from local
-from ActivityScraper import ActivityScraper
-from database import Base, session, Camp, Competition, Other
+# Import from local (ActivityScraper and its scrapy / NLP dependencies are loaded by prewarm)
+from database import Activity, CAMP, COMPETITION, OTHER, BackfillCheckpoint, async_engine, session_scope, db_metrics
+from pipeline import ScrapePipeline, ScrapeJob
+from spider_pool import SpiderPool
+from extractors import registry
+from http_client import HttpClient
+from scrape_cache import ScrapeCache
+from links import URL_REGEX, cache_key, hash_link, link_from_message
+from queries import exists
+from write_buffer import WriteBuffer
+from backfill import Backfill
+from expiry import ExpiryScheduler
+from politeness import BACKFILL, LIVE, PolitenessScheduler, parse_host_limits
+from job_queue import QueueConsumer, RemotePipeline, open_job_queue
+import metrics
+from metrics import MetricsServer, logfmt, span
 
 # async
 import asyncio
+import signal
+import time
+
+logger = logging.getLogger(__name__)
+STATS_MAX_HOSTS = 5  # per-host politeness lines in !scrapestats
 
 class DIPSharingBot(commands.Cog):
     def __init__(self, bot):
@@ -43,20 +51,249 @@ class DIPSharingBot(commands.Cog):
         self.COMP_CHANNEL_NAME = self.config.get("COMP_CHANNEL_NAME") if self.config else os.getenv("COMP_CHANNEL_NAME")
         self.OTHER_CHANNEL_NAME = self.config.get("OTHER_CHANNEL_NAME") if self.config else os.getenv("OTHER_CHANNEL_NAME")
         self.CHANNELS_ID = self.config.get("CHANNELS_ID").split(',') if self.config else os.getenv("CHANNELS_ID").split(',')
-        self.URL_REGEX = re.compile(
-            r'http[s]?://'  # http:// or https://
-            r'(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|'  # domain and allowed characters
-            r'(?:%[0-9a-fA-F][0-9a-fA-F]))+'  # and hex characters
-            r'(?:/[a-zA-Z0-9#\-_./?=&%]*)?'  # optional path
-            r'(?!.*\s)'  # no spaces allowed
-        )
+        self.URL_REGEX = URL_REGEX
+        self.SCRAPE_WORKERS = int((self.config.get("SCRAPE_WORKERS") if self.config else os.getenv("SCRAPE_WORKERS")) or 4)
+        self.SCRAPE_QUEUE_SIZE = int((self.config.get("SCRAPE_QUEUE_SIZE") if self.config else os.getenv("SCRAPE_QUEUE_SIZE")) or 0)
+        self.SPIDER_POOL_SIZE = int((self.config.get("SPIDER_POOL_SIZE") if self.config else os.getenv("SPIDER_POOL_SIZE")) or 2)
+        self.SPIDER_MAX_JOBS = int((self.config.get("SPIDER_MAX_JOBS") if self.config else os.getenv("SPIDER_MAX_JOBS")) or 200)
+        self.SPIDER_CONCURRENCY = int((self.config.get("SPIDER_CONCURRENCY") if self.config else os.getenv("SPIDER_CONCURRENCY")) or 8)
+        self.HTTP_MAX_CONNECTIONS = int((self.config.get("HTTP_MAX_CONNECTIONS") if self.config else os.getenv("HTTP_MAX_CONNECTIONS")) or 20)
+        self.HTTP_PER_HOST = int((self.config.get("HTTP_PER_HOST") if self.config else os.getenv("HTTP_PER_HOST")) or 4)
+        self.HTTP_TIMEOUT = float((self.config.get("HTTP_TIMEOUT") if self.config else os.getenv("HTTP_TIMEOUT")) or 10)
+        self.HTTP_RETRIES = int((self.config.get("HTTP_RETRIES") if self.config else os.getenv("HTTP_RETRIES")) or 3)
+        self.SCRAPE_CACHE_SIZE = int((self.config.get("SCRAPE_CACHE_SIZE") if self.config else os.getenv("SCRAPE_CACHE_SIZE")) or 1024)
+        self.SCRAPE_CACHE_TTL = float((self.config.get("SCRAPE_CACHE_TTL") if self.config else os.getenv("SCRAPE_CACHE_TTL")) or 6 * 3600)
+        self.SCRAPE_CACHE_NEGATIVE_TTL = float((self.config.get("SCRAPE_CACHE_NEGATIVE_TTL") if self.config else os.getenv("SCRAPE_CACHE_NEGATIVE_TTL")) or 15 * 60)
+        self.SCRAPE_CACHE_PATH = self.config.get("SCRAPE_CACHE_PATH") if self.config else os.getenv("SCRAPE_CACHE_PATH")
+        self.WRITE_BUFFER_SIZE = int((self.config.get("WRITE_BUFFER_SIZE") if self.config else os.getenv("WRITE_BUFFER_SIZE")) or 100)
+        self.WRITE_BUFFER_INTERVAL = float((self.config.get("WRITE_BUFFER_INTERVAL") if self.config else os.getenv("WRITE_BUFFER_INTERVAL")) or 2)
+        self.WRITE_BUFFER_RETRIES = int((self.config.get("WRITE_BUFFER_RETRIES") if self.config else os.getenv("WRITE_BUFFER_RETRIES")) or 3)
+        self.BACKFILL_WORKERS = int((self.config.get("BACKFILL_WORKERS") if self.config else os.getenv("BACKFILL_WORKERS")) or 8)
+        self.BACKFILL_QUEUE_SIZE = int((self.config.get("BACKFILL_QUEUE_SIZE") if self.config else os.getenv("BACKFILL_QUEUE_SIZE")) or 200)
+        self.BACKFILL_BATCH_SIZE = int((self.config.get("BACKFILL_BATCH_SIZE") if self.config else os.getenv("BACKFILL_BATCH_SIZE")) or 100)
+        self.EXPIRY_INTERVAL = float((self.config.get("EXPIRY_INTERVAL") if self.config else os.getenv("EXPIRY_INTERVAL")) or 300)
+        self.EXPIRY_JITTER = float((self.config.get("EXPIRY_JITTER") if self.config else os.getenv("EXPIRY_JITTER")) or 0.2)
+        self.EXPIRY_CHUNK_SIZE = int((self.config.get("EXPIRY_CHUNK_SIZE") if self.config else os.getenv("EXPIRY_CHUNK_SIZE")) or 500)
+        self.POLITENESS_RATE = float((self.config.get("POLITENESS_RATE") if self.config else os.getenv("POLITENESS_RATE")) or 1)
+        self.POLITENESS_BURST = int((self.config.get("POLITENESS_BURST") if self.config else os.getenv("POLITENESS_BURST")) or 5)
+        self.POLITENESS_CONCURRENCY = int((self.config.get("POLITENESS_CONCURRENCY") if self.config else os.getenv("POLITENESS_CONCURRENCY")) or 2)
+        self.POLITENESS_HOST_LIMITS = self.config.get("POLITENESS_HOST_LIMITS") if self.config else os.getenv("POLITENESS_HOST_LIMITS")
+        self.POLITENESS_MAX_BACKOFF = float((self.config.get("POLITENESS_MAX_BACKOFF") if self.config else os.getenv("POLITENESS_MAX_BACKOFF")) or 300)
+        self.POLITENESS_MAX_HOSTS = int((self.config.get("POLITENESS_MAX_HOSTS") if self.config else os.getenv("POLITENESS_MAX_HOSTS")) or 1024)
+        # all: one process does everything; gateway: Discord only, jobs go to JOB_QUEUE_URL; worker: scrapes from it
+        self.BOT_MODE = (self.config.get("BOT_MODE") if self.config else os.getenv("BOT_MODE")) or "all"
+        # The image sets it to sqlite:////app/data/jobs.db, /app itself is not writable for appuser
+        self.JOB_QUEUE_URL = (self.config.get("JOB_QUEUE_URL") if self.config else os.getenv("JOB_QUEUE_URL")) or "sqlite:///jobs.db"
+        self.JOB_LEASE = float((self.config.get("JOB_LEASE") if self.config else os.getenv("JOB_LEASE")) or 300)
+        self.JOB_MAX_ATTEMPTS = int((self.config.get("JOB_MAX_ATTEMPTS") if self.config else os.getenv("JOB_MAX_ATTEMPTS")) or 3)
+        self.JOB_POLL_INTERVAL = float((self.config.get("JOB_POLL_INTERVAL") if self.config else os.getenv("JOB_POLL_INTERVAL")) or 1)
+        self.PREWARM = ((self.config.get("PREWARM") if self.config else os.getenv("PREWARM")) or "1") == "1"
+        self.METRICS_HOST = (self.config.get("METRICS_HOST") if self.config else os.getenv("METRICS_HOST")) or "0.0.0.0"
+        self.METRICS_PORT = int((self.config.get("METRICS_PORT") if self.config else os.getenv("METRICS_PORT")) or 4000)  # 0 disables /metrics
         self.channels = []
+        self.cache = ScrapeCache(
+            max_entries=self.SCRAPE_CACHE_SIZE,
+            ttl=self.SCRAPE_CACHE_TTL,
+            negative_ttl=self.SCRAPE_CACHE_NEGATIVE_TTL,
+            path=self.SCRAPE_CACHE_PATH
+        )
+        # Paces every outbound scrape per host, live messages first; shared by the HTTP client and the crawls
+        self.politeness = PolitenessScheduler(
+            rate=self.POLITENESS_RATE,
+            burst=self.POLITENESS_BURST,
+            concurrency=self.POLITENESS_CONCURRENCY,
+            host_limits=parse_host_limits(self.POLITENESS_HOST_LIMITS),
+            max_backoff=self.POLITENESS_MAX_BACKOFF,
+            max_hosts=self.POLITENESS_MAX_HOSTS
+        )
+        self.http = HttpClient(
+            max_connections=self.HTTP_MAX_CONNECTIONS,
+            per_host=self.HTTP_PER_HOST,
+            timeout=self.HTTP_TIMEOUT,
+            retries=self.HTTP_RETRIES,
+            politeness=self.politeness
+        )
+        self.spider_pool = SpiderPool(
+            size=self.SPIDER_POOL_SIZE,
+            max_jobs=self.SPIDER_MAX_JOBS,
+            concurrency=self.SPIDER_CONCURRENCY
+        )
+        self.writer = WriteBuffer(
+            session_scope,
+            dialect=async_engine.dialect.name,
+            max_rows=self.WRITE_BUFFER_SIZE,
+            flush_interval=self.WRITE_BUFFER_INTERVAL,
+            retries=self.WRITE_BUFFER_RETRIES
+        )
+        self.scraper = None  # created by prewarm
+        self.prewarm_task = None
+        self.jobs = None if self.BOT_MODE == "all" else open_job_queue(
+            self.JOB_QUEUE_URL, lease=self.JOB_LEASE, max_attempts=self.JOB_MAX_ATTEMPTS
+        )
+        self.consumer = None
+        if self.BOT_MODE == "worker":
+            # claimed jobs are completed once their rows are flushed
+            self.consumer = QueueConsumer(
+                self.jobs, self.writer, Activity, save=self.save_result, poll_interval=self.JOB_POLL_INTERVAL,
+                forget=lambda job: self.cache.forget(cache_key(job.url))  # let the retry scrape again
+            )
+            self.writer.on_flush = self.consumer.on_flush
+        if self.BOT_MODE == "gateway":
+            self.pipeline = RemotePipeline(self.jobs, LIVE, poll_interval=self.JOB_POLL_INTERVAL)
+            backfill_pipeline = RemotePipeline(
+                self.jobs, BACKFILL, max_queue=self.BACKFILL_QUEUE_SIZE, track=True, poll_interval=self.JOB_POLL_INTERVAL
+            )
+        else:
+            self.pipeline = ScrapePipeline(
+                scrape=self.cached_scrape,
+                on_result=self.consumer.on_result if self.consumer else self.save_result,
+                on_error=self.consumer.on_error if self.consumer else None,
+                workers=self.SCRAPE_WORKERS,
+                max_queue=self.SCRAPE_QUEUE_SIZE
+            )
+            # History backfill gets its own bounded pipeline so it never queues ahead of live messages
+            backfill_pipeline = ScrapePipeline(
+                scrape=self.backfill_scrape,
+                on_result=self.consumer.on_result if self.consumer else self.save_result,
+                on_error=self.consumer.on_error if self.consumer else None,
+                workers=self.BACKFILL_WORKERS,
+                max_queue=self.BACKFILL_QUEUE_SIZE
+            )
+        if self.consumer is not None:
+            self.consumer.pipelines = {LIVE: self.pipeline, BACKFILL: backfill_pipeline}
+        self.backfill = Backfill(
+            pipeline=backfill_pipeline,
+            writer=self.writer,
+            session_scope=session_scope,
+            model=Activity,
+            category_for=self.category_for,
+            checkpoint_model=BackfillCheckpoint,
+            batch_size=self.BACKFILL_BATCH_SIZE
+        )
+        self.backfill_task = None
+        self.expiry = ExpiryScheduler(
+            session_scope,
+            Activity,
+            interval=self.EXPIRY_INTERVAL,
+            jitter=self.EXPIRY_JITTER,
+            chunk_size=self.EXPIRY_CHUNK_SIZE
+        )
+        self.metrics_server = MetricsServer(host=self.METRICS_HOST, port=self.METRICS_PORT) if self.METRICS_PORT else None
+        self.register_metrics()
+
+    def register_metrics(self):
+        # Queue depths plus the numeric fields of every component's stats() on /metrics
+        metrics.QUEUE_DEPTH.set_function(self.pipeline.depth, queue="live")
+        metrics.QUEUE_DEPTH.set_function(self.backfill.pipeline.depth, queue="backfill")
+        metrics.QUEUE_DEPTH.set_function(self.writer.pending, queue="write_buffer")
+        metrics.QUEUE_DEPTH.set_function(lambda: self.spider_pool.stats()["pending"], queue="spider_pool")
+        metrics.registry.collect("pipeline", self.pipeline.stats)
+        metrics.registry.collect("backfill", self.backfill.stats)
+        metrics.registry.collect("cache", self.cache.stats)
+        metrics.registry.collect("http", self.http.stats)
+        metrics.registry.collect("politeness", self.politeness.stats)
+        metrics.registry.collect("writes", self.writer.stats)
+        metrics.registry.collect("expiry", self.expiry.stats)
+        metrics.registry.collect("db", db_metrics.stats)
+        if self.jobs is not None:
+            metrics.registry.collect("jobs", self.jobs.stats)
+        if self.consumer is not None:
+            metrics.registry.collect("consumer", self.consumer.stats)
+
+    async def cog_load(self):
+        await self.http.start()
+        self.writer.start()
+        if self.jobs is not None:
+            self.jobs.start()
+        if self.consumer is not None:
+            if self.PREWARM:
+                self.prewarm_task = asyncio.create_task(self.prewarm(), name="prewarm")  # no on_ready without a gateway
+            self.consumer.start()
+        else:
+            self.pipeline.start()
+        if self.BOT_MODE != "worker":
+            self.expiry.start()  # one sweeper is enough, the gateway (or the single process) runs it
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+
+    async def start_backfill(self):
+        # python backfill.py, often next to the running bot: only what a backfill writes through.
+        # No metrics server (its port is taken), no second expiry sweeper and no live pipeline.
+        await self.http.start()
+        self.writer.start()
+        if self.jobs is not None:
+            self.jobs.start()
+
+    async def cog_unload(self):
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        await self.expiry.stop()
+        if self.prewarm_task is not None:
+            await asyncio.gather(self.prewarm_task, return_exceptions=True)
+        if self.backfill_task is not None:
+            self.backfill_task.cancel()
+            await asyncio.gather(self.backfill_task, return_exceptions=True)
+        if self.consumer is not None:
+            await self.consumer.stop()
+        else:
+            await self.pipeline.stop()
+        await self.writer.stop()  # flush whatever the last scrapes produced
+        await asyncio.to_thread(self.spider_pool.stop)
+        await self.http.close()
+        self.cache.close()
+        if self.jobs is not None:
+            await self.jobs.close()
+        await async_engine.dispose()
+
+    def load_scraper(self):
+        # Runs in a worker thread: scrapy, twisted, pythainlp, langdetect and dateparser take seconds
+        # to import, so the bot logs in first and pays for them in the background
+        from scrapy.utils.log import configure_logging
+        from pythainlp.util import normalize
+        from ActivityScraper import ActivityScraper
+
+        configure_logging(install_root_handler=False)
+        scraper = ActivityScraper(spider_pool=self.spider_pool, http=self.http, politeness=self.politeness)
+        normalize("ค่าย")
+        scraper.analyze_caption("Prewarm ค่าย Camp ปิดรับสมัคร next friday")  # langdetect profiles, dateparser languages
+        return scraper
+
+    async def prewarm(self):
+        started = time.monotonic()
+        try:
+            scraper = await asyncio.to_thread(self.load_scraper)
+        except Exception as e:
+            logger.error(logfmt("prewarm failed", error=type(e).__name__, detail=e))
+            raise
+        self.spider_pool.start()  # forked after the imports so the workers start warm
+        self.scraper = scraper
+        logger.info(logfmt("prewarm done", seconds=time.monotonic() - started))
+
+    async def ensure_scraper(self):
+        if self.scraper is None:
+            # not started yet (PREWARM=0, or a message beat on_ready), or a failed attempt to retry
+            if self.prewarm_task is None or self.prewarm_task.done():
+                self.prewarm_task = asyncio.create_task(self.prewarm(), name="prewarm")
+            await asyncio.shield(self.prewarm_task)
+        return self.scraper
+
+    async def cached_scrape(self, url, priority=LIVE):
+        scraper = await self.ensure_scraper()
+        # Same link in another channel, a repost of a failed link or a concurrent post share one scrape
+        return await self.cache.get_or_scrape(cache_key(url), lambda: scraper.scrape_event_async(url, priority))
+
+    async def backfill_scrape(self, url):
+        # History waits behind live messages for the same host
+        return await self.cached_scrape(url, BACKFILL)
 
     @commands.Cog.listener()
     async def on_ready(self):
         logger.info("DIP Sharing Bot is ready")
+        if self.PREWARM and self.prewarm_task is None and self.BOT_MODE == "all":
+            self.prewarm_task = asyncio.create_task(self.prewarm(), name="prewarm")
         for id in self.CHANNELS_ID:
             channel = self.bot.get_channel(int(id))
+            if channel is None: continue  # on a shard another process handles
             await channel.send("Hello! DIP Sharing Bot is ready!")
             self.channels.append(channel)
 
@@ -66,79 +303,171 @@ class DIPSharingBot(commands.Cog):
             # Handle channel isn't in the channels list
             if msg.channel not in self.channels: return
 
-            # Handle message that isn't url
-            if not self.URL_REGEX.match(msg.content): return
+            # Handle message that isn't url, the url always ends with /
+            url = link_from_message(msg.content)
+            if url is None: return
 
-            # Handle / after url and declare url
-            url = msg.content if msg.content[-1] == "/" else msg.content + "/"
+            # hash a link to query from database
+            hashLink = hash_link(url)
 
-            # change activity type from obj to str
-            activity_type = msg.channel.name
+            # assign category to store under
+            category = self.category_for(msg.channel)
 
-            # hash a link to query from database
-            hashLink = hashlib.md5(url.encode()).hexdigest()
-
-            # assign model to query
-            Type = None
-            if activity_type == self.CAMP_CHANNEL_NAME:
-                Type = Camp
-            elif activity_type == self.COMP_CHANNEL_NAME:
-                Type = Competition
-            elif activity_type == self.OTHER_CHANNEL_NAME:
-                Type = Other
-            
             # Handle Wrong Channel
-            if Type is None: return
+            if category is None: return
 
-            # query to table based on activity type is it have hashLink
-            query = select(Type).filter(Type.hashLink == hashLink)
-            data = session.execute(query).scalars().all()
+            # already scraped but not flushed yet
+            if self.writer.is_pending(Activity, hashLink): return
 
-            if len(data) > 0:
-                update_query = update(Type).where(Type.hashLink == hashLink).values(updatedAt=datetime.now(ZoneInfo('UTC')))
-                session.execute(update_query)
-                session.commit()
+            # check the table for the hashLink (in any category), the updatedAt bump is batched by the write buffer
+            if await self.link_exists(hashLink):
+                self.writer.touch(Activity, hashLink)
                 return
 
-            result = ActivityScraper().run_scrape_event(url)
+            # hand the scrape to the pipeline (or the shared queue in gateway mode), the result is saved by save_result
+            self.pipeline.submit_nowait(ScrapeJob(url=url, hashLink=hashLink, category=category))
+            logger.info(logfmt("queued", url=url, category=category, depth=self.pipeline.depth()))
+        except SQLAlchemyError as e:
+            metrics.record_error("on_message", type(e).__name__)
+            logger.error(logfmt("database error", stage="on_message", error=type(e).__name__, detail=e))
+        except Exception as e:
+            metrics.record_error("on_message", type(e).__name__)
+            logger.error(logfmt("unexpected error", stage="on_message", error=type(e).__name__, detail=e))
 
-            if result["imageUrl"] is None: return
+    def category_for(self, channel):
+        # change activity type from channel to its category
+        activity_type = channel.name
+        if activity_type == self.CAMP_CHANNEL_NAME:
+            return CAMP
+        elif activity_type == self.COMP_CHANNEL_NAME:
+            return COMPETITION
+        elif activity_type == self.OTHER_CHANNEL_NAME:
+            return OTHER
+        return None
 
-            deadline = None if result["deadline"] is None else result["deadline"].astimezone(pytz.utc)
+    async def link_exists(self, hashLink):
+        with span("db.exists"):
+            async with session_scope() as session:
+                return (await session.execute(exists(Activity, hashLink))).first() is not None
 
-            new_entry = Type(
-                hashLink = hashLink,
-                link =  url,
-                topic = result["topic"],
-                imageUrl = result["imageUrl"],
-                deadline = deadline
-            )
+    async def save_result(self, job, result):
+        if result is None or result["imageUrl"] is None: return
+        deadline = None if result["deadline"] is None else result["deadline"].astimezone(pytz.utc)
 
-            session.add(new_entry)
-            session.commit()
-        except SQLAlchemyError as e:
-            session.rollback()
-            logger.error(f"Database error: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-        finally:
-            session.close()
+        self.writer.insert(Activity, {
+            "category": job.category,
+            "hashLink": job.hashLink,
+            "link": job.url,
+            "topic": result["topic"],
+            "imageUrl": result["imageUrl"],
+            "deadline": deadline
+        })
+
+    @commands.command(name="backfill")
+    @commands.has_permissions(manage_guild=True)
+    async def backfill_command(self, ctx, limit: int = None, reset: str = None):
+        # !backfill [limit] [reset]: scrape links posted in the bot channels while it was offline
+        if self.backfill.running:
+            await ctx.send("A backfill is already running")
+            return
+        status = await ctx.send("Backfill started")
+
+        async def progress(stats):
+            await status.edit(content=f"Backfill: {stats['messages']} messages, {stats['links']} links, "
+                                      f"{stats['skipped']} already stored, {stats['queued']} queued "
+                                      f"({stats['messages_per_sec'] or 0:.1f} msg/s)")
+
+        async def run():
+            try:
+                stats = await self.backfill.run(self.channels, limit=limit, reset=reset == "reset", progress=progress)
+                await ctx.send(f"Backfill done: {stats['scraped']} scraped, {stats['failed']} failed, "
+                               f"{stats['skipped']} already stored in {stats['elapsed']:.0f}s")
+            except Exception as e:
+                logger.error(f"Backfill failed: {e}")
+                await ctx.send(f"Backfill failed: {e}")
+            finally:
+                self.backfill_task = None
+
+        self.backfill_task = asyncio.create_task(run(), name="backfill")
+
+    @commands.command(name="scrapestats")
+    @commands.has_permissions(manage_guild=True)
+    async def scrape_stats(self, ctx):
+        stats = self.pipeline.stats()
+        lines = [f"{key}: {round(value, 3) if isinstance(value, float) else value}" for key, value in stats.items()]
+        pool = self.spider_pool.stats()
+        lines.append(f"spider_pool: size={pool['size']} pending={pool['pending']} restarts={pool['restarts']}")
+        for worker_id, worker in pool["workers"].items():
+            lines.append(f"  worker {worker_id}: jobs={worker['jobs']} errors={worker['errors']} "
+                         f"urls/s={worker['urls_per_sec']:.3f} util={worker['utilization']:.0%}")
+        cache = self.cache.stats()
+        lines.append("cache: " + " ".join(f"{key}={round(value, 3) if isinstance(value, float) else value}" for key, value in cache.items()))
+        http = self.http.stats()
+        lines.append("http: " + " ".join(f"{key}={round(value, 3) if isinstance(value, float) else value}" for key, value in http.items()))
+        if self.jobs is not None:
+            await self.jobs.refresh()
+            jobs = self.jobs.stats()
+            lines.append(f"jobs ({self.BOT_MODE}): " + " ".join(f"{key}={value}" for key, value in jobs.items()))
+        # Only the hosts being held back, most throttled first, so the message stays under Discord's 2000 chars
+        politeness = self.politeness.stats()
+        held = sorted(
+            ((host, state) for host, state in politeness["per_host"].items()
+             if state["throttled"] or state["paused_for"] or state["waiting"]),
+            key=lambda item: item[1]["throttled"], reverse=True
+        )
+        for host, state in held[:STATS_MAX_HOSTS]:
+            lines.append(f"  host {host}: " + " ".join(f"{key}={round(value, 3) if isinstance(value, float) else value}" for key, value in state.items()))
+        lines.append(f"  {len(politeness['per_host']) - min(len(held), STATS_MAX_HOSTS)} other hosts")
+        writer = self.writer.stats()
+        lines.append("writes: " + " ".join(f"{key}={round(value, 3) if isinstance(value, float) else value}" for key, value in writer.items()))
+        expiry = self.expiry.stats()
+        lines.append("expiry: " + " ".join(f"{key}={round(value, 3) if isinstance(value, float) else value}" for key, value in expiry.items()))
+        db = db_metrics.stats()
+        lines.append("db: " + " ".join(f"{key}={round(value, 4) if isinstance(value, float) else value}" for key, value in db.items()))
+        extractor_stats = registry.stats()
+        for name, extractor in extractor_stats["extractors"].items():
+            lines.append(f"extractor {name}: calls={extractor['calls']} hit_rate={extractor['hit_rate']:.0%} "
+                         f"avg={extractor['avg_ms']:.1f}ms")
+        if extractor_stats["top_fallback_domains"]:
+            lines.append("generic fallback: " + ", ".join(f"{host}={count}" for host, count in extractor_stats["top_fallback_domains"]))
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
 
 if __name__ == "__main__":
     config = dotenv_values(".env")
     BOT_TOKEN = config.get("BOT_TOKEN") if config else os.getenv("BOT_TOKEN")
-
-    configure_logging()
+    BOT_MODE = (config.get("BOT_MODE") if config else os.getenv("BOT_MODE")) or "all"
+    # AutoShardedBot for large guild counts; SHARD_IDS (with SHARD_COUNT) splits the shards across gateway processes
+    SHARDED = ((config.get("SHARDED") if config else os.getenv("SHARDED")) or "0") == "1"
+    SHARD_COUNT = config.get("SHARD_COUNT") if config else os.getenv("SHARD_COUNT")
+    SHARD_IDS = config.get("SHARD_IDS") if config else os.getenv("SHARD_IDS")
 
     # Configure logging
     logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger(__name__)
 
-    bot = commands.Bot(command_prefix="!", intents=discord.Intents.all())
+    if SHARDED:
+        bot = commands.AutoShardedBot(
+            command_prefix="!",
+            intents=discord.Intents.all(),
+            shard_count=int(SHARD_COUNT) if SHARD_COUNT else None,
+            shard_ids=[int(id) for id in SHARD_IDS.split(",")] if SHARD_IDS else None
+        )
+    else:
+        bot = commands.Bot(command_prefix="!", intents=discord.Intents.all())
    
     # Correctly awaiting the add_cog method
     async def main():
         await bot.add_cog(DIPSharingBot(bot))
         await bot.start(os.getenv("BOT_TOKEN"))
 
-    asyncio.run(main())
\ No newline at end of file
+    async def worker():
+        # BOT_MODE=worker never connects to Discord: it scrapes from the shared queue until
+        # SIGTERM / Ctrl-C, then finishes the jobs it claimed and flushes their rows
+        cog = DIPSharingBot(bot)
+        await bot.add_cog(cog)
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        await stop.wait()
+        await bot.remove_cog(cog.qualified_name)
+
+    asyncio.run(worker() if BOT_MODE == "worker" else main())
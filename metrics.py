@@ -0,0 +1,289 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "dipbot"
+# Seconds: from a regex fast path to a slow crawl
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"): return "+Inf"
+    return repr(float(value))
+
+
+def logfmt(event: str, **fields) -> str:
+    # "event key=value key="two words"" so log lines can be grepped and parsed per field
+    parts = [event]
+    for key, value in fields.items():
+        if value is None: continue
+        if isinstance(value, float):
+            value = round(value, 4)
+        value = str(value)
+        if not value or any(char in value for char in ' ="'):
+            value = '"' + value.replace('"', '\\"') + '"'
+        parts.append(f"{key}={value}")
+    return " ".join(parts)
+
+
+def percentile(values, pct: float) -> Optional[float]:
+    # Nearest-rank percentile of the recent samples each component keeps for its stats()
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def drain(self) -> Dict:
+        with self.lock:
+            delta, self.values = self.values, {}
+        return delta
+
+    def reset(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def merge(self, delta: Dict):
+        with self.lock:
+            for key, value in delta.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+    def render(self):
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.values: Dict[Tuple, list] = {}  # labels -> [per-bucket counts, sum, count]
+        self.lock = threading.Lock()
+
+    def key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def drain(self) -> Dict:
+        with self.lock:
+            delta, self.values = self.values, {}
+        return delta
+
+    def reset(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def merge(self, delta: Dict):
+        with self.lock:
+            for key, (counts, total, count) in delta.items():
+                state = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+
+    def render(self):
+        with self.lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self.values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+class Gauge:
+    # Read when scraped: one callable per label set (queue sizes, pool usage)
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.functions: Dict[Tuple, Callable[[], Optional[float]]] = {}
+
+    def set_function(self, function: Callable[[], Optional[float]], **labels):
+        self.functions[tuple(str(labels.get(name, "")) for name in self.labelnames)] = function
+
+    def render(self):
+        for key, function in sorted(self.functions.items()):
+            try:
+                value = function()
+            except Exception as e:
+                logger.warning(f"Gauge {self.name}{_labels(self.labelnames, key)} failed: {e}")
+                continue
+            if value is not None:
+                yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class MetricsRegistry:
+    # Prometheus text exposition (version 0.0.4) without the client library. Counters and
+    # histograms can be drained in a spider worker process and merged into the bot's registry.
+
+    def __init__(self, namespace: str = NAMESPACE):
+        self.namespace = namespace
+        self.metrics: Dict[str, object] = {}
+        self.collectors: Dict[str, Callable[[], Dict]] = {}
+
+    def register(self, metric):
+        metric.name = f"{self.namespace}_{metric.name}"
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def collect(self, subsystem: str, stats: Callable[[], Dict]):
+        # Exports the numeric values of an existing stats() dict as <namespace>_<subsystem>_<key> gauges
+        self.collectors[subsystem] = stats
+
+    def drain(self) -> Dict:
+        return {name: metric.drain() for name, metric in self.metrics.items() if hasattr(metric, "drain")}
+
+    def reset(self):
+        # In a forked spider worker: drop the values (and any lock held at fork time) inherited from the bot
+        for metric in self.metrics.values():
+            if hasattr(metric, "reset"):
+                metric.reset()
+
+    def merge(self, delta: Dict):
+        for name, values in delta.items():
+            metric = self.metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for subsystem, stats in self.collectors.items():
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning(f"Stats collector {subsystem} failed: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)): continue  # None, timestamps, nested per-worker stats
+                name = f"{self.namespace}_{subsystem}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram("stage_seconds", "Time spent per scrape / analysis / database stage", ("stage",))
+STAGE_ERRORS = registry.counter("stage_errors_total", "Failed stages by exception type", ("stage", "error"))
+QUEUE_DEPTH = registry.gauge("queue_depth", "Items waiting per queue", ("queue",))
+
+
+def record_error(stage: str, error: str):
+    # For stages that report failure through their return value instead of raising
+    STAGE_ERRORS.inc(stage=stage, error=error)
+
+
+@contextmanager
+def span(stage: str, **fields):
+    # Times the block into stage_seconds{stage}; exceptions are counted in stage_errors_total and re-raised.
+    # Works in threads and coroutines alike (nothing awaits inside).
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=stage, error=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(logfmt("span", stage=stage, seconds=elapsed, **fields))
+
+
+class MetricsServer:
+    # GET /metrics on the bot's event loop (aiohttp ships with discord.py)
+
+    def __init__(self, registry: MetricsRegistry = registry, host: str = "0.0.0.0", port: int = 4000):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.runner = None
+
+    async def start(self):
+        from aiohttp import web
+
+        async def metrics(request):
+            return web.Response(body=self.registry.render().encode(),
+                                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(logfmt("metrics endpoint started", host=self.host, port=self.port, path="/metrics"))
+
+    async def stop(self):
+        if self.runner is None: return
+        await self.runner.cleanup()
+        self.runner = None
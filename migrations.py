@@ -0,0 +1,127 @@
+import logging
+
+from sqlalchemy import MetaData, String, Table, func, inspect, select, text
+
+from links import hash_link
+
+logger = logging.getLogger(__name__)
+
+# Per-category tables that existed before the Activities table -> category
+LEGACY_TABLES = {"Camps": "camp", "Competitions": "competition", "Others": "other"}
+COLUMNS = "hashLink, link, topic, imageUrl, deadline, createdAt, updatedAt, isActive"
+COPY_COLUMNS = ("link", "topic", "imageUrl", "deadline", "createdAt", "updatedAt", "isActive")
+
+
+def _copy_rows(conn, source: str, activities, category=None, keep_ids=False, chunk=1000):
+    # Copies source into activities in id order, chunk rows at a time, keying every row by
+    # links.hash_link(link). Rows whose canonical link is already there are skipped, so the
+    # oldest row of a set of duplicates wins. Returns (rows read, rows written).
+    table = Table(source, MetaData(), autoload_with=conn)
+    insert = activities.insert().prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+    before = conn.execute(select(func.count()).select_from(activities)).scalar()
+    last_id, read = 0, 0
+    while True:
+        rows = conn.execute(select(table).where(table.c.id > last_id).order_by(table.c.id).limit(chunk)).mappings().all()
+        if not rows: break
+        last_id = rows[-1]["id"]
+        read += len(rows)
+        batch = []
+        for row in rows:
+            values = {column: row[column] for column in COPY_COLUMNS}
+            values["category"] = category or row["category"]
+            values["hashLink"] = hash_link(row["link"])
+            if keep_ids:
+                values["id"] = row["id"]
+            batch.append(values)
+        conn.execute(insert, batch)
+    written = conn.execute(select(func.count()).select_from(activities)).scalar() - before
+    return read, written
+
+
+def _drop_indexes(conn, table: str):
+    for index in inspect(conn).get_indexes(table):
+        if conn.dialect.name == "mysql":
+            conn.execute(text(f"DROP INDEX {index['name']} ON {table}"))
+        else:
+            conn.execute(text(f"DROP INDEX {index['name']}"))
+
+
+def _create_view(conn, activities, table: str):
+    # Old readers compare hashLink with a 32-char hex string, so a BINARY(16) key is shown as lowercase hex.
+    # It is the md5 of links.canonicalize(link): hash lookups through the view only match canonical links,
+    # and they scan the category instead of using the hashLink index.
+    column = next(column for column in inspect(conn).get_columns(activities.name) if column["name"] == "hashLink")
+    key = "hashLink" if isinstance(column["type"], String) else "LOWER(HEX(hashLink)) AS hashLink"
+    columns = COLUMNS.replace("hashLink", key, 1)
+    conn.execute(text(
+        f"CREATE VIEW {table} AS SELECT id, {columns} FROM {activities.name} WHERE category = '{LEGACY_TABLES[table]}'"
+    ))
+
+
+def migrate_to_activities(conn, activities):
+    # Copies Camps / Competitions / Others into Activities, keeps the old tables as <name>_legacy
+    # and puts same-named views in their place so existing readers keep working.
+    # Safe to re-run: tables already replaced by views are skipped, existing views are recreated.
+    # Note the view ids are Activities ids, not the old per-table ids.
+    activities.create(conn, checkfirst=True)
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+    views = set(inspector.get_view_names())
+
+    for table, category in LEGACY_TABLES.items():
+        if table in tables:
+            # a link posted in several channels keeps the category it was stored under first
+            read, copied = _copy_rows(conn, table, activities, category=category)
+            conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}_legacy"))
+            logger.info(f"Copied {copied}/{read} rows from {table} into {activities.name}, old table kept as {table}_legacy")
+        if table in views:
+            conn.execute(text(f"DROP VIEW {table}"))  # views from before the hex hashLink column
+            _create_view(conn, activities, table)
+        else:
+            _create_view(conn, activities, table)
+            logger.info(f"Created compatibility view {table}")
+
+
+def migrate_hash_keys(conn, activities):
+    # Rebuilds an Activities table that still has the 32-char hex VARCHAR(255) hashLink with the
+    # BINARY(16) key of the canonical link. The old table is kept as <name>_hex_legacy without its
+    # indexes. Links that only differed by tracking parameters, "www." or a trailing slash collapse
+    # into their oldest row. A no-op once hashLink is binary.
+    inspector = inspect(conn)
+    if activities.name not in inspector.get_table_names(): return
+    column = next(column for column in inspector.get_columns(activities.name) if column["name"] == "hashLink")
+    if not isinstance(column["type"], String): return
+
+    legacy = f"{activities.name}_hex_legacy"
+    views = [table for table in LEGACY_TABLES if table in inspector.get_view_names()]
+    for view in views:
+        # SQLite rewrites views to follow a renamed table, recreate them on the new one
+        conn.execute(text(f"DROP VIEW {view}"))
+    conn.execute(text(f"ALTER TABLE {activities.name} RENAME TO {legacy}"))
+    _drop_indexes(conn, legacy)
+    activities.create(conn)
+    read, copied = _copy_rows(conn, legacy, activities, keep_ids=True)
+    for view in views:
+        _create_view(conn, activities, view)
+    logger.info(f"Re-keyed {activities.name}: {copied} rows from {read}, {read - copied} duplicate links collapsed, old table kept as {legacy}")
+
+
+def drop_legacy_tables(conn):
+    # Once the copy has been checked
+    for table in LEGACY_TABLES:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}_legacy"))
+    conn.execute(text("DROP TABLE IF EXISTS Activities_hex_legacy"))
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    from database import Activity, engine, init_schema
+
+    with engine.begin() as conn:
+        if "drop-legacy" in sys.argv[1:]:
+            drop_legacy_tables(conn)
+        else:
+            migrate_hash_keys(conn, Activity.__table__)
+            migrate_to_activities(conn, Activity.__table__)
+    init_schema()
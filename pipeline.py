@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import STAGE_SECONDS, logfmt, percentile
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScrapeJob:
+    url: str
+    hashLink: bytes  # links.hash_link of the canonical url
+    category: str  # activity category of the channel the link was posted in
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class ScrapePipeline:
+    # Bounded pool of asyncio workers that run the blocking scrape off the event loop
+    # and hand every finished job to an async callback (usually the DB writer).
+
+    def __init__(self, scrape: Callable[[str], Any], on_result: Callable[[ScrapeJob, Any], Awaitable[None]],
+                 workers: int = 4, max_queue: int = 0, latency_window: int = 500,
+                 on_error: Optional[Callable[[ScrapeJob, Exception], Awaitable[None]]] = None):
+        self.scrape = scrape  # coroutine function, or a blocking callable executed in a worker thread
+        self.on_result = on_result
+        self.on_error = on_error  # optional, for jobs that have to be handed back (shared job queue)
+        self.worker_count = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.workers: List[asyncio.Task] = []
+
+        # Metrics
+        self.completed = 0
+        self.failed = 0
+        self.in_progress = 0
+        self.latencies = deque(maxlen=latency_window)  # seconds from enqueue to callback done
+        self.scrape_times = deque(maxlen=latency_window)  # seconds spent in the scrape itself
+
+    def start(self):
+        if self.workers: return
+        for i in range(self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker(i), name=f"scrape-worker-{i}"))
+        logger.info(f"Scrape pipeline started with {self.worker_count} workers")
+
+    async def stop(self, drain: bool = True):
+        if drain:
+            await self.queue.join()
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        logger.info("Scrape pipeline stopped")
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    async def join(self):
+        # Until every submitted job went through on_result (or failed)
+        await self.queue.join()
+
+    async def submit(self, job: ScrapeJob):
+        await self.queue.put(job)
+
+    def submit_nowait(self, job: ScrapeJob) -> bool:
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"Scrape queue full, dropping {job.url}")
+            return False
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self.queue.get()
+            self.in_progress += 1
+            try:
+                started = time.monotonic()
+                STAGE_SECONDS.observe(started - job.enqueued_at, stage="queue_wait")
+                if asyncio.iscoroutinefunction(self.scrape):
+                    result = await self.scrape(job.url)
+                else:
+                    result = await asyncio.to_thread(self.scrape, job.url)
+                self.scrape_times.append(time.monotonic() - started)
+                await self.on_result(job, result)
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(logfmt("scrape failed", url=job.url, error=type(e).__name__, detail=e))
+                if self.on_error is not None:
+                    try:
+                        await self.on_error(job, e)
+                    except Exception as callback_error:
+                        logger.error(logfmt("scrape error callback failed", url=job.url, detail=callback_error))
+            finally:
+                self.in_progress -= 1
+                self.latencies.append(time.monotonic() - job.enqueued_at)
+                self.queue.task_done()
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "in_progress": self.in_progress,
+            "workers": len(self.workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "latency_p50": percentile(self.latencies, 50),
+            "latency_p95": percentile(self.latencies, 95),
+            "scrape_p50": percentile(self.scrape_times, 50),
+            "scrape_p95": percentile(self.scrape_times, 95),
+        }
@@ -0,0 +1,254 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from extractors import host_of
+from metrics import logfmt, percentile, registry
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: a link posted now goes ahead of backfill jobs waiting for the same host
+LIVE = 0
+BACKFILL = 1
+
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+# host -> (requests per second, burst, concurrent requests); subdomains share their parent's limits
+DEFAULT_HOST_LIMITS = {
+    "instagram.com": (0.2, 3, 1),  # GraphQL rate-limits (and then blocks) bursts quickly
+    "camphub.in.th": (2.0, 5, 4),
+}
+
+WAIT_SECONDS = registry.histogram("politeness_wait_seconds", "Time a request waited for its host's turn", ("host",))
+THROTTLED = registry.counter("politeness_throttled_total", "Requests that had to wait, by reason", ("host", "reason"))
+BACKOFFS = registry.counter("politeness_backoffs_total", "429 / 5xx responses that paused a host", ("host", "status"))
+
+
+def parse_retry_after(value, now: Optional[datetime] = None) -> Optional[float]:
+    # Retry-After is either delay-seconds or an HTTP-date
+    if value is None: return None
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+def parse_host_limits(text: Optional[str]) -> Dict[str, Tuple[float, int, int]]:
+    # "instagram.com=0.2/3/1,camphub.in.th=2/5/4": requests per second / burst / concurrent requests
+    limits = dict(DEFAULT_HOST_LIMITS)
+    for entry in filter(None, (part.strip() for part in (text or "").split(","))):
+        host, _, values = entry.partition("=")
+        rate, burst, concurrency = values.split("/")
+        limits[host.strip().lower()] = (float(rate), int(burst), int(concurrency))
+    return limits
+
+
+class HostState:
+    def __init__(self, rate: float, burst: int, concurrency: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.tokens = float(burst)
+        self.updated = now
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.strikes = 0  # consecutive 429 / 5xx responses
+        self.waiters = []  # heap of (priority, seq, future)
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self.requests = 0
+        self.throttled = 0
+        self.backoffs = 0
+        self.waits = deque(maxlen=500)
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        # Seconds until the next request may start, ignoring the concurrency cap
+        self.refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+
+class PolitenessScheduler:
+    # Per-host outbound scheduling for every scrape (HttpClient requests and spider pool crawls):
+    # a token bucket and a concurrency cap per host, and a pause after 429 / 5xx that honours
+    # Retry-After or backs off exponentially. Requests waiting for the same host are served by
+    # priority, then arrival. Runs on the bot's event loop. Past max_hosts, hosts with nothing in flight
+    # and a full bucket are forgotten: a new state for them is the same as the one dropped.
+
+    def __init__(self, rate: float = 1.0, burst: int = 5, concurrency: int = 2,
+                 host_limits: Optional[Dict[str, Tuple[float, int, int]]] = None, backoff: float = 2.0,
+                 max_backoff: float = 300.0, max_hosts: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.default_limits = (rate, burst, concurrency)
+        self.host_limits = dict(DEFAULT_HOST_LIMITS if host_limits is None else host_limits)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_hosts = max_hosts
+        self.clock = clock
+        self.hosts: Dict[str, HostState] = {}
+        self.sequence = itertools.count()
+        self.evicted = 0
+
+    def key(self, url_or_host: str) -> str:
+        # Hosts with their own limits are scheduled (and labelled) by the configured name
+        host = host_of(url_or_host) if "://" in url_or_host else url_or_host.lower()
+        name = host
+        while name:
+            if name in self.host_limits:
+                return name
+            name = name.partition(".")[2]
+        return host
+
+    def label(self, key: str) -> str:
+        # Keeps metric label cardinality bounded: arbitrary sites are reported together
+        return key if key in self.host_limits else "other"
+
+    def state(self, key: str) -> HostState:
+        state = self.hosts.get(key)
+        if state is None:
+            if len(self.hosts) >= self.max_hosts:
+                self._evict_idle()
+            rate, burst, concurrency = self.host_limits.get(key, self.default_limits)
+            state = self.hosts[key] = HostState(rate, burst, concurrency, self.clock())
+        return state
+
+    def _evict_idle(self):
+        now = self.clock()
+        for key, state in list(self.hosts.items()):
+            if state.waiters or state.in_flight or state.timer is not None: continue
+            state.refill(now)
+            if state.tokens < state.burst: continue
+            # a recent pause is kept so the next 429 from the host backs off further
+            if state.strikes and now - state.blocked_until < self.max_backoff: continue
+            del self.hosts[key]
+            self.evicted += 1
+
+    async def acquire(self, url: str, priority: int = LIVE) -> float:
+        key = self.key(url)
+        state = self.state(key)
+        started = self.clock()
+        state.requests += 1
+        if not state.waiters and state.in_flight < state.concurrency and state.delay(started) == 0:
+            self._take(state)
+            state.waits.append(0.0)
+            WAIT_SECONDS.observe(0.0, host=self.label(key))
+            return 0.0
+
+        reason = "backoff" if state.blocked_until > started else "concurrency" if state.in_flight >= state.concurrency else "rate"
+        state.throttled += 1
+        THROTTLED.inc(host=self.label(key), reason=reason)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(state.waiters, (priority, next(self.sequence), future))
+        self._dispatch(key)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(url)  # granted just as the waiter was cancelled, hand the turn on
+            raise
+        waited = self.clock() - started
+        state.waits.append(waited)
+        WAIT_SECONDS.observe(waited, host=self.label(key))
+        return waited
+
+    def _take(self, state: HostState):
+        state.tokens -= 1
+        state.in_flight += 1
+
+    def _dispatch(self, key: str):
+        state = self.hosts[key]
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        while state.waiters:
+            if state.waiters[0][2].done():  # cancelled while waiting
+                heapq.heappop(state.waiters)
+                continue
+            if state.in_flight >= state.concurrency: return  # release() dispatches again
+            delay = state.delay(self.clock())
+            if delay > 0:
+                state.timer = asyncio.get_running_loop().call_later(delay, self._dispatch, key)
+                return
+            _, _, future = heapq.heappop(state.waiters)
+            self._take(state)
+            future.set_result(None)
+
+    def release(self, url: str, status: Optional[int] = None, retry_after=None):
+        # Called once per acquire with the response status (None when there was no response)
+        key = self.key(url)
+        state = self.state(key)
+        state.in_flight = max(0, state.in_flight - 1)
+        if status in BACKOFF_STATUSES:
+            self.pause(key, status, retry_after)
+        elif status is not None:
+            state.strikes = 0
+        if state.waiters:
+            self._dispatch(key)
+
+    def pause(self, key: str, status: int, retry_after=None):
+        state = self.state(key)
+        state.strikes += 1
+        state.backoffs += 1
+        BACKOFFS.inc(host=self.label(key), status=status)
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = self.backoff * 2 ** (state.strikes - 1) * (1 + random.random() * 0.5)
+        delay = min(delay, self.max_backoff)
+        state.blocked_until = max(state.blocked_until, self.clock() + delay)
+        state.tokens = min(state.tokens, 0.0)  # no burst right after the pause either
+        logger.warning(logfmt("host paused", host=key, status=status, seconds=delay, strikes=state.strikes))
+
+    @asynccontextmanager
+    async def slot(self, url: str, priority: int = LIVE):
+        # async with scheduler.slot(url) as response: ...; set response["status"] / ["retry_after"] for feedback
+        await self.acquire(url, priority)
+        response = {"status": None, "retry_after": None}
+        try:
+            yield response
+        finally:
+            self.release(url, response["status"], response["retry_after"])
+
+    def stats(self) -> Dict:
+        now = self.clock()
+        hosts = {
+            key: {
+                "requests": state.requests,
+                "throttled": state.throttled,
+                "backoffs": state.backoffs,
+                "in_flight": state.in_flight,
+                "waiting": len(state.waiters),
+                "paused_for": max(0.0, state.blocked_until - now),
+                "wait_p95": percentile(state.waits, 95),
+            }
+            for key, state in self.hosts.items()
+        }
+        return {
+            "hosts": len(hosts),
+            "waiting": sum(host["waiting"] for host in hosts.values()),
+            "throttled": sum(host["throttled"] for host in hosts.values()),
+            "backoffs": sum(host["backoffs"] for host in hosts.values()),
+            "paused_hosts": sum(1 for host in hosts.values() if host["paused_for"] > 0),
+            "evicted": self.evicted,
+            "per_host": hosts,
+        }
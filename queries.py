@@ -0,0 +1,50 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+
+def exists(model, hashLink):
+    # Index-only existence check, no ORM rows are loaded
+    return select(model.id).where(model.hashLink == hashLink).limit(1)
+
+
+def known(model, hashLinks):
+    # Which of a batch of links are already stored, one IN query instead of a lookup per link
+    return select(model.hashLink).where(model.hashLink.in_(list(hashLinks)))
+
+
+def touch(model, hashLinks):
+    # updatedAt bump for one link or a whole batch of reposts in one statement; rowcount says how many
+    # were known. The MySQL dialects connect with CLIENT.FOUND_ROWS, so unchanged rows still count.
+    if isinstance(hashLinks, (bytes, str)):
+        return update(model).where(model.hashLink == hashLinks).values(updatedAt=datetime.now(ZoneInfo('UTC')))
+    return update(model).where(model.hashLink.in_(list(hashLinks))).values(updatedAt=datetime.now(ZoneInfo('UTC')))
+
+
+def expired_ids(model, now, limit: int):
+    # Range scan on (isActive, deadline): the oldest still-active rows whose deadline has passed
+    return (select(model.id)
+            .where(model.isActive == True, model.deadline < now)  # noqa: E712  "IS 1" would not use the index
+            .order_by(model.deadline)
+            .limit(limit))
+
+
+def deactivate(model, ids):
+    # updatedAt keeps meaning "last posted", expiry doesn't bump it
+    return update(model).where(model.id.in_(list(ids))).values(isActive=False, updatedAt=model.updatedAt)
+
+
+def upsert(model, rows, dialect: str = "mysql"):
+    # INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT DO UPDATE on SQLite), so two users posting
+    # the same link at once end with one row and a fresh updatedAt instead of an IntegrityError
+    if dialect == "mysql":
+        return mysql_insert(model).values(rows).on_duplicate_key_update(updatedAt=func.current_timestamp())
+    if dialect == "sqlite":
+        return sqlite_insert(model).values(rows).on_conflict_do_update(
+            index_elements=[model.hashLink],
+            set_={"updatedAt": func.current_timestamp()}
+        )
+    raise ValueError(f"No upsert for dialect {dialect}")
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class ScrapeCache:
+    # LRU + TTL cache of scrape results keyed by normalized URL / Instagram shortcode.
+    # Failures and results without an image are cached as negative entries with a shorter TTL,
+    # concurrent requests for the same key share one scrape, and an optional SQLite file keeps
+    # entries across restarts.
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 6 * 3600, negative_ttl: float = 15 * 60,
+                 path: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key -> (expires, result or None)
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+        self.db = None
+        self.db_lock = threading.Lock()
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS scrape_cache (key TEXT PRIMARY KEY, value TEXT, expires REAL NOT NULL)")
+            self.db.execute("DELETE FROM scrape_cache WHERE expires < ?", (self.clock(),))
+            self.db.commit()
+
+        # Metrics
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def is_negative(result) -> bool:
+        return result is None or not result.get("imageUrl")
+
+    def get(self, key: str, disk: bool = True):
+        # Returns MISSING, None (negative entry) or the cached result
+        entry = self.entries.get(key)
+        if entry is None and disk and self.db is not None:
+            entry = self._load(key)
+            if entry is not None:
+                self.entries[key] = entry
+        if entry is None:
+            return MISSING
+        expires, result = entry
+        if expires < self.clock():
+            self.entries.pop(key, None)
+            return MISSING
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key: str, result, disk: bool = True):
+        negative = self.is_negative(result)
+        expires = self.clock() + (self.negative_ttl if negative else self.ttl)
+        value = None if negative else result
+        self.entries[key] = (expires, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        if disk and self.db is not None:
+            self._store(key, value, expires)
+        return value, expires
+
+    async def store(self, key: str, result):
+        value, expires = self.put(key, result, disk=False)
+        if self.db is not None:
+            await asyncio.to_thread(self._store, key, value, expires)
+
+    async def forget(self, key: str):
+        # Drop an entry so the next lookup scrapes again, e.g. a failed job that is about to be retried
+        self.entries.pop(key, None)
+        if self.db is not None:
+            await asyncio.to_thread(self._delete, key)
+
+    def count_hit(self, cached):
+        if cached is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return cached
+
+    async def get_or_scrape(self, key: str, scrape: Callable[[], Awaitable[Any]]):
+        cached = self.get(key, disk=False)
+        if cached is not MISSING:
+            return self.count_hit(cached)
+
+        waiting = self.inflight.get(key)
+        if waiting is not None:
+            self.coalesced += 1
+            return await asyncio.shield(waiting)
+
+        # Register before any await so later callers coalesce onto this lookup/scrape
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            if self.db is not None:
+                # Only the SQLite read leaves the event loop, the in-memory LRU stays single-threaded
+                entry = await asyncio.to_thread(self._load, key)
+                if entry is not None:
+                    self.entries[key] = entry
+                    cached = self.get(key, disk=False)
+                    if cached is not MISSING:
+                        future.set_result(cached)
+                        return self.count_hit(cached)
+
+            self.misses += 1
+            try:
+                result = await scrape()
+            except Exception as e:
+                await self.store(key, None)  # remember the failure for negative_ttl
+                future.set_exception(e)
+                future.exception()  # mark retrieved so an unawaited future doesn't warn
+                raise
+            await self.store(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done():
+                future.cancel()  # e.g. the scrape was cancelled, don't leave waiters hanging
+            self.inflight.pop(key, None)
+
+    def _load(self, key: str):
+        with self.db_lock:
+            row = self.db.execute("SELECT value, expires FROM scrape_cache WHERE key = ?", (key,)).fetchone()
+        if row is None: return None
+        value, expires = row
+        return expires, (json.loads(value, object_hook=_decode) if value is not None else None)
+
+    def _store(self, key: str, value, expires: float):
+        try:
+            payload = json.dumps(value, default=_encode) if value is not None else None
+            with self.db_lock:
+                self.db.execute("INSERT OR REPLACE INTO scrape_cache (key, value, expires) VALUES (?, ?, ?)", (key, payload, expires))
+                self.db.commit()
+        except (TypeError, sqlite3.Error) as e:
+            logger.warning(f"Could not persist cache entry {key}: {e}")
+
+    def _delete(self, key: str):
+        try:
+            with self.db_lock:
+                self.db.execute("DELETE FROM scrape_cache WHERE key = ?", (key,))
+                self.db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not delete cache entry {key}: {e}")
+
+    def close(self):
+        if self.db is not None:
+            with self.db_lock:
+                self.db.close()
+            self.db = None
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.negative_hits + self.coalesced) / lookups if lookups else None,
+        }
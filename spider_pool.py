@@ -0,0 +1,278 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from extractors import registry
+import metrics
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+
+
+def _worker_main(worker_id, task_q, result_q, max_jobs, concurrency, settings):
+    # Runs inside the worker process: keep one reactor and one CrawlerRunner alive
+    # and feed them batches of URLs pulled from the shared task queue.
+    from twisted.internet import reactor
+    from scrapy import signals
+    from scrapy.crawler import CrawlerRunner
+    from ActivityScraper import ActivityScraper
+    from extractors import registry as worker_registry
+    from metrics import registry as worker_metrics
+
+    # Only report what this worker measures, not the totals it was forked with
+    worker_registry.reset()
+    worker_metrics.reset()
+    runner = CrawlerRunner(settings)
+    slots = threading.BoundedSemaphore(concurrency)  # max URLs in flight in this worker
+
+    def crawl_batch(urls, started):
+        pending = set(urls)
+        responses = {}  # source url -> (status, Retry-After) of its last response, for the politeness scheduler
+
+        def report(url, item, error=None):
+            # Each URL is answered as soon as its item is scraped: the crawl only closes once Scrapy's
+            # engine notices it is idle, which can take one more 5s heartbeat
+            if url not in pending: return
+            pending.discard(url)
+            elapsed = time.monotonic() - started
+            result_q.put(("result", worker_id, url, item, error, elapsed / len(urls), responses.get(url)))
+            slots.release()
+
+        def on_item(item, response, spider):
+            report(response.meta.get("source_url", response.url), item)
+
+        def on_response(response, request, spider):
+            retry_after = response.headers.get("Retry-After")
+            responses[request.meta.get("source_url", request.url)] = (
+                response.status, retry_after.decode("latin-1") if retry_after else None
+            )
+
+        crawler = runner.create_crawler(ActivityScraper.EventSpider)
+        crawler.signals.connect(on_item, signal=signals.item_scraped, weak=False)
+        crawler.signals.connect(on_response, signal=signals.response_received, weak=False)
+        deferred = runner.crawl(crawler, start_urls=urls)
+
+        def finish(outcome):
+            # URLs that produced no item (download errors, non-2xx pages)
+            error = outcome.getErrorMessage() if hasattr(outcome, "getErrorMessage") else None
+            for url in list(pending):
+                report(url, None, error)
+            result_q.put(("extractors", worker_id, worker_registry.drain_stats()))
+            result_q.put(("metrics", worker_id, worker_metrics.drain()))  # parse / extract_date spans
+
+        deferred.addBoth(finish)
+
+    def feeder():
+        jobs = 0
+        while jobs < max_jobs:
+            slots.acquire()
+            url = task_q.get()
+            if url is None:
+                slots.release()
+                break
+            batch = [url]
+            # Drain whatever else is already waiting so Scrapy crawls it concurrently
+            while jobs + len(batch) < max_jobs and slots.acquire(blocking=False):
+                try:
+                    next_url = task_q.get_nowait()
+                except queue.Empty:
+                    slots.release()
+                    break
+                if next_url is None:
+                    slots.release()
+                    task_q.put(None)  # leave the stop sentinel for the outer loop
+                    break
+                batch.append(next_url)
+            jobs += len(batch)
+            result_q.put(("taken", worker_id, batch))
+            reactor.callFromThread(crawl_batch, batch, time.monotonic())
+
+        # Wait for in-flight URLs before stopping the reactor
+        for _ in range(concurrency):
+            slots.acquire()
+        # The last crawl may still be closing, send what it counted
+        result_q.put(("extractors", worker_id, worker_registry.drain_stats()))
+        result_q.put(("metrics", worker_id, worker_metrics.drain()))
+        result_q.put(("exit", worker_id, jobs))
+        reactor.callFromThread(reactor.stop)
+
+    threading.Thread(target=feeder, daemon=True).start()
+    reactor.run(installSignalHandlers=False)
+
+
+class SpiderPool:
+    # Long-lived pool of warm Scrapy worker processes. Each worker keeps its reactor
+    # and CrawlerRunner alive and is recycled after max_jobs URLs. Resolved futures carry the
+    # (status, Retry-After) of the URL's last response as future.response.
+
+    def __init__(self, size: int = 2, max_jobs: int = 200, concurrency: int = 8, settings: Optional[Dict] = None):
+        self.size = max(1, size)
+        self.max_jobs = max(1, max_jobs)
+        self.concurrency = max(1, concurrency)
+        self.settings = {
+            'USER_AGENT': USER_AGENT,
+            'CONCURRENT_REQUESTS': self.concurrency,
+            'TELNETCONSOLE_ENABLED': False,
+            'LOG_LEVEL': 'WARNING',
+            # 429 goes back to the politeness scheduler, which waits out Retry-After instead of retrying at once
+            'RETRY_HTTP_CODES': [500, 502, 503, 504, 522, 524, 408],
+        }
+        self.settings.update(settings or {})
+
+        self.task_q = multiprocessing.Queue()
+        self.result_q = multiprocessing.Queue()
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.pending: Dict[str, List[Future]] = {}
+        self.assigned: Dict[int, set] = {}
+        self.lock = threading.Lock()
+        self.collector = None
+        self.running = False
+        self.next_worker_id = 0
+
+        # Metrics
+        self.started_at = None
+        self.restarts = 0
+        self.worker_stats: Dict[int, Dict] = {}
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.started_at = time.monotonic()
+        for _ in range(self.size):
+            self._spawn()
+        self.collector = threading.Thread(target=self._collect, name="spider-pool-collector", daemon=True)
+        self.collector.start()
+        logger.info(f"Spider pool started with {self.size} workers")
+
+    def stop(self, timeout: float = 30):
+        if not self.running: return
+        self.running = False
+        for _ in range(len(self.processes)):
+            self.task_q.put(None)
+        for process in list(self.processes.values()):
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = {}
+        with self.lock:
+            for futures in self.pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Spider pool stopped"))
+            self.pending = {}
+        logger.info("Spider pool stopped")
+
+    def _spawn(self):
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(worker_id, self.task_q, self.result_q, self.max_jobs, self.concurrency, self.settings),
+            name=f"spider-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+        self.assigned[worker_id] = set()
+        self.worker_stats[worker_id] = {"jobs": 0, "errors": 0, "busy": 0.0, "started": time.monotonic()}
+
+    def submit(self, url: str) -> Future:
+        future = Future()
+        with self.lock:
+            waiting = self.pending.get(url)
+            if waiting is not None:
+                waiting.append(future)  # same URL already queued, share the crawl
+                return future
+            self.pending[url] = [future]
+        self.task_q.put(url)
+        return future
+
+    def scrape(self, url: str, timeout: Optional[float] = None):
+        return self.submit(url).result(timeout)
+
+    def _resolve(self, url, result=None, error=None, response=None):
+        with self.lock:
+            futures = self.pending.pop(url, [])
+        for future in futures:
+            if future.done(): continue
+            future.response = response
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _collect(self):
+        while self.running:
+            try:
+                message = self.result_q.get(timeout=1)
+            except queue.Empty:
+                self._reap()
+                continue
+            kind, worker_id = message[0], message[1]
+            if kind == "taken":
+                self.assigned.setdefault(worker_id, set()).update(message[2])
+            elif kind == "result":
+                _, _, url, item, error, elapsed, response = message
+                self.assigned.get(worker_id, set()).discard(url)
+                stats = self.worker_stats.get(worker_id)
+                if stats is not None:
+                    stats["jobs"] += 1
+                    stats["busy"] += elapsed
+                    if error: stats["errors"] += 1
+                self._resolve(url, error=RuntimeError(error) if error and item is None else None, result=item, response=response)
+            elif kind == "extractors":
+                registry.merge(message[2])  # extractor counters live in the worker, fold them in here
+            elif kind == "metrics":
+                metrics.registry.merge(message[2])
+            elif kind == "exit":
+                process = self.processes.pop(worker_id, None)
+                if process is not None:
+                    process.join(5)
+                self._retire(worker_id)
+                if self.running:
+                    self.restarts += 1
+                    self._spawn()
+
+    def _reap(self):
+        # Respawn workers that died without reporting, failing the URLs they held
+        for worker_id, process in list(self.processes.items()):
+            if process.is_alive(): continue
+            logger.error(f"Spider worker {worker_id} died with exit code {process.exitcode}")
+            self.processes.pop(worker_id, None)
+            for url in self.assigned.get(worker_id, set()):
+                self._resolve(url, error=RuntimeError(f"Spider worker {worker_id} died"))
+            self._retire(worker_id)
+            if self.running:
+                self.restarts += 1
+                self._spawn()
+
+    def _retire(self, worker_id):
+        self.assigned.pop(worker_id, None)
+        stats = self.worker_stats.pop(worker_id, None)
+        if stats is not None:
+            logger.info(f"Spider worker {worker_id} recycled after {stats['jobs']} jobs")
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        workers = {}
+        for worker_id, stats in list(self.worker_stats.items()):
+            uptime = max(now - stats["started"], 1e-9)
+            workers[worker_id] = {
+                "jobs": stats["jobs"],
+                "errors": stats["errors"],
+                "urls_per_sec": stats["jobs"] / uptime,
+                "utilization": min(1.0, stats["busy"] / uptime),
+            }
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            "size": len(self.processes),
+            "pending": pending,
+            "restarts": self.restarts,
+            "workers": workers,
+        }
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.exc import DBAPIError, OperationalError, SQLAlchemyError
+
+from metrics import percentile, span
+from queries import touch, upsert
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    # Write-behind buffer for scraped entries and updatedAt touches. Rows are collected per model
+    # and written as one multi-row upsert plus one UPDATE ... WHERE hashLink IN (...) per model,
+    # when max_rows are pending, every flush_interval seconds and on stop().
+    # A batch that fails on a transient error (connection, lock) is retried with backoff and put back in
+    # the buffer if the database stays down; one the database rejects is split to write all but the bad rows.
+    # Writes run in their own task so cancelling a flush (stop(), a cancelled backfill) never loses a batch.
+
+    def __init__(self, session_scope: Callable, dialect: str = "mysql", max_rows: int = 100,
+                 flush_interval: float = 2.0, retries: int = 3, backoff: float = 0.5,
+                 max_pending: int = 10000, latency_window: int = 500,
+                 on_flush: Optional[Callable[[Set[bytes]], Awaitable[None]]] = None):
+        self.session_scope = session_scope
+        self.dialect = dialect
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.max_pending = max_pending  # past this, batches that keep failing are dropped
+        self.on_flush = on_flush  # optional, gets the hashLinks of every inserted batch once it is written
+
+        self.inserts: Dict[Any, Dict[bytes, Dict]] = {}  # model -> hashLink -> row
+        self.touches: Dict[Any, Set[bytes]] = {}  # model -> hashLinks
+        self.writing: Dict[Any, Set[bytes]] = {}  # hashLinks of the batch being written
+        self.wakeup = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+        self.flushing: Optional[asyncio.Task] = None  # the write in progress, outlives a cancelled flush()
+
+        # Metrics
+        self.flushes = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+        self.retried = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.rows_per_flush = deque(maxlen=latency_window)
+        self.flush_times = deque(maxlen=latency_window)
+
+    def start(self):
+        if self.task is not None: return
+        self.task = asyncio.create_task(self._run(), name="write-buffer")
+        logger.info(f"Write buffer started (max_rows={self.max_rows}, interval={self.flush_interval}s)")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        if self.flushing is not None:
+            await asyncio.gather(self.flushing, return_exceptions=True)  # the write _run was cancelled in
+        await self.flush()
+        if self.pending():
+            logger.error(f"Write buffer stopped with {self.pending()} unwritten rows")
+        logger.info("Write buffer stopped")
+
+    def pending(self) -> int:
+        return sum(len(rows) for rows in self.inserts.values()) + sum(len(hashes) for hashes in self.touches.values())
+
+    def is_pending(self, model, hashLink: bytes) -> bool:
+        # A scraped entry that is not flushed yet already counts as stored
+        return hashLink in self.inserts.get(model, ()) or hashLink in self.writing.get(model, ())
+
+    def insert(self, model, row: Dict):
+        self.inserts.setdefault(model, {})[row["hashLink"]] = row
+        self._check_size()
+
+    def touch(self, model, hashLink: bytes):
+        self.touches.setdefault(model, set()).add(hashLink)
+        self._check_size()
+
+    def _check_size(self):
+        if self.pending() >= self.max_rows:
+            self.wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Write buffer flush crashed, {self.pending()} rows pending: {type(e).__name__}: {e}")
+
+    async def flush(self):
+        async with self.flush_lock:
+            if self.flushing is not None:
+                await asyncio.wait({self.flushing})  # left running by a flush that was cancelled
+            if not self.pending(): return
+            inserts, self.inserts = self.inserts, {}
+            touches, self.touches = self.touches, {}
+            self.writing = {model: set(rows) for model, rows in inserts.items()}
+            self.flushing = asyncio.create_task(self._flush(inserts, touches), name="write-buffer-flush")
+            await asyncio.shield(self.flushing)
+
+    async def _flush(self, inserts, touches):
+        rows = sum(len(batch) for batch in inserts.values()) + sum(len(hashes) for hashes in touches.values())
+        started = time.monotonic()
+        rejected = []
+        try:
+            with span("db.flush", rows=rows):
+                try:
+                    await self._write(inserts, touches)
+                except SQLAlchemyError as e:
+                    if self._transient(e): raise
+                    logger.warning(f"Flush of {rows} rows rejected ({type(e).__name__}), writing the batch in parts")
+                    rejected = await self._isolate(self._items(inserts, touches), inserts)
+        except SQLAlchemyError as e:
+            self.failed_flushes += 1
+            self._requeue(inserts, touches, rows, e)
+            return
+        except BaseException as e:
+            self._requeue(inserts, touches, rows, e)  # cancelled at shutdown, keep the rows for stop()
+            raise
+        finally:
+            self.writing = {}
+            self.flushing = None
+        self.flushes += 1
+        self.rows_written += rows - len(rejected)
+        self.rejected += len(rejected)
+        self.rows_per_flush.append(rows)
+        self.flush_times.append(time.monotonic() - started)
+        dropped = {(model, hashLink) for kind, model, hashLink in rejected if kind == "insert"}
+        written = {hashLink for model, batch in inserts.items() for hashLink in batch if (model, hashLink) not in dropped}
+        if self.on_flush is not None and written:
+            try:
+                await self.on_flush(written)
+            except Exception as e:
+                logger.error(f"Flush callback failed for {len(written)} rows: {e}")
+
+    @staticmethod
+    def _transient(error: SQLAlchemyError) -> bool:
+        # Lost connections, lock timeouts and deadlocks go away; a row the database rejects fails again
+        return isinstance(error, OperationalError) or (isinstance(error, DBAPIError) and error.connection_invalidated)
+
+    async def _write(self, inserts, touches):
+        attempt = 0
+        while True:
+            try:
+                # one transaction per flush: inserts first so a touch of a just-inserted link is harmless
+                async with self.session_scope() as session:
+                    for model, batch in inserts.items():
+                        await session.execute(upsert(model, list(batch.values()), self.dialect))
+                    for model, hashes in touches.items():
+                        await session.execute(touch(model, hashes))
+                return
+            except SQLAlchemyError as e:
+                if not self._transient(e) or attempt >= self.retries: raise
+                attempt += 1
+                self.retried += 1
+                delay = self.backoff * 2 ** (attempt - 1)
+                logger.warning(f"Flush failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _items(inserts, touches) -> List[Tuple[str, Any, bytes]]:
+        return ([("insert", model, hashLink) for model, batch in inserts.items() for hashLink in batch]
+                + [("touch", model, hashLink) for model, hashes in touches.items() for hashLink in hashes])
+
+    async def _isolate(self, items, inserts) -> List[Tuple[str, Any, bytes]]:
+        # Writes the batch in halves down to the single rows the database rejects, returns those (dropped)
+        part_inserts, part_touches = {}, {}
+        for kind, model, hashLink in items:
+            if kind == "insert":
+                part_inserts.setdefault(model, {})[hashLink] = inserts[model][hashLink]
+            else:
+                part_touches.setdefault(model, set()).add(hashLink)
+        try:
+            await self._write(part_inserts, part_touches)
+            return []
+        except SQLAlchemyError as e:
+            if self._transient(e): raise
+            if len(items) == 1:
+                kind, model, hashLink = items[0]
+                row = inserts[model][hashLink] if kind == "insert" else {}
+                logger.error(f"Dropping {kind} of {row.get('link', hashLink.hex())} rejected by the database: {getattr(e, 'orig', None) or e}")
+                return items
+        middle = len(items) // 2
+        return await self._isolate(items[:middle], inserts) + await self._isolate(items[middle:], inserts)
+
+    def _requeue(self, inserts, touches, rows, error):
+        if self.pending() + rows > self.max_pending:
+            self.dropped += rows
+            logger.error(f"Dropping {rows} buffered rows after {self.retries} retries: {error}")
+            return
+        logger.error(f"Flush of {rows} rows failed, keeping them for the next flush: {error!r}")
+        for model, batch in inserts.items():
+            # rows that arrived meanwhile are newer, keep them
+            self.inserts[model] = {**batch, **self.inserts.get(model, {})}
+        for model, hashes in touches.items():
+            self.touches.setdefault(model, set()).update(hashes)
+
+    def stats(self) -> Dict:
+        return {
+            "pending": self.pending(),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failed_flushes": self.failed_flushes,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "rows_per_flush_avg": sum(self.rows_per_flush) / len(self.rows_per_flush) if self.rows_per_flush else None,
+            "flush_p50": percentile(self.flush_times, 50),
+            "flush_p95": percentile(self.flush_times, 95),
+        }